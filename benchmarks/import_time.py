@@ -0,0 +1,50 @@
+"""Measures the cost of importing pycorda in fresh interpreters
+
+    python benchmarks/import_time.py [--runs 10]
+
+Prints the median wall time of each import statement and the heavy optional
+dependencies it loaded. tests/test_imports.py checks the loaded modules.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = [
+	'import pycorda',
+	'from pycorda import OfflineNode',
+	'from pycorda import Node',
+	'from pycorda import Plotter',
+]
+
+HEAVY_MODULES = ['pandas', 'jks', 'jolokia', 'jpype', 'jaydebeapi', 'matplotlib', 'plotly', 'chart_studio', 'sklearn']
+
+_PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+exec(sys.argv[1])
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'modules': [m for m in sys.argv[2:] if m in sys.modules]}))
+'''
+
+def measure(statement, runs=10):
+	"""Imports in runs fresh interpreters and returns the median seconds and the heavy modules loaded"""
+	root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	results = []
+	for i in range(runs):
+		output = subprocess.check_output([sys.executable, '-c', _PROBE, statement] + HEAVY_MODULES, cwd=root)
+		results.append(json.loads(output))
+	return statistics.median(result['seconds'] for result in results), results[-1]['modules']
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--runs', type=int, default=10)
+	args = parser.parse_args()
+	for statement in STATEMENTS:
+		seconds, modules = measure(statement, args.runs)
+		print('%-36s %8.1f ms   %s' % (statement, seconds * 1000, ', '.join(modules) or '-'))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,237 @@
+"""Benchmarks pycorda against a synthetic Corda node database
+
+    python benchmarks/run.py --states 100000 --repeat 5
+    python benchmarks/run.py --states 100000 --compare benchmarks/results/0.5-1a2b3c4-100000.json
+
+Times Node._get_df on every table, every find_* method, generate_snapshot
+and the Plotter methods on a database from benchmarks/synthetic.py. Each case
+reports latency percentiles over its calls and rows per second at the median.
+PEAK_MB is the largest Python allocation during one extra traced call and
+RSS_MB the process high-water mark after the case. Results are written to
+a JSON file named after the pycorda version, git commit and scale, which a
+later run can be compared with.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+try:
+	import resource
+except ImportError:
+	# not available on Windows
+	resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pycorda
+from pycorda.schema import TABLES
+from benchmarks.synthetic import CASH, create_synthetic_db, tx_id
+
+COLUMNS = ['CASE', 'CALLS', 'ROWS', 'P50_MS', 'P95_MS', 'P99_MS', 'ROWS_PER_S', 'PEAK_MB', 'RSS_MB']
+
+def _rows(result):
+	"""Rows in a case's result: a dataframe's length, a returned row count, or 1 for a single value"""
+	if isinstance(result, pd.DataFrame):
+		return len(result)
+	if result is None:
+		return 0
+	if isinstance(result, (int, np.integer)):
+		return int(result)
+	return 1
+
+def _rss_mb():
+	if resource is None:
+		return np.nan
+	maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# bytes on macOS, kilobytes elsewhere
+	return maxrss / 2.0 ** 20 if sys.platform == 'darwin' else maxrss / 2.0 ** 10
+
+def time_case(name, function, args_list, repeat=5):
+	"""Calls function with each args of args_list repeat times and returns a result row"""
+	seconds = []
+	rows = 0
+	for i in range(repeat):
+		for args in args_list:
+			start = time.perf_counter()
+			result = function(*args)
+			seconds.append(time.perf_counter() - start)
+			rows = _rows(result)
+			del result
+	tracemalloc.start()
+	function(*args_list[0])
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	p50, p95, p99 = np.percentile(seconds, [50, 95, 99])
+	return {
+		'CASE': name,
+		'CALLS': len(seconds),
+		'ROWS': rows,
+		'P50_MS': p50 * 1000,
+		'P95_MS': p95 * 1000,
+		'P99_MS': p99 * 1000,
+		'ROWS_PER_S': rows / p50 if rows and p50 > 0 else np.nan,
+		'PEAK_MB': peak / 2.0 ** 20,
+		'RSS_MB': _rss_mb(),
+	}
+
+def cases(node, states, keys=5):
+	"""Returns (name, function, args_list) of every benchmark on a synthetic node"""
+	transactions = max(states // 2, 1)
+	step = max(transactions // keys, 1)
+	cash_ids = [tx_id(t) for t in range(0, transactions, step) if t % 2 == 0][:keys] or [tx_id(0)]
+	linear_ids = [tx_id(t + 1) for t in range(0, transactions - 1, step)][:keys] or [tx_id(1)]
+	uuids = ['u%d-0' % (t // 20) for t in range(0, transactions, step)][:keys]
+	result = [('_get_df:' + table, node._get_df, [(table,)]) for table in TABLES]
+	result += [
+		('get_vault_states', node.get_vault_states, [()]),
+		('find_transactions_by_linear_id', node.find_transactions_by_linear_id, [(uuid,) for uuid in uuids]),
+		('find_vault_states_by_transaction_id', node.find_vault_states_by_transaction_id, [(tx,) for tx in cash_ids]),
+		('find_vault_fungible_states_by_transaction_id', node.find_vault_fungible_states_by_transaction_id, [(tx,) for tx in cash_ids]),
+		('find_vault_fungible_states_by_issuer', node.find_vault_fungible_states_by_issuer, [('O=BankA, L=London, C=GB',)]),
+		('find_unconsumed_states_by_contract_state', node.find_unconsumed_states_by_contract_state, [(CASH,)]),
+		('find_linear_id_by_transaction_id', node.find_linear_id_by_transaction_id, [(tx,) for tx in linear_ids]),
+	]
+	snapshot_file = os.path.join(tempfile.gettempdir(), 'pycorda-bench-snapshot.log')
+	result.append(('generate_snapshot', lambda: node.generate_snapshot(snapshot_file)['ROWS'].sum(), [()]))
+	return result
+
+def plotter_cases(node):
+	import matplotlib
+	matplotlib.use('Agg')
+	from matplotlib import pyplot
+	plotter = pycorda.Plotter(node)
+	def plot(method, *args):
+		def run():
+			getattr(plotter, method)(*args)
+			pyplot.close('all')
+		return (':'.join(['Plotter.' + method] + list(args[1:])), run, [()])
+	return [
+		plot('plot_timeseries_node_attachments'),
+		plot('plot_timeseries_node_message_ids'),
+		plot('plot_timeseries_vault_states_consumed'),
+		plot('plot_timeseries_fungible_qty', CASH),
+		plot('plot_timeseries_fungible_qty', CASH, 'hour'),
+		plot('node_checkpoints_ids'),
+		plot('vault_states_status'),
+	]
+
+def run_benchmarks(node, states, repeat=5, plots=True, only=None, log=None):
+	"""Runs the benchmarks and returns a dataframe with one row per case
+
+	Parameters
+    ----------
+    node : pycorda.Node
+        node on a database from synthetic.create_synthetic_db with states states
+    repeat : int
+        number of times each case is run
+    plots : bool
+        also run the Plotter cases, which need matplotlib
+    only : str, optional
+        only run cases whose name contains only
+    log : file, optional
+        progress is written here
+	"""
+	selected = cases(node, states)
+	if plots:
+		selected += plotter_cases(node)
+	rows = []
+	for name, function, args_list in selected:
+		if only and only not in name:
+			continue
+		# Plotter methods print their data, which is not part of the benchmark output
+		stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+		try:
+			rows.append(time_case(name, function, args_list, repeat))
+		finally:
+			sys.stdout.close()
+			sys.stdout = stdout
+		if log is not None:
+			log.write('%-55s %10.2f ms\n' % (name, rows[-1]['P50_MS']))
+	return pd.DataFrame(rows, columns=COLUMNS)
+
+def _version():
+	try:
+		from importlib.metadata import version
+		return version('pycorda')
+	except Exception:
+		return 'unknown'
+
+def _commit():
+	try:
+		return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+			stderr=subprocess.DEVNULL).decode().strip()
+	except (OSError, subprocess.CalledProcessError):
+		return 'unknown'
+
+def save_results(df, directory, states, repeat):
+	"""Writes results with the environment they were measured in and returns the file path"""
+	meta = {
+		'pycorda': _version(),
+		'commit': _commit(),
+		'states': states,
+		'repeat': repeat,
+		'python': platform.python_version(),
+		'pandas': pd.__version__,
+		'platform': platform.platform(),
+		'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+	}
+	os.makedirs(directory, exist_ok=True)
+	path = os.path.join(directory, '%s-%s-%d.json' % (meta['pycorda'], meta['commit'], states))
+	with open(path, 'w') as f:
+		json.dump({'meta': meta, 'results': df.to_dict('records')}, f, indent=1)
+	return path
+
+def load_results(path):
+	"""Returns the metadata and results dataframe of a results file"""
+	with open(path) as f:
+		data = json.load(f)
+	return data['meta'], pd.DataFrame(data['results'], columns=COLUMNS)
+
+def compare_results(baseline, current):
+	"""Joins two results dataframes on CASE with the ratio of current to baseline median latency"""
+	df = baseline[['CASE', 'P50_MS']].merge(current[['CASE', 'P50_MS']], on='CASE', suffixes=('_BASELINE', '_CURRENT'))
+	df['RATIO'] = df['P50_MS_CURRENT'] / df['P50_MS_BASELINE']
+	return df
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmarks pycorda against a synthetic Corda node database')
+	parser.add_argument('--states', type=int, default=10000, help='rows in VAULT_STATES')
+	parser.add_argument('--repeat', type=int, default=5, help='runs of each case')
+	parser.add_argument('--db', help='database file, created if missing, defaults to a file per scale in the temp directory')
+	parser.add_argument('--only', help='only run cases whose name contains this')
+	parser.add_argument('--no-plots', action='store_true', help='skip the Plotter cases')
+	parser.add_argument('--output', default=os.path.join(ROOT, 'benchmarks', 'results'), help='directory results are written to')
+	parser.add_argument('--compare', help='results file to compare with')
+	args = parser.parse_args()
+
+	# The baseline is read first, since a run of the same commit and scale overwrites it
+	baseline = load_results(args.compare) if args.compare else None
+	db = args.db or os.path.join(tempfile.gettempdir(), 'pycorda-bench-%d.db' % args.states)
+	if not os.path.exists(db):
+		sys.stderr.write('creating %s\n' % db)
+		create_synthetic_db(db, args.states)
+	node = pycorda.Node('sqlite:///' + db, '', '')
+	try:
+		df = run_benchmarks(node, args.states, args.repeat, plots=not args.no_plots, only=args.only, log=sys.stderr)
+	finally:
+		node.close()
+	with pd.option_context('display.max_rows', None, 'display.width', 200, 'display.float_format', '{:.2f}'.format):
+		print(df.to_string(index=False))
+		print('results written to ' + save_results(df, args.output, args.states, args.repeat))
+		if baseline is not None:
+			meta, baseline_df = baseline
+			print('compared with ' + meta['pycorda'] + ' ' + meta['commit'])
+			print(compare_results(baseline_df, df).to_string(index=False))
+
+if __name__ == '__main__':
+	main()
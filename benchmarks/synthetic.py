@@ -0,0 +1,159 @@
+"""Synthetic Corda node databases for benchmarks
+
+create_synthetic_db writes a SQLite database with the Corda table layout
+read by pycorda.Node, filled to a given number of vault states:
+
+    python benchmarks/synthetic.py /tmp/node.db --states 1000000
+
+Half of the transactions issue two Cash states and half two IOU linear
+states. Linear states form chains of ten transactions sharing a UUID.
+About 60% of the states are consumed. Timestamps are one second apart.
+"""
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+
+TABLES = '''
+CREATE TABLE NODE_ATTACHMENTS (ATT_ID VARCHAR(255), CONTENT BLOB, FILENAME VARCHAR(255), INSERTION_DATE TIMESTAMP, UPLOADER VARCHAR(255), VERSION INT);
+CREATE TABLE NODE_ATTACHMENTS_CONTRACTS (ATT_ID VARCHAR(255), CONTRACT_CLASS_NAME VARCHAR(255));
+CREATE TABLE NODE_CHECKPOINTS (CHECKPOINT_ID VARCHAR(64), CHECKPOINT_VALUE BLOB);
+CREATE TABLE NODE_CONTRACT_UPGRADES (STATE_REF VARCHAR(96), CONTRACT_CLASS_NAME VARCHAR(255));
+CREATE TABLE NODE_IDENTITIES (PK_HASH VARCHAR(130), IDENTITY_VALUE BLOB);
+CREATE TABLE NODE_INFOS (NODE_INFO_ID INT, NODE_INFO_HASH VARCHAR(64), PLATFORM_VERSION INT, SERIAL BIGINT);
+CREATE TABLE NODE_INFO_HOSTS (HOST_NAME VARCHAR(255), PORT INT, NODE_INFO_ID INT, HOSTS_ID INT);
+CREATE TABLE NODE_INFO_PARTY_CERT (PARTY_NAME VARCHAR(255), ISMAIN BOOLEAN, OWNING_KEY_HASH VARCHAR(130), PARTY_CERT_BINARY BLOB);
+CREATE TABLE NODE_LINK_NODEINFO_PARTY (NODE_INFO_ID INT, PARTY_NAME VARCHAR(255));
+CREATE TABLE NODE_MESSAGE_IDS (MESSAGE_ID VARCHAR(64), INSERTION_TIME TIMESTAMP, SENDER VARCHAR(64), SEQUENCE_NUMBER BIGINT);
+CREATE TABLE NODE_MESSAGE_RETRY (MESSAGE_ID BIGINT, MESSAGE BLOB, RECIPIENTS BLOB);
+CREATE TABLE NODE_NAMED_IDENTITIES (NAME VARCHAR(128), PK_HASH VARCHAR(130));
+CREATE TABLE NODE_OUR_KEY_PAIRS (PUBLIC_KEY_HASH VARCHAR(130), PRIVATE_KEY BLOB, PUBLIC_KEY BLOB);
+CREATE TABLE NODE_PROPERTIES (PROPERTY_KEY VARCHAR(255), PROPERTY_VALUE VARCHAR(255));
+CREATE TABLE NODE_SCHEDULED_STATES (OUTPUT_INDEX INT, TRANSACTION_ID VARCHAR(64), SCHEDULED_AT TIMESTAMP);
+CREATE TABLE NODE_TRANSACTIONS (TX_ID VARCHAR(64), TRANSACTION_VALUE BLOB, STATE_MACHINE_RUN_ID VARCHAR(36), STATUS VARCHAR(1));
+CREATE TABLE NODE_TRANSACTION_MAPPINGS (TX_ID VARCHAR(64), STATE_MACHINE_RUN_ID VARCHAR(36));
+CREATE TABLE STATE_PARTY (OUTPUT_INDEX INT, TRANSACTION_ID VARCHAR(64), PUBLIC_KEY_HASH VARCHAR(255), X500_NAME VARCHAR(255));
+CREATE TABLE VAULT_FUNGIBLE_STATES (OUTPUT_INDEX INT, TRANSACTION_ID VARCHAR(64), ISSUER_NAME VARCHAR(255), ISSUER_REF BLOB, OWNER_NAME VARCHAR(255), QUANTITY BIGINT);
+CREATE TABLE VAULT_FUNGIBLE_STATES_PARTS (OUTPUT_INDEX INT, TRANSACTION_ID VARCHAR(64), PARTICIPANTS VARCHAR(255));
+CREATE TABLE VAULT_LINEAR_STATES (OUTPUT_INDEX INT, TRANSACTION_ID VARCHAR(64), EXTERNAL_ID VARCHAR(255), UUID VARCHAR(255), LINEAR_ID VARCHAR(255));
+CREATE TABLE VAULT_LINEAR_STATES_PARTS (OUTPUT_INDEX INT, TRANSACTION_ID VARCHAR(64), PARTICIPANTS VARCHAR(255));
+CREATE TABLE VAULT_STATES (OUTPUT_INDEX INT, TRANSACTION_ID VARCHAR(64), CONSUMED_TIMESTAMP TIMESTAMP, CONTRACT_STATE_CLASS_NAME VARCHAR(255), LOCK_ID VARCHAR(255), LOCK_TIMESTAMP TIMESTAMP, NOTARY_NAME VARCHAR(255), RECORDED_TIMESTAMP TIMESTAMP, STATE_STATUS INT, RELEVANCY_STATUS INT, CONSTRAINT_TYPE INT, CONSTRAINT_DATA BLOB);
+CREATE TABLE VAULT_TRANSACTION_NOTES (SEQ_NO INT, NOTE VARCHAR(255), TRANSACTION_ID VARCHAR(64));
+CREATE INDEX VAULT_STATES_TX ON VAULT_STATES (TRANSACTION_ID);
+CREATE INDEX VAULT_STATES_CONTRACT ON VAULT_STATES (CONTRACT_STATE_CLASS_NAME);
+CREATE INDEX VAULT_LINEAR_STATES_TX ON VAULT_LINEAR_STATES (TRANSACTION_ID);
+CREATE INDEX VAULT_LINEAR_STATES_UUID ON VAULT_LINEAR_STATES (UUID);
+CREATE INDEX VAULT_FUNGIBLE_STATES_TX ON VAULT_FUNGIBLE_STATES (TRANSACTION_ID);
+CREATE INDEX VAULT_FUNGIBLE_STATES_ISSUER ON VAULT_FUNGIBLE_STATES (ISSUER_NAME);
+'''
+
+CASH = 'net.corda.finance.contracts.asset.Cash$State'
+IOU = 'com.example.state.IOUState'
+NOTARY = 'O=Notary, L=London, C=GB'
+ISSUERS = ['O=BankA, L=London, C=GB', 'O=BankB, L=New York, C=US', 'O=BankC, L=Paris, C=FR']
+PARTIES = ['O=PartyA, L=London, C=GB', 'O=PartyB, L=New York, C=US', 'O=PartyC, L=Paris, C=FR',
+	'O=PartyD, L=Zurich, C=CH', 'O=PartyE, L=Tokyo, C=JP']
+CHAIN_LENGTH = 10
+START = datetime.datetime(2020, 1, 1)
+
+def tx_id(i):
+	return '%064X' % (i * 0x9E3779B97F4A7C15 % (1 << 256))
+
+def timestamp(seconds):
+	return (START + datetime.timedelta(seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+def payload(rng, size):
+	"""Bytes with a Corda serialization header, AMQP without compression"""
+	return b'corda\x01\x00\x00' + rng.randbytes(max(size - 8, 0))
+
+def _states(transactions, rng):
+	for t in range(transactions):
+		cash = t % 2 == 0
+		for output in (0, 1):
+			consumed = timestamp(t + rng.randint(1, 86400)) if rng.random() < 0.6 else None
+			yield (output, tx_id(t), consumed, CASH if cash else IOU, None, None, NOTARY,
+				timestamp(t), 1 if consumed else 0, 0, 0, None)
+
+def _rows(transactions, cash, make):
+	for t in range(transactions):
+		if (t % 2 == 0) == cash:
+			for output in (0, 1):
+				yield make(t, output)
+
+def create_synthetic_db(path, states=10000, blob_size=2048, seed=0):
+	"""Writes a SQLite database with the Corda node tables and returns its path
+
+	Parameters
+    ----------
+    path : str
+        database file, replaced if it exists
+    states : int
+        number of rows in VAULT_STATES, two per transaction
+    blob_size : int
+        bytes in each NODE_TRANSACTIONS and NODE_CHECKPOINTS value
+    seed : int
+        seed of the random values, the same arguments give the same database
+	"""
+	rng = random.Random(seed)
+	transactions = max(states // 2, 1)
+	if os.path.exists(path):
+		os.remove(path)
+	conn = sqlite3.connect(path)
+	conn.execute('PRAGMA journal_mode = OFF')
+	conn.execute('PRAGMA synchronous = OFF')
+	conn.executescript(TABLES)
+
+	def insert(table, rows):
+		rows = iter(rows)
+		first = next(rows, None)
+		if first is None:
+			return
+		placeholders = ', '.join(['?'] * len(first))
+		conn.execute('INSERT INTO ' + table + ' VALUES (' + placeholders + ')', first)
+		conn.executemany('INSERT INTO ' + table + ' VALUES (' + placeholders + ')', rows)
+
+	insert('VAULT_STATES', _states(transactions, rng))
+	insert('VAULT_FUNGIBLE_STATES', _rows(transactions, True, lambda t, output:
+		(output, tx_id(t), ISSUERS[t % len(ISSUERS)], b'\x01', PARTIES[(t + output) % len(PARTIES)], rng.randint(1, 10000))))
+	insert('VAULT_FUNGIBLE_STATES_PARTS', _rows(transactions, True, lambda t, output:
+		(output, tx_id(t), PARTIES[(t + output) % len(PARTIES)])))
+	insert('VAULT_LINEAR_STATES', _rows(transactions, False, lambda t, output:
+		(output, tx_id(t), None, 'u%d-%d' % (t // (2 * CHAIN_LENGTH), output), 'l%d-%d' % (t // (2 * CHAIN_LENGTH), output))))
+	insert('VAULT_LINEAR_STATES_PARTS', _rows(transactions, False, lambda t, output:
+		(output, tx_id(t), PARTIES[(t + output) % len(PARTIES)])))
+	insert('STATE_PARTY', ((output, tx_id(t), 'K%d' % (t % 5), PARTIES[t % len(PARTIES)])
+		for t in range(transactions) for output in (0, 1)))
+	insert('NODE_TRANSACTIONS', ((tx_id(t), payload(rng, blob_size), 'r%d' % t, 'V') for t in range(transactions)))
+	insert('NODE_TRANSACTION_MAPPINGS', ((tx_id(t), 'r%d' % t) for t in range(transactions)))
+	insert('NODE_MESSAGE_IDS', (('m%d' % t, timestamp(t), PARTIES[t % len(PARTIES)], t) for t in range(transactions)))
+	insert('NODE_CHECKPOINTS', (('c%d' % i, payload(rng, blob_size)) for i in range(max(transactions // 100, 1))))
+	insert('NODE_SCHEDULED_STATES', ((0, tx_id(t), timestamp(t + 3600)) for t in range(0, transactions, 100)))
+	insert('VAULT_TRANSACTION_NOTES', ((t, 'note %d' % t, tx_id(t)) for t in range(0, transactions, 100)))
+	insert('NODE_ATTACHMENTS', (('a%d' % i, payload(rng, 65536), 'contract%d.jar' % i, timestamp(i), 'app', 1) for i in range(10)))
+	insert('NODE_ATTACHMENTS_CONTRACTS', (('a%d' % i, IOU) for i in range(10)))
+	insert('NODE_CONTRACT_UPGRADES', [])
+	insert('NODE_IDENTITIES', (('K%d' % i, payload(rng, 1024)) for i in range(len(PARTIES))))
+	insert('NODE_NAMED_IDENTITIES', ((party, 'K%d' % i) for i, party in enumerate(PARTIES)))
+	insert('NODE_INFOS', ((i, '%064X' % i, 4, 1) for i in range(len(PARTIES))))
+	insert('NODE_INFO_HOSTS', (('localhost', 10000 + i, i, i) for i in range(len(PARTIES))))
+	insert('NODE_INFO_PARTY_CERT', ((party, True, 'K%d' % i, payload(rng, 1024)) for i, party in enumerate(PARTIES)))
+	insert('NODE_LINK_NODEINFO_PARTY', ((i, party) for i, party in enumerate(PARTIES)))
+	insert('NODE_OUR_KEY_PAIRS', [('K0', payload(rng, 128), payload(rng, 64))])
+	insert('NODE_PROPERTIES', [('flowsDrainingModeEnabled', 'false')])
+	insert('NODE_MESSAGE_RETRY', [])
+	conn.commit()
+	conn.close()
+	return path
+
+def main():
+	parser = argparse.ArgumentParser(description='Writes a synthetic Corda node database')
+	parser.add_argument('path')
+	parser.add_argument('--states', type=int, default=10000)
+	parser.add_argument('--blob-size', type=int, default=2048)
+	parser.add_argument('--seed', type=int, default=0)
+	args = parser.parse_args()
+	create_synthetic_db(args.path, args.states, args.blob_size, args.seed)
+
+if __name__ == '__main__':
+	main()
@@ -1,2 +1,28 @@
-from .core import Node, H2Tools
-from .stats import Plotter
+import importlib
+
+# Public names and the submodules defining them. Submodules are imported on
+# first access (PEP 562), so `import pycorda` loads neither pandas nor the JDBC,
+# plotting or machine learning dependencies until they are needed.
+_EXPORTS = {
+	'Node': 'core',
+	'H2Tools': 'core',
+	'VaultSync': 'vault',
+	'VaultIndex': 'vault',
+	'TransactionGraph': 'graph',
+	'OfflineNode': 'offline',
+	'SnapshotNode': 'snapshot',
+	'Fleet': 'fleet',
+	'Plotter': 'stats',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+	if name in _EXPORTS:
+		value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+		globals()[name] = value
+		return value
+	raise AttributeError("module 'pycorda' has no attribute " + repr(name))
+
+def __dir__():
+	return sorted(set(globals()) | set(__all__))
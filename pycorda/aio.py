@@ -0,0 +1,94 @@
+import asyncio
+import time
+import pandas as pd
+from .metrics import METRIC_NIDS, SNAPSHOT_METRICS, bulk_read_request, name_nodes, responses_by_mbean
+
+class AsyncNodeMetrics(object):
+	"""Polls the Jolokia metrics of many nodes concurrently with asyncio
+
+	Each node is read with one Jolokia bulk request posted directly to its
+	agent, which must be reachable from here, see Node.jolokia_read_many. A
+	sweep reads all nodes with at most concurrency requests in flight. A node
+	that fails or times out is reported in the result instead of failing the
+	sweep. Requires aiohttp.
+
+	Use it as an async context manager to keep connections alive between sweeps:
+
+	    async with AsyncNodeMetrics(agents) as fleet_metrics:
+	        while True:
+	            df = await fleet_metrics.sweep()
+	"""
+
+	def __init__(self, agents, metrics=None, concurrency=10, timeout=3):
+		"""
+        Parameters
+        ----------
+        agents : dict or list
+            node name to Jolokia agent url (the node_root of pycorda.Node),
+            or pycorda.Node objects with a node root set and distinct names.
+            Nodes without a name are named by their position
+        metrics : list, optional
+            names from metrics.METRIC_NIDS, defaults to metrics.SNAPSHOT_METRICS
+        concurrency : int
+            maximum number of nodes read at the same time
+        timeout : float
+            seconds allowed for reading one node
+        """
+		if not isinstance(agents, dict):
+			agents = list(agents)
+			agents = dict(zip(name_nodes(agents), [node._node_root for node in agents]))
+		self.agents = agents
+		self.nids = [METRIC_NIDS[metric] for metric in (metrics or SNAPSHOT_METRICS)]
+		self.concurrency = concurrency
+		self.timeout = timeout
+		self._session = None
+
+	async def __aenter__(self):
+		import aiohttp
+		self._session = aiohttp.ClientSession()
+		return self
+
+	async def __aexit__(self, *exc_info):
+		await self._session.close()
+		self._session = None
+
+	async def _read_node(self, session, semaphore, name, agent_url):
+		import aiohttp
+		async with semaphore:
+			start = time.perf_counter()
+			try:
+				async with session.post(agent_url + 'jolokia/', json=bulk_read_request(self.nids),
+						timeout=aiohttp.ClientTimeout(total=self.timeout)) as resp:
+					responses = responses_by_mbean(self.nids, await resp.json(content_type=None))
+			except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as e:
+				error = str(e) or type(e).__name__
+				return [[name, None, None, None, error, time.perf_counter() - start]]
+			seconds = time.perf_counter() - start
+			return [[name, nid, response.get('status'), response.get('value'), response.get('error'), seconds]
+				for nid, response in responses.items()]
+
+	async def sweep(self):
+		"""Reads every node once
+
+		Returns
+        -------
+        pandas.DataFrame
+            one row per node and MBean with NODE, MBEAN, STATUS, VALUE, ERROR
+            and SECONDS columns. A node that could not be read has a single
+            row with its ERROR and no MBEAN
+		"""
+		import aiohttp
+		session = self._session or aiohttp.ClientSession()
+		semaphore = asyncio.Semaphore(self.concurrency)
+		try:
+			results = await asyncio.gather(*[self._read_node(session, semaphore, name, url)
+				for name, url in self.agents.items()])
+		finally:
+			if session is not self._session:
+				await session.close()
+		rows = [row for result in results for row in result]
+		return pd.DataFrame(rows, columns=['NODE', 'MBEAN', 'STATUS', 'VALUE', 'ERROR', 'SECONDS'])
+
+	def run_sweep(self):
+		"""Runs sweep from synchronous code"""
+		return asyncio.run(self.sweep())
@@ -0,0 +1,303 @@
+import itertools
+import re
+import threading
+import pandas as pd
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+from .columnar import read_result_set
+from .instrument import phase
+from .query import check_time_unit
+
+# Queries are built with ? placeholders (see query.build_select) and each
+# backend converts them to the paramstyle of its driver in prepare().
+
+class Backend(object):
+	"""Database access beneath Node
+
+	A backend opens DB-API connections and reads queries into dataframes.
+	Node pools the connections and builds the queries.
+	"""
+
+	def __init__(self, url):
+		self.url = url
+
+	def connect(self):
+		"""Returns a new DB-API connection, raising OSError if the database cannot be reached"""
+		raise NotImplementedError
+
+	def prepare(self, sql):
+		"""Converts an SQL statement with ? placeholders to the driver's paramstyle"""
+		return sql
+
+	def _columns(self, curs):
+		return [desc[0] for desc in curs.description]
+
+	def time_bucket(self, column, unit):
+		"""Returns an SQL expression truncating a timestamp column to the start of its minute, hour or day"""
+		return "DATE_TRUNC('" + check_time_unit(unit).upper() + "', " + column + ")"
+
+	def read_df(self, conn, sql, params):
+		"""Runs a query and returns all rows as a dataframe"""
+		curs = conn.cursor()
+		try:
+			with phase('execute'):
+				curs.execute(self.prepare(sql), params)
+			with phase('fetch'):
+				rows = curs.fetchall()
+			with phase('frame'):
+				return pd.DataFrame(rows, columns=self._columns(curs))
+		finally:
+			curs.close()
+
+	def _fetch_frames(self, curs, chunksize):
+		"""Yields the rows of an executed cursor as dataframes of at most chunksize rows"""
+		columns = self._columns(curs)
+		while True:
+			with phase('fetch'):
+				rows = curs.fetchmany(chunksize)
+			if not rows:
+				break
+			with phase('frame'):
+				df = pd.DataFrame(rows, columns=columns)
+			yield df
+
+	def iter_df(self, conn, sql, params, chunksize):
+		"""Runs a query and yields its rows as dataframes of at most chunksize rows"""
+		curs = conn.cursor()
+		try:
+			with phase('execute'):
+				curs.execute(self.prepare(sql), params)
+			for df in self._fetch_frames(curs, chunksize):
+				yield df
+		finally:
+			curs.close()
+
+	def copy_table(self, conn, sql, params, fileobj, format='csv'):
+		"""Writes the result of a query to a binary file object
+
+		The generic implementation only writes CSV, reading the rows in chunks.
+		"""
+		if format != 'csv':
+			raise ValueError(type(self).__name__ + ' only supports csv exports')
+		for i, chunk in enumerate(self.iter_df(conn, sql, params, 50000)):
+			fileobj.write(chunk.to_csv(index=False, header=(i == 0)).encode('utf-8'))
+
+_jvm_lock = threading.Lock()
+_jvm_ready = threading.Event()
+
+class H2Backend(Backend):
+	"""H2 database over JDBC through jaydebeapi and JPype
+
+	Results are converted column by column from the JDBC result set into
+	typed arrays, see columnar.read_result_set, instead of through
+	jaydebeapi's row by row fetch. The result set is a private attribute of
+	jaydebeapi's cursor, so without it rows are fetched through DB-API.
+	"""
+
+	def __init__(self, url, username, password, path_to_jar='./h2.jar'):
+		Backend.__init__(self, url)
+		self.credentials = [username, password]
+		self.path_to_jar = path_to_jar
+
+	def connect(self):
+		if _jvm_ready.is_set():
+			return self._connect()
+		# jaydebeapi starts the JVM on first connect without a lock, and threads
+		# losing that race fail, so connections wait until one has started it
+		with _jvm_lock:
+			conn = self._connect()
+			if threading.current_thread() is not threading.main_thread():
+				# The thread that started the JVM is attached as a user thread
+				import jpype
+				jpype.java.lang.Thread.detach()
+				jpype.java.lang.Thread.attachAsDaemon()
+			_jvm_ready.set()
+			return conn
+
+	def _connect(self):
+		# The Java bridge is imported here so that offline use of pycorda never starts a JVM
+		import jaydebeapi
+		import jpype
+		from jpype import JException
+		if jpype.isJVMStarted() and not jpype.isThreadAttachedToJVM():
+			# jaydebeapi attaches other threads as user threads, which keep the
+			# JVM, and so the process, from exiting
+			jpype.java.lang.Thread.attachAsDaemon()
+		try:
+			return jaydebeapi.connect(
+				"org.h2.Driver",
+				self.url,
+				self.credentials,
+				self.path_to_jar,
+			)
+		except TypeError as e:
+			raise OSError('path to jar is invalid')
+		except JException as e:
+			raise OSError('cannot connect to ' + self.url)
+
+	def _result_frames(self, curs, sql, params, chunksize):
+		with phase('execute'):
+			curs.execute(self.prepare(sql), params)
+		rs, meta = getattr(curs, '_rs', None), getattr(curs, '_meta', None)
+		if rs is None or meta is None:
+			return self._fetch_frames(curs, chunksize)
+		return read_result_set(rs, meta, chunksize)
+
+	def read_df(self, conn, sql, params):
+		curs = conn.cursor()
+		try:
+			frames = list(self._result_frames(curs, sql, params, 65536))
+			if not frames:
+				return pd.DataFrame(columns=self._columns(curs))
+			if len(frames) == 1:
+				return frames[0]
+			with phase('frame'):
+				return pd.concat(frames, ignore_index=True)
+		finally:
+			curs.close()
+
+	def iter_df(self, conn, sql, params, chunksize):
+		curs = conn.cursor()
+		try:
+			for df in self._result_frames(curs, sql, params, chunksize):
+				if len(df):
+					yield df
+		finally:
+			curs.close()
+
+# Single quoted literals and double quoted identifiers, with their doubled quotes
+_QUOTED = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+
+class PostgresBackend(Backend):
+	"""PostgreSQL through the native psycopg2 driver
+
+	Chunked reads use server-side cursors, so rows are streamed from the
+	server instead of being buffered on the client. copy_table uses
+	COPY ... TO STDOUT, including the binary format.
+	"""
+
+	_cursor_ids = itertools.count()
+
+	def __init__(self, url, username, password):
+		"""
+        Parameters
+        ----------
+        url : str
+            jdbc:postgresql://host:port/database or postgresql://host:port/database.
+            A currentSchema query parameter sets the search path
+        username : str
+            username of database user
+        password : str
+            password of database user
+        """
+		Backend.__init__(self, url)
+		self.username = username
+		self.password = password
+
+	def _connect_args(self):
+		parts = urlsplit(self.url[len('jdbc:'):] if self.url.startswith('jdbc:') else self.url)
+		query = parse_qs(parts.query)
+		args = {'dsn': urlunsplit(('postgresql', parts.netloc, parts.path, '', ''))}
+		if self.username:
+			args['user'] = self.username
+		if self.password:
+			args['password'] = self.password
+		if 'currentSchema' in query:
+			args['options'] = '-c search_path=' + query['currentSchema'][0]
+		return args
+
+	def connect(self):
+		import psycopg2
+		try:
+			conn = psycopg2.connect(**self._connect_args())
+		except psycopg2.OperationalError as e:
+			raise OSError('cannot connect to ' + self.url)
+		conn.set_session(readonly=True)
+		return conn
+
+	def prepare(self, sql):
+		# A ? inside a quoted literal or identifier, e.g. of a str where, is not a placeholder
+		parts = _QUOTED.split(sql.replace('%', '%%'))
+		return ''.join(part if i % 2 else part.replace('?', '%s') for i, part in enumerate(parts))
+
+	def _columns(self, curs):
+		# Corda creates unquoted table and column names, which PostgreSQL folds to lower case
+		return [desc[0].upper() for desc in curs.description]
+
+	def read_df(self, conn, sql, params):
+		try:
+			return Backend.read_df(self, conn, sql, params)
+		finally:
+			conn.rollback()
+
+	def iter_df(self, conn, sql, params, chunksize):
+		curs = conn.cursor(name='pycorda_' + str(next(self._cursor_ids)))
+		curs.itersize = chunksize
+		try:
+			with phase('execute'):
+				curs.execute(self.prepare(sql), params)
+			columns = None
+			while True:
+				with phase('fetch'):
+					rows = curs.fetchmany(chunksize)
+				if columns is None:
+					# A named cursor only has a description after the first fetch
+					columns = self._columns(curs)
+				if not rows:
+					break
+				with phase('frame'):
+					df = pd.DataFrame(rows, columns=columns)
+				yield df
+		finally:
+			curs.close()
+			conn.rollback()
+
+	def copy_table(self, conn, sql, params, fileobj, format='csv'):
+		if format not in ('csv', 'binary'):
+			raise ValueError('format must be csv or binary')
+		curs = conn.cursor()
+		try:
+			query = curs.mogrify(self.prepare(sql), params).decode(conn.encoding)
+			options = 'FORMAT csv, HEADER' if format == 'csv' else 'FORMAT binary'
+			curs.copy_expert('COPY (' + query + ') TO STDOUT WITH (' + options + ')', fileobj)
+		finally:
+			curs.close()
+			conn.rollback()
+
+class SQLiteBackend(Backend):
+	"""SQLite database file, used as a stand-in for tests and benchmarks"""
+
+	def __init__(self, url):
+		"""
+        Parameters
+        ----------
+        url : str
+            sqlite:///path/to/file.db or a plain file path
+        """
+		Backend.__init__(self, url)
+		path = url[len('sqlite:'):] if url.startswith('sqlite:') else url
+		if path.startswith('//'):
+			path = path[2:]
+		self.path = path
+
+	def time_bucket(self, column, unit):
+		formats = {'minute': '%Y-%m-%d %H:%M:00', 'hour': '%Y-%m-%d %H:00:00', 'day': '%Y-%m-%d 00:00:00'}
+		return "STRFTIME('" + formats[check_time_unit(unit)] + "', " + column + ")"
+
+	def connect(self):
+		import sqlite3
+		try:
+			return sqlite3.connect(self.path, check_same_thread=False)
+		except sqlite3.Error as e:
+			raise OSError('cannot connect to ' + self.url)
+
+def backend_for_url(url, username, password, path_to_jar='./h2.jar'):
+	"""Returns the backend for a database url
+
+	PostgreSQL urls (jdbc:postgresql:, postgresql:, postgres:) use PostgresBackend,
+	sqlite: urls use SQLiteBackend and anything else is opened through JDBC as H2.
+	"""
+	if url.startswith(('jdbc:postgresql:', 'postgresql:', 'postgres:')):
+		return PostgresBackend(url, username, password)
+	if url.startswith('sqlite:'):
+		return SQLiteBackend(url)
+	return H2Backend(url, username, password, path_to_jar)
@@ -0,0 +1,319 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+import pandas as pd
+from .instrument import Registry
+from .query import TIME_UNITS, check_time_unit
+from .schema import BLOB_COLUMNS, SNAPSHOT_TABLES, apply_dtypes
+
+class BaseNode(object):
+	"""Tables of a Corda node as pandas dataframes
+
+	Subclasses provide _get_df, which reads a table from a live database or
+	from local files. The get_tbname, find_* and snapshot methods are
+	built on it.
+	"""
+
+	# --- Notes regarding get methods ---
+	# If table names will change often, it may be worth to
+	# dynamically generate methods with some careful metaprogramming
+
+	_name = ''
+	_instruments = None
+	_instruments_lock = threading.Lock()
+
+	def set_name(self,name):
+		self._name = name
+
+	@property
+	def instruments(self):
+		"""The pycorda.instrument.Registry recording this node's table reads and HTTP calls"""
+		if self._instruments is None:
+			with self._instruments_lock:
+				if self._instruments is None:
+					self._instruments = Registry()
+		return self._instruments
+
+	def stats(self):
+		"""Returns calls, rows, bytes, latencies and query phase times per instrumented method and table
+
+		See pycorda.instrument. Use node.instruments.spans() for the individual
+		calls and node.instruments.add_exporter to export them.
+		"""
+		return self.instruments.summary()
+
+	def _get_df(self, table_name, where=None, params=None, limit=None, chunksize=None, exclude=None, columns=None):
+		raise NotImplementedError
+
+	def _get_table(self, table_name, where=None, params=None, limit=None, chunksize=None, include_blobs=False, columns=None):
+		"""_get_df with the column types of the schema maps applied
+
+		Timestamps become datetime64 and low-cardinality columns categoricals,
+		see schema.apply_dtypes. The blob columns in schema.BLOB_COLUMNS are
+		not read unless include_blobs is True or they are named in columns.
+
+		The get_tbname methods take the same arguments:
+
+		Parameters
+        ----------
+        where : dict or str, optional
+            column to value filters, or on a database an SQL predicate with
+            ? placeholders, see query.build_select
+        params : list, optional
+            parameters for the placeholders of a str where
+        limit : int, optional
+            maximum number of rows to fetch
+        chunksize : int, optional
+            if given, returns a generator of dataframes of at most chunksize rows
+        include_blobs : bool
+            also read serialized payloads such as CHECKPOINT_VALUE
+        columns : list, optional
+            columns to read, defaults to all of them
+		"""
+		kwargs = {}
+		if columns is not None:
+			kwargs['columns'] = list(columns)
+		elif not include_blobs and table_name in BLOB_COLUMNS:
+			kwargs['exclude'] = BLOB_COLUMNS[table_name]
+		df = self._get_df(table_name, where=where, params=params, limit=limit, chunksize=chunksize, **kwargs)
+		if chunksize is not None:
+			return (apply_dtypes(table_name, chunk) for chunk in df)
+		return apply_dtypes(table_name, df)
+
+	def _concurrency(self):
+		"""Number of tables that can be read at the same time"""
+		return 1
+
+	def iter_table(self, table_name, chunksize=50000, where=None, include_blobs=False, columns=None):
+		"""Yields dataframes of at most chunksize rows from a table
+
+		Only one chunk is converted and held in memory at a time.
+
+		Parameters
+        ----------
+        table_name : str
+            name of table in database
+        chunksize : int
+            maximum number of rows per dataframe
+        where : dict, optional
+            column to value filters
+        include_blobs : bool
+            also read serialized payloads such as CHECKPOINT_VALUE, see schema.BLOB_COLUMNS
+        columns : list, optional
+            columns to read, defaults to all of them
+		"""
+		return self._get_table(table_name, where=where, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_attachments(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_ATTACHMENTS", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_attachments_contracts(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_ATTACHMENTS_CONTRACTS", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_checkpoints(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_CHECKPOINTS", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_contract_upgrades(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_CONTRACT_UPGRADES", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_indentities(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_IDENTITIES", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_infos(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_INFOS", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_info_hosts(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_INFO_HOSTS", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_info_party_cert(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_INFO_PARTY_CERT", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_link_nodeinfo_party(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_LINK_NODEINFO_PARTY", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_message_ids(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_MESSAGE_IDS", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_message_retry(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_MESSAGE_RETRY", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_named_identities(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_NAMED_IDENTITIES", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_our_key_pairs(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_OUR_KEY_PAIRS", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_properties(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_PROPERTIES", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_scheduled_states(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_SCHEDULED_STATES", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_transactions(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_TRANSACTIONS", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_node_transaction_mappings(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("NODE_TRANSACTION_MAPPINGS", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_vault_fungible_states(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("VAULT_FUNGIBLE_STATES", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_vault_fungible_states_parts(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("VAULT_FUNGIBLE_STATES_PARTS", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_vault_linear_states(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("VAULT_LINEAR_STATES", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_vault_linear_states_parts(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("VAULT_LINEAR_STATES_PARTS", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_vault_states(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("VAULT_STATES", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_vault_transaction_notes(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("VAULT_TRANSACTION_NOTES", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def get_state_party(self, chunksize=None, include_blobs=False, columns=None, where=None, params=None, limit=None):
+		return self._get_table("STATE_PARTY", where=where, params=params, limit=limit, chunksize=chunksize, include_blobs=include_blobs, columns=columns)
+
+	def _snapshot_headers(self,header):
+		return '\r\n\r\n -----------------  ' + header + ' \r\n'
+
+	def find_transactions_by_linear_id(self,linear_id):
+		return self._get_table("VAULT_LINEAR_STATES", where={'UUID': linear_id})
+	
+	def find_vault_states_by_transaction_id(self,tx_id):
+		return self._get_table("VAULT_STATES", where={'TRANSACTION_ID': tx_id})
+
+	def find_vault_fungible_states_by_transaction_id(self,tx_id):
+		return self._get_table("VAULT_FUNGIBLE_STATES", where={'TRANSACTION_ID': tx_id})
+
+	def find_vault_fungible_states_by_issuer(self,issuer):
+		return self._get_table("VAULT_FUNGIBLE_STATES", where={'ISSUER_NAME': issuer})
+
+
+	def find_unconsumed_states_by_contract_state(self,contract_state_class_name):
+		return self._get_table("VAULT_STATES", where={
+			'CONSUMED_TIMESTAMP': None,
+			'CONTRACT_STATE_CLASS_NAME': contract_state_class_name,
+		})
+
+	def find_linear_id_by_transaction_id(self,tx_id):
+		linear = self._get_table("VAULT_LINEAR_STATES", where={'TRANSACTION_ID': tx_id}, limit=1)
+		return linear.iloc[0]['LINEAR_ID']
+
+	def fungible_quantity_series(self,contract,unit=None):
+		"""Returns the quantities of a contract's fungible states by recorded time
+
+		Parameters
+        ----------
+        contract : str
+            contract state class name, e.g. net.corda.finance.contracts.asset.Cash$State
+        unit : str, optional
+            minute, hour or day. If given, QUANTITY is summed per unit of time
+
+        Returns
+        -------
+        pandas.DataFrame
+            RECORDED_TIMESTAMP and QUANTITY columns ordered by time
+		"""
+		vault_states = self.get_vault_states(columns=['TRANSACTION_ID','OUTPUT_INDEX','RECORDED_TIMESTAMP'],
+			where={'CONTRACT_STATE_CLASS_NAME': contract})
+		vault_fungible_states = self.get_vault_fungible_states(columns=['TRANSACTION_ID','OUTPUT_INDEX','QUANTITY'])
+		df = vault_states.merge(vault_fungible_states)[['RECORDED_TIMESTAMP','QUANTITY']]
+		if unit is not None:
+			buckets = df['RECORDED_TIMESTAMP'].dt.floor(TIME_UNITS[check_time_unit(unit)])
+			df = df.groupby(buckets)['QUANTITY'].sum().reset_index()
+		return df.sort_values('RECORDED_TIMESTAMP', kind='stable').reset_index(drop=True)
+
+	def checkpoint_sizes(self,workers=None,chunksize=1000):
+		"""Returns the size breakdown of each checkpoint, largest first, to find oversized flows
+
+		The CHECKPOINT_VALUE blobs are decoded on a process pool by
+		serialization.decode_table, see serialization.decode_blob for the columns.
+
+		Parameters
+        ----------
+        workers : int, optional
+            number of processes, defaults to the number of CPUs
+        chunksize : int
+            checkpoints read and decoded at a time
+		"""
+		from .serialization import decode_table
+		df = decode_table(self, 'NODE_CHECKPOINTS', workers=workers, chunksize=chunksize)
+		return df.sort_values('SIZE', ascending=False, kind='stable').reset_index(drop=True)
+
+	def transaction_sizes(self,workers=None,chunksize=1000):
+		"""Returns the size breakdown and class names of each serialized transaction, largest first
+
+		Parameters
+        ----------
+        workers : int, optional
+            number of processes, defaults to the number of CPUs
+        chunksize : int
+            transactions read and decoded at a time
+		"""
+		from .serialization import decode_table
+		df = decode_table(self, 'NODE_TRANSACTIONS', workers=workers, chunksize=chunksize)
+		return df.sort_values('SIZE', ascending=False, kind='stable').reset_index(drop=True)
+
+	def _timed_get_df(self, table_name):
+		start = time.perf_counter()
+		df = self._get_df(table_name)
+		return df, time.perf_counter() - start
+
+	def generate_snapshot(self,filename=None,tables=None,workers=None):
+		"""Writes a text dump of the node tables and returns per-table timings
+
+		Tables are read concurrently over the connection pool while the ones
+		already fetched are formatted and written in order.
+
+		Parameters
+        ----------
+        filename : str, optional
+            output file, defaults to NAME-pycorda-snapshot-DATE-TIME.log
+        tables : list, optional
+            table names to dump, defaults to schema.SNAPSHOT_TABLES
+        workers : int, optional
+            number of tables read at the same time, defaults to the pool size
+
+        Returns
+        -------
+        pandas.DataFrame
+            TABLE, ROWS, FETCH_SECONDS and WRITE_SECONDS of each table
+		"""
+		if filename == None:
+			filename = time.strftime(self._name+'-pycorda-snapshot-%Y%m%d-%H%M%S.log')
+		if tables is None:
+			tables = SNAPSHOT_TABLES
+		if workers is None:
+			workers = self._concurrency()
+		timings = []
+		with open(filename,"w+") as f, ThreadPoolExecutor(max_workers=workers) as executor:
+			pending = deque()
+			remaining = iter(tables)
+			# Only a window of tables is fetched ahead, which bounds memory use
+			for table_name in islice(remaining, workers):
+				pending.append((table_name, executor.submit(self._timed_get_df, table_name)))
+			while pending:
+				table_name, future = pending.popleft()
+				df, fetch_seconds = future.result()
+				for next_table in islice(remaining, 1):
+					pending.append((next_table, executor.submit(self._timed_get_df, next_table)))
+				start = time.perf_counter()
+				f.write(self._snapshot_headers(table_name))
+				df.to_string(buf=f)
+				timings.append([table_name, len(df), fetch_seconds, time.perf_counter() - start])
+		return pd.DataFrame(timings, columns=['TABLE','ROWS','FETCH_SECONDS','WRITE_SECONDS'])
+
+	def export_snapshot(self,path,tables=None,resume=False,chunksize=50000):
+		"""Writes the node tables to a compressed Parquet snapshot directory
+
+		The snapshot records row counts and checksums, can be resumed after an
+		interruption and can be loaded back with pycorda.SnapshotNode.
+		See snapshot.write_snapshot for the parameters.
+		"""
+		from .snapshot import write_snapshot
+		return write_snapshot(self, path, tables=tables, resume=resume, chunksize=chunksize)
@@ -0,0 +1,103 @@
+import os
+import time
+import warnings
+
+# Tables that only change when the network map or the installed CorDapps change
+DEFAULT_TTLS = {
+	'NODE_ATTACHMENTS_CONTRACTS': 3600,
+	'NODE_INFOS': 3600,
+	'NODE_INFO_HOSTS': 3600,
+	'NODE_INFO_PARTY_CERT': 3600,
+	'NODE_LINK_NODEINFO_PARTY': 3600,
+	'NODE_PROPERTIES': 3600,
+}
+
+_EXTENSIONS = {'arrow': '.arrow', 'parquet': '.parquet'}
+
+class TableCache(object):
+	"""Local columnar cache of whole node tables
+
+	Each table is stored as an Arrow IPC or Parquet file in directory and is
+	served from disk until its TTL expires. Tables without a TTL are not cached.
+	Use one directory per node. Requires pyarrow.
+	"""
+
+	def __init__(self, directory, ttls=None, default_ttl=0, format='arrow'):
+		"""
+        Parameters
+        ----------
+        directory : str
+            folder the table files are stored in, created if missing
+        ttls : dict, optional
+            table name to time to live in seconds, defaults to DEFAULT_TTLS
+        default_ttl : float
+            time to live in seconds of tables not in ttls, 0 disables caching them
+        format : str
+            'arrow' for memory-mapped Arrow IPC files or 'parquet'
+        """
+		if format not in _EXTENSIONS:
+			raise ValueError('format must be one of ' + ', '.join(_EXTENSIONS))
+		self.directory = directory
+		self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+		self.default_ttl = default_ttl
+		self.format = format
+		os.makedirs(directory, exist_ok=True)
+
+	def ttl(self, table_name):
+		return self.ttls.get(table_name, self.default_ttl)
+
+	def set_ttl(self, table_name, ttl):
+		self.ttls[table_name] = ttl
+
+	def _path(self, table_name):
+		return os.path.join(self.directory, table_name + _EXTENSIONS[self.format])
+
+	def get(self, table_name):
+		"""Returns the cached dataframe for table_name, or None if it is missing or expired"""
+		ttl = self.ttl(table_name)
+		path = self._path(table_name)
+		if not ttl or not os.path.exists(path):
+			return None
+		if time.time() - os.path.getmtime(path) > ttl:
+			return None
+		import pyarrow as pa
+		if self.format == 'arrow':
+			with pa.memory_map(path) as source:
+				table = pa.ipc.open_file(source).read_all()
+		else:
+			import pyarrow.parquet as pq
+			table = pq.read_table(path, memory_map=True)
+		return table.to_pandas()
+
+	def put(self, table_name, df):
+		"""Stores df as the cached copy of table_name if the table has a TTL"""
+		if not self.ttl(table_name):
+			return
+		import pyarrow as pa
+		path = self._path(table_name)
+		tmp_path = path + '.tmp'
+		try:
+			table = pa.Table.from_pandas(df, preserve_index=False)
+		except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+			warnings.warn('cannot cache ' + table_name + ': ' + str(e))
+			return
+		if self.format == 'arrow':
+			with pa.OSFile(tmp_path, 'wb') as sink:
+				with pa.ipc.new_file(sink, table.schema) as writer:
+					writer.write_table(table)
+		else:
+			import pyarrow.parquet as pq
+			pq.write_table(table, tmp_path)
+		# Readers never see a partially written file
+		os.replace(tmp_path, path)
+
+	def invalidate(self, table_name=None):
+		"""Removes the cached copy of table_name, or of every table if table_name is None"""
+		if table_name is None:
+			names = [name for name in os.listdir(self.directory) if name.endswith(_EXTENSIONS[self.format])]
+		else:
+			names = [table_name + _EXTENSIONS[self.format]]
+		for name in names:
+			path = os.path.join(self.directory, name)
+			if os.path.exists(path):
+				os.remove(path)
@@ -0,0 +1,85 @@
+import threading
+import time
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from . import instrument
+
+class HttpClient(object):
+	"""Keep-alive HTTP session used by Node for the web server proxy and Jolokia
+
+	Connections are pooled per host. Failed connections are retried with
+	exponential backoff, as are GET requests answered with 502, 503 or 504.
+	POST requests are only retried when the connection could not be made,
+	so Jolokia operations are never executed twice. Every call is timed
+	per endpoint, see latency.
+	"""
+
+	def __init__(self, timeout=3, retries=2, backoff_factor=0.2, pool_maxsize=10):
+		"""
+        Parameters
+        ----------
+        timeout : float
+            seconds to wait for a connection and for each read
+        retries : int
+            maximum number of retries of a request
+        backoff_factor : float
+            retry n waits backoff_factor * 2 ** (n - 1) seconds
+        pool_maxsize : int
+            maximum number of kept-alive connections per host
+        """
+		self.timeout = timeout
+		retry = Retry(
+			total=retries,
+			connect=retries,
+			read=retries,
+			status=retries,
+			backoff_factor=backoff_factor,
+			status_forcelist=(502, 503, 504),
+			raise_on_status=False,
+		)
+		adapter = HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry)
+		self.session = requests.Session()
+		self.session.mount('http://', adapter)
+		self.session.mount('https://', adapter)
+		self._latency = {}
+		self._lock = threading.Lock()
+
+	def _record(self, endpoint, seconds, failed):
+		with self._lock:
+			calls, errors, total, worst = self._latency.get(endpoint, (0, 0, 0.0, 0.0))
+			self._latency[endpoint] = (calls + 1, errors + failed, total + seconds, max(worst, seconds))
+
+	def request(self, method, url, endpoint=None, **kwargs):
+		"""Sends a request on the pooled session and records its latency under endpoint"""
+		kwargs.setdefault('timeout', self.timeout)
+		start = time.perf_counter()
+		failed = True
+		try:
+			resp = self.session.request(method, url, **kwargs)
+			failed = resp.status_code >= 400
+			instrument.annotate(bytes=len(resp.content))
+			return resp
+		finally:
+			self._record(endpoint or url, time.perf_counter() - start, failed)
+
+	def get(self, url, endpoint=None, **kwargs):
+		return self.request('GET', url, endpoint, **kwargs)
+
+	def post(self, url, endpoint=None, **kwargs):
+		return self.request('POST', url, endpoint, **kwargs)
+
+	def latency(self):
+		"""Returns a dataframe of call counts, errors and latencies in milliseconds per endpoint"""
+		with self._lock:
+			rows = [[endpoint, calls, errors, 1000 * total / calls, 1000 * worst]
+				for endpoint, (calls, errors, total, worst) in sorted(self._latency.items())]
+		return pd.DataFrame(rows, columns=['ENDPOINT', 'CALLS', 'ERRORS', 'MEAN_MS', 'MAX_MS'])
+
+	def reset_latency(self):
+		with self._lock:
+			self._latency = {}
+
+	def close(self):
+		self.session.close()
@@ -0,0 +1,176 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from .metrics import METRIC_NIDS, SAMPLES, name_nodes, sample_value
+
+class RingBuffer(object):
+	"""Fixed-size buffer of (timestamp, value) samples backed by preallocated NumPy arrays
+
+	Once capacity samples have been appended, each new sample overwrites the oldest.
+	"""
+
+	def __init__(self, capacity):
+		if capacity < 1:
+			raise ValueError('capacity must be at least 1')
+		self.capacity = capacity
+		self._times = np.empty(capacity, dtype=np.float64)
+		self._values = np.empty(capacity, dtype=np.float64)
+		self._next = 0
+		self.count = 0
+
+	def append(self, timestamp, value):
+		self._times[self._next] = timestamp
+		self._values[self._next] = value
+		self._next = (self._next + 1) % self.capacity
+		self.count = min(self.count + 1, self.capacity)
+
+	def samples(self, window=None, now=None):
+		"""Returns the timestamps and values in order, optionally only those of the last window seconds"""
+		start = (self._next - self.count) % self.capacity
+		order = (start + np.arange(self.count)) % self.capacity
+		times, values = self._times[order], self._values[order]
+		if window is not None:
+			if now is None:
+				now = time.time()
+			recent = times >= now - window
+			times, values = times[recent], values[recent]
+		return times, values
+
+	def aggregate(self, window=None, now=None):
+		"""Returns count, min, max, mean, p50, p99, rate per second and last value of the samples"""
+		times, values = self.samples(window, now)
+		if len(values) == 0:
+			return {'COUNT': 0, 'MIN': np.nan, 'MAX': np.nan, 'MEAN': np.nan, 'P50': np.nan, 'P99': np.nan, 'RATE': np.nan, 'LAST': np.nan}
+		p50, p99 = np.percentile(values, [50, 99])
+		elapsed = times[-1] - times[0]
+		return {
+			'COUNT': len(values),
+			'MIN': values.min(),
+			'MAX': values.max(),
+			'MEAN': values.mean(),
+			'P50': p50,
+			'P99': p99,
+			'RATE': (values[-1] - values[0]) / elapsed if elapsed > 0 else np.nan,
+			'LAST': values[-1],
+		}
+
+class MetricsCollector(object):
+	"""Samples node metrics at a fixed interval into ring buffers
+
+	Every interval, each node is read with one Jolokia bulk request and every
+	sample in metrics.SAMPLES is appended to the RingBuffer of its node and
+	metric. Memory is bounded by capacity samples per buffer. errors counts,
+	per node, the reads that failed and the values that were not numbers.
+	"""
+
+	def __init__(self, nodes, samples=None, interval=10, capacity=8640):
+		"""
+        Parameters
+        ----------
+        nodes : list
+            pycorda.Node objects with a node root set, distinguished by name.
+            Nodes without a name are named by their position
+        samples : list, optional
+            names from metrics.SAMPLES, defaults to all of them
+        interval : float
+            seconds between samples
+        capacity : int
+            samples kept per node and metric, 8640 keeps a day at 10 seconds
+        """
+		self.nodes = list(nodes)
+		name_nodes(self.nodes)
+		self.samples = list(samples or SAMPLES)
+		self.interval = interval
+		self.buffers = dict(((node._name, sample), RingBuffer(capacity))
+			for node in self.nodes for sample in self.samples)
+		self.errors = dict((node._name, 0) for node in self.nodes)
+		self._nids = sorted(set(METRIC_NIDS[SAMPLES[sample][0]] for sample in self.samples))
+		self._lock = threading.Lock()
+		self._stop = threading.Event()
+		self._thread = None
+
+	def sample_once(self):
+		"""Reads every node once and appends the samples"""
+		for node in self.nodes:
+			try:
+				responses = node.jolokia_read_many(self._nids)
+			except OSError as e:
+				self.errors[node._name] += 1
+				continue
+			now = time.time()
+			with self._lock:
+				for sample in self.samples:
+					metric, path = SAMPLES[sample]
+					try:
+						value = sample_value(responses[METRIC_NIDS[metric]], path)
+					except (TypeError, ValueError):
+						# e.g. a gauge without a value yet, which must not stop the collector
+						self.errors[node._name] += 1
+						continue
+					if value is not None:
+						self.buffers[(node._name, sample)].append(now, value)
+
+	def _run(self):
+		while not self._stop.is_set():
+			start = time.time()
+			self.sample_once()
+			self._stop.wait(max(0, self.interval - (time.time() - start)))
+
+	def start(self):
+		"""Starts sampling on a background thread"""
+		if self._thread is not None:
+			raise RuntimeError('collector is already running')
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run, name='pycorda-metrics-collector', daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		"""Stops sampling and waits for the background thread to finish"""
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+
+	def aggregate(self, window=None):
+		"""Returns windowed aggregates per node and metric
+
+		Parameters
+        ----------
+        window : float, optional
+            only use the samples of the last window seconds
+
+        Returns
+        -------
+        pandas.DataFrame
+            NODE, METRIC, COUNT, MIN, MAX, MEAN, P50, P99, RATE and LAST columns
+		"""
+		now = time.time()
+		rows = []
+		with self._lock:
+			for (node_name, sample), buffer in self.buffers.items():
+				row = {'NODE': node_name, 'METRIC': sample}
+				row.update(buffer.aggregate(window, now))
+				rows.append(row)
+		return pd.DataFrame(rows, columns=['NODE', 'METRIC', 'COUNT', 'MIN', 'MAX', 'MEAN', 'P50', 'P99', 'RATE', 'LAST'])
+
+	def to_dataframe(self):
+		"""Returns every buffered sample with NODE, METRIC, TIMESTAMP and VALUE columns"""
+		frames = []
+		with self._lock:
+			for (node_name, sample), buffer in self.buffers.items():
+				times, values = buffer.samples()
+				frames.append(pd.DataFrame({
+					'NODE': node_name,
+					'METRIC': sample,
+					'TIMESTAMP': pd.to_datetime(times, unit='s'),
+					'VALUE': values,
+				}))
+		if not frames:
+			return pd.DataFrame({
+				'NODE': pd.Series([], dtype=object),
+				'METRIC': pd.Series([], dtype=object),
+				'TIMESTAMP': pd.Series([], dtype='datetime64[ns]'),
+				'VALUE': pd.Series([], dtype=np.float64),
+			})
+		return pd.concat(frames, ignore_index=True)
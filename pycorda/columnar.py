@@ -0,0 +1,136 @@
+"""Columnar conversion of JDBC result sets
+
+jaydebeapi converts a result set row by row, looking up the SQL type of every
+cell and building a tuple per row that pandas then scans again to infer column
+types. read_result_set resolves one typed getter per column up front and fills
+one NumPy array per column, so the dataframe is assembled from typed columns.
+
+Cells are still read one JDBC getter call at a time, JDBC has no call
+returning a column. What is saved is jaydebeapi's per-cell type dispatch,
+the row tuples and pandas' type inference. Nullable numeric columns only
+call wasNull for zeros, the value their getters return for NULL.
+"""
+import numpy as np
+import pandas as pd
+from .instrument import phase
+
+# java.sql.Types codes
+_INTEGER_TYPES = {-6, 5, 4, -5}               # TINYINT, SMALLINT, INTEGER, BIGINT
+_FLOAT_TYPES = {6, 7, 8}                       # FLOAT, REAL, DOUBLE
+_DECIMAL_TYPES = {2, 3}                        # NUMERIC, DECIMAL
+_BOOLEAN_TYPES = {-7, 16}                      # BIT, BOOLEAN
+_DATETIME_TYPES = {91, 93}                     # DATE, TIMESTAMP
+_BINARY_TYPES = {-2, -3, -4, 2004}             # BINARY, VARBINARY, LONGVARBINARY, BLOB
+
+# ResultSetMetaData.columnNoNulls
+_NO_NULLS = 0
+
+# Digits of the widest NUMERIC that fits in an int64
+_INT64_DIGITS = 18
+
+def column_kind(sql_type, scale=0, precision=0):
+	"""Returns how a column of a java.sql.Types code is read: int, decimal, float, bool, datetime, bytes or str
+
+	NUMERIC and DECIMAL columns without a scale are read as int if their
+	precision is known and fits in an int64, otherwise as decimal: through
+	getString into Python ints.
+	"""
+	if sql_type in _INTEGER_TYPES:
+		return 'int'
+	if sql_type in _DECIMAL_TYPES and scale == 0:
+		return 'int' if 0 < precision <= _INT64_DIGITS else 'decimal'
+	if sql_type in _FLOAT_TYPES or sql_type in _DECIMAL_TYPES:
+		return 'float'
+	if sql_type in _BOOLEAN_TYPES:
+		return 'bool'
+	if sql_type in _DATETIME_TYPES:
+		return 'datetime'
+	if sql_type in _BINARY_TYPES:
+		return 'bytes'
+	return 'str'
+
+class _Column(object):
+	"""Typed getter and NumPy buffer of one result set column"""
+
+	_DTYPES = {'int': np.int64, 'float': np.float64, 'bool': np.bool_}
+
+	def __init__(self, rs, index, kind, nullable):
+		self.index = index
+		self.kind = kind
+		# Primitive getters return 0 or false for NULL, so nullable columns check wasNull for those
+		self.check_null = nullable and kind in self._DTYPES
+		self.get = {
+			'int': rs.getLong,
+			'float': rs.getDouble,
+			'bool': rs.getBoolean,
+			'bytes': rs.getBytes,
+		}.get(kind, rs.getString)
+		self.was_null = rs.wasNull
+
+	def allocate(self, size):
+		self.values = np.empty(size, dtype=self._DTYPES.get(self.kind, object))
+		self.nulls = np.zeros(size, dtype=np.bool_) if self.check_null else None
+
+	def read(self, row):
+		value = self.get(self.index)
+		if self.check_null and not value and self.was_null():
+			self.nulls[row] = True
+		elif value is not None:
+			if self.kind == 'bytes':
+				value = bytes(value)
+			elif self.kind == 'decimal':
+				value = int(str(value))
+		self.values[row] = value
+
+	def to_series(self, rows):
+		values = self.values[:rows]
+		if self.nulls is not None and self.nulls[:rows].any():
+			nulls = self.nulls[:rows]
+			# Same types as pandas infers from Python values with None
+			if self.kind == 'bool':
+				values = values.astype(object)
+				values[nulls] = None
+			else:
+				values = values.astype(np.float64)
+				values[nulls] = np.nan
+		elif self.kind == 'datetime':
+			return pd.to_datetime(pd.Series(values), format='ISO8601')
+		return pd.Series(values)
+
+def read_result_set(rs, meta, chunksize=65536):
+	"""Yields dataframes of at most chunksize rows from a java.sql.ResultSet
+
+	Parameters
+    ----------
+    rs : java.sql.ResultSet
+        open result set, e.g. the _rs of an executed jaydebeapi cursor
+    meta : java.sql.ResultSetMetaData
+        its metadata
+    chunksize : int
+        rows converted at a time, also used as the JDBC fetch size
+	"""
+	count = meta.getColumnCount()
+	names = [str(meta.getColumnLabel(i)) for i in range(1, count + 1)]
+	columns = [_Column(rs, i, column_kind(meta.getColumnType(i), meta.getScale(i), meta.getPrecision(i)), meta.isNullable(i) != _NO_NULLS)
+		for i in range(1, count + 1)]
+	rs.setFetchSize(min(chunksize, 10000))
+	yielded = False
+	while True:
+		for column in columns:
+			column.allocate(chunksize)
+		rows = 0
+		with phase('fetch'):
+			while rows < chunksize and rs.next():
+				for column in columns:
+					column.read(rows)
+				rows += 1
+		if rows == 0 and yielded:
+			break
+		with phase('convert'):
+			series = dict((i, column.to_series(rows)) for i, column in enumerate(columns))
+		with phase('frame'):
+			df = pd.DataFrame(series).set_axis(names, axis=1)
+		yield df
+		yielded = True
+		if rows < chunksize:
+			break
@@ -1,16 +1,18 @@
 import os
 import pandas as pd
-import jaydebeapi
 import sys
 import requests
-import jks
 import base64, textwrap
-import time
 import warnings
 import json
-from jpype import JException
 from xml.etree import ElementTree
-from jolokia import JolokiaClient
+from .backends import backend_for_url
+from .base import BaseNode
+from .client import HttpClient
+from .instrument import first_argument, instrumented
+from .metrics import METRIC_NIDS, RPC_SERVER_NID, SNAPSHOT_METRICS, bulk_read_request, responses_by_mbean
+from .pool import ConnectionPool
+from .query import build_fungible_quantity, build_select
 
 class H2Tools(object):
 	def get_latest_version(self):
@@ -32,37 +34,35 @@ class H2Tools(object):
 		with open(filepath, 'wb') as jarfile:
 			jarfile.write(r.content)
 
-class Node(object):
-	"""Node object for connecting to H2 database and getting table dataframes
+class Node(BaseNode):
+	"""Node object for connecting to a node database and getting table dataframes
+
+	H2 is accessed over JDBC, PostgreSQL with the native psycopg2 driver.
 
 	Use get_tbname methods to get dataframe for table TBNAME. For example,
 	calling node.get_vault_states() will return the dataframe for VAULT_STATES.
 	After using the node, call the close() method to close the connection.
 	"""
 
-	# --- Notes for future support of PostgreSQL clients ---
-	# To support pg clients, url must be parsed into psycopg2.connect arguments
-	# and the password must not be empty
-	# After parsing, use "self._conn = psycopg2.connect(...)"
-
-	# --- Notes regarding get methods ---
-	# If table names will change often, it may be worth to
-	# dynamically generate methods with some careful metaprogramming
-
 	path_to_jar = None
 
-	def __init__(self, url, username, password, path_to_jar='./h2.jar',node_root=None,web_server_url=None,name=''):
+	def __init__(self, url, username, password, path_to_jar='./h2.jar',node_root=None,web_server_url=None,name='',pool_size=4,backend=None):
 		"""
         Parameters
         ----------
         url : str
-            JDBC url to be connected
+            JDBC url to be connected, or a postgresql:// or sqlite:// url
         username : str
             username of database user
         passowrd : str
             password of database user
         path_to_jar : str
         	path to h2 jar file
+        pool_size : int
+            maximum number of database connections used concurrently,
+            e.g. by generate_snapshot. Connections are opened on demand
+        backend : pycorda.backends.Backend, optional
+            database backend, chosen from url by default
         """
 
 		if self.path_to_jar:
@@ -74,41 +74,39 @@ class Node(object):
 
 		self.set_name(name)
 
-		try:
-			self._conn = jaydebeapi.connect(
-				"org.h2.Driver",
-				url,
-				[username, password],
-				self.path_to_jar,
-			)
-		except TypeError as e:
-			raise OSError('path to jar is invalid')
-		except JException as e:
-			raise OSError('cannot connect to ' + url)
-
-		self._curs = self._conn.cursor()
+		if backend is None:
+			backend = backend_for_url(url, username, password, self.path_to_jar)
+		self._backend = backend
+		self._pool = ConnectionPool(backend.connect, max_size=pool_size)
+		# Open the first connection now so that a bad url or jar fails here
+		self._pool.release(self._pool.acquire())
+		self._cache = None
+		self._column_names = {}
+		self._http = HttpClient()
+		self._web_server_url = None
+		self._jolokia_bulk = True
 		if  node_root != None:
 			self.set_node_root(node_root)
 		if web_server_url != None:
 			self.set_web_server_url(web_server_url)
 
-		self.rpc_server_nid = 'org.apache.activemq.artemis:broker="RPC",component=addresses,address="rpc.server",subcomponent=queues,routing-type="multicast",queue="rpc.server"'
+		self.rpc_server_nid = RPC_SERVER_NID
 	
-	def set_name(self,name):
-		self._name = name
+	@instrumented('send_api_get_request', target=first_argument)
 	def send_api_get_request(self, api_path):
 		if self._web_server_url != None:
 			request_url = self._web_server_url + api_path
-			resp = requests.get(request_url)
+			resp = self._http.get(request_url, endpoint=api_path)
 			return resp.text
 		else:
 			return "No web_server set i.e. http://localhost:10007. Call set_web_server_url()"
 
+	@instrumented('send_api_post_request', target=first_argument)
 	def send_api_post_request(self, api_path, data):
 		if self._web_server_url != None:
 			request_url = self._web_server_url + api_path
 			try:
-				resp = requests.post(request_url, json=data, timeout=3)
+				resp = self._http.post(request_url, endpoint=api_path, json=data)
 				return resp.json()
 			except requests.exceptions.ConnectionError as e:
 				raise OSError('cannot connect to ' + request_url)
@@ -117,15 +115,33 @@ class Node(object):
 		else:
 			return "No web_server set i.e. http://localhost:10007. Call set_web_server_url()"
 	
+	def set_http_client(self,client):
+		"""Uses client, a pycorda.client.HttpClient, for web server and Jolokia requests
+
+		Use this to change timeouts, retries or the connection pool size.
+		"""
+		self._http.close()
+		self._http = client
+
+	def http_latency(self):
+		"""Returns call counts, errors and latencies of the web server and Jolokia endpoints"""
+		return self._http.latency()
+
+	def set_cache(self,cache):
+		"""Serves whole-table reads from cache, a pycorda.cache.TableCache, or disables caching if None"""
+		self._cache = cache
+
 	def set_web_server_url(self,web_server_url):
 		self._web_server_url = web_server_url
 
 	def set_node_root(self,node_root):
 		self._node_root = node_root
+		self._jolokia_bulk = True
 		self._node_cert = node_root + '/certificates'
 		self._node_cert_jks = self._node_cert + '/nodekeystore.jks'
 
 	def display_keys_from_jks(self,password='cordacadevpass'):
+		import jks
 		ks = jks.KeyStore.load(self._node_cert_jks,password)
 		columns = ['ALIAS','PRIVATE_KEY']
 		keys = pd.DataFrame([],columns=columns)
@@ -135,164 +151,204 @@ class Node(object):
 			keys = keys.append(df,ignore_index=True)
 		return keys
 
-	def _get_df(self, table_name):
+	def _concurrency(self):
+		return self._pool.max_size
+
+	@instrumented('_get_df', target=first_argument)
+	def _get_df(self, table_name, where=None, params=None, limit=None, chunksize=None, exclude=None, columns=None):
 		"""Gets pandas dataframe from a table
 
 		Parameters
         ----------
         table_name : str
             name of table in database
+        where : dict or str, optional
+            column to value filters, or an SQL predicate with ? placeholders,
+            evaluated by the database, see query.build_select
+        params : list, optional
+            parameters for the placeholders of a str where
+        limit : int, optional
+            maximum number of rows to fetch
+        chunksize : int, optional
+            if given, returns a generator of dataframes of at most chunksize rows
+            instead of a single dataframe, see iter_table
+        exclude : list, optional
+            columns left out of the query, e.g. blobs
+        columns : list, optional
+            columns to select, takes precedence over exclude
 		"""
-		self._curs.execute("SELECT * FROM " + table_name)
-		columns = [desc[0] for desc in self._curs.description] # column names
-		return pd.DataFrame(self._curs.fetchall(), columns=columns)
-
-	def get_node_attachments(self):
-		return self._get_df("NODE_ATTACHMENTS")
-
-	def get_node_attachments_contracts(self):
-		return self._get_df("NODE_ATTACHMENTS_CONTRACTS")
-
-	def get_node_checkpoints(self):
-		return self._get_df("NODE_CHECKPOINTS")
-
-	def get_node_contract_upgrades(self):
-		return self._get_df("NODE_CONTRACT_UPGRADES")
-
-	def get_node_indentities(self):
-		return self._get_df("NODE_IDENTITIES")
-
-	def get_node_infos(self):
-		return self._get_df("NODE_INFOS")
-
-	def get_node_info_hosts(self):
-		return self._get_df("NODE_INFO_HOSTS")
-
-	def get_node_info_party_cert(self):
-		return self._get_df("NODE_INFO_PARTY_CERT")
-
-	def get_node_link_nodeinfo_party(self):
-		return self._get_df("NODE_LINK_NODEINFO_PARTY")
-
-	def get_node_message_ids(self):
-		return self._get_df("NODE_MESSAGE_IDS")
-
-	def get_node_message_retry(self):
-		return self._get_df("NODE_MESSAGE_RETRY")
-
-	def get_node_named_identities(self):
-		return self._get_df("NODE_NAMED_IDENTITIES")
-
-	def get_node_our_key_pairs(self):
-		return self._get_df("NODE_OUR_KEY_PAIRS")
-
-	def get_node_properties(self):
-		return self._get_df("NODE_PROPERTIES")
-
-	def get_node_scheduled_states(self):
-		return self._get_df("NODE_SCHEDULED_STATES")
-
-	def get_node_transactions(self):
-		return self._get_df("NODE_TRANSACTIONS")
-
-	def get_node_transaction_mappings(self):
-		return self._get_df("NODE_TRANSACTION_MAPPINGS")
-
-	def get_vault_fungible_states(self):
-		return self._get_df("VAULT_FUNGIBLE_STATES")
-
-	def get_vault_fungible_states_parts(self):
-		return self._get_df("VAULT_FUNGIBLE_STATES_PARTS")
-
-	def get_vault_linear_states(self):
-		return self._get_df("VAULT_LINEAR_STATES")
-
-	def get_vault_linear_states_parts(self):
-		return self._get_df("VAULT_LINEAR_STATES_PARTS")
-
-	def get_vault_states(self):
-		return self._get_df("VAULT_STATES")
-
-	def get_vault_transaction_notes(self):
-		return self._get_df("VAULT_TRANSACTION_NOTES")
-
-	def get_state_party(self):
-		return self._get_df("STATE_PARTY")
-
-	def _snapshot_headers(self,header):
-		return '\r\n\r\n -----------------  ' + header + ' \r\n'
+		whole_table = where is None and limit is None
+		if whole_table and chunksize is None and self._cache is not None and self._cache.ttl(table_name):
+			# The cache holds whole tables, fetched once, so columns are selected afterwards
+			df = self._cache.get(table_name)
+			if df is None:
+				sql, params = build_select(table_name)
+				with self._pool.connection() as conn:
+					df = self._backend.read_df(conn, sql, params)
+				self._cache.put(table_name, df)
+			if columns is not None:
+				return df[columns]
+			return df.drop(columns=exclude or [], errors='ignore')
+		if columns is None and exclude:
+			columns = [column for column in self._table_columns(table_name) if column not in exclude]
+		sql, params = build_select(table_name, where=where, params=params, limit=limit, columns=columns)
+		if chunksize is not None:
+			return self._iter_df(sql, params, chunksize)
+		with self._pool.connection() as conn:
+			return self._backend.read_df(conn, sql, params)
+
+	@instrumented('fungible_quantity_series', target=first_argument)
+	def fungible_quantity_series(self, contract, unit=None):
+		"""Returns the quantities of a contract's fungible states by recorded time
+
+		The join, the contract filter and the sums per unit of time are
+		evaluated by the database, see BaseNode.fungible_quantity_series.
+		"""
+		bucket = self._backend.time_bucket('V.RECORDED_TIMESTAMP', unit) if unit is not None else None
+		sql, params = build_fungible_quantity(contract, bucket)
+		with self._pool.connection() as conn:
+			df = self._backend.read_df(conn, sql, params)
+		df['RECORDED_TIMESTAMP'] = pd.to_datetime(df['RECORDED_TIMESTAMP'], format='ISO8601')
+		return df
+
+	def _table_columns(self, table_name):
+		"""Returns the column names of a table, queried once per table"""
+		if table_name not in self._column_names:
+			# Read through the backend, so the query counts towards the calling _get_df
+			sql, params = build_select(table_name, limit=0)
+			with self._pool.connection() as conn:
+				self._column_names[table_name] = list(self._backend.read_df(conn, sql, params).columns)
+		return self._column_names[table_name]
+
+	def _iter_df(self, sql, params, chunksize):
+		# The generator holds its pooled connection until it is exhausted or closed
+		with self._pool.connection() as conn:
+			for df in self._backend.iter_df(conn, sql, params, chunksize):
+				yield df
+
+	def export_table(self, table_name, fileobj, where=None, params=None, format='csv'):
+		"""Streams a table to a binary file object without building a dataframe
+
+		On PostgreSQL this runs COPY ... TO STDOUT, which also supports the
+		binary COPY format. Other backends write CSV in chunks.
 
-	def find_transactions_by_linear_id(self,linear_id):
-		linear_states = self.get_vault_linear_states()
-		return linear_states[linear_states.UUID==linear_id]
-	
-	def find_vault_states_by_transaction_id(self,tx_id):
-		vault_states = self.get_vault_states()
-		return vault_states[vault_states.TRANSACTION_ID==tx_id]
+		Parameters
+        ----------
+        table_name : str
+            name of table in database
+        fileobj : file object
+            binary file object the rows are written to
+        where : dict or str, optional
+            filters, see _get_df
+        params : list, optional
+            parameters for the placeholders of a str where
+        format : str
+            'csv', or 'binary' on PostgreSQL
+		"""
+		sql, params = build_select(table_name, where=where, params=params)
+		with self._pool.connection() as conn:
+			self._backend.copy_table(conn, sql, params, fileobj, format=format)
 
-	def find_vault_fungible_states_by_transaction_id(self,tx_id):
-		vault_states = self.get_vault_fungible_states()
-		return vault_states[vault_states.TRANSACTION_ID==tx_id]
+	def jolokia_read(self, nid):
+		payload = {'url': self._node_root + "jolokia/", 'nid': nid}
+		return self.send_api_post_request("jolokia/read", payload)
 
-	def find_vault_fungible_states_by_issuer(self,issuer):
-		vault_states = self.get_vault_fungible_states()
-		return vault_states[vault_states.ISSUER_NAME==issuer]
+	@instrumented('send_jolokia_bulk_request')
+	def send_jolokia_bulk_request(self, data):
+		"""Posts a Jolokia bulk request, a list of requests, straight to the node's Jolokia agent
 
+		The web server proxy used by jolokia_read forwards one read per
+		request, so bulk requests cannot go through it.
+		"""
+		request_url = self._node_root + "jolokia/"
+		try:
+			resp = self._http.post(request_url, endpoint="jolokia/", json=data)
+			return resp.json()
+		except requests.exceptions.ConnectionError as e:
+			raise OSError('cannot connect to ' + request_url)
+		except json.decoder.JSONDecodeError as e:
+			raise OSError('request fails with response status ' + str(resp.status_code))
+
+	def jolokia_read_many(self, nids):
+		"""Reads many MBeans in a single round trip
+
+		Returns a dict of Jolokia responses keyed by MBean name. Each response has the
+		same shape as the one returned by jolokia_read.
+
+		The bulk request is posted to the Jolokia agent at the node root, see
+		send_jolokia_bulk_request. If the agent cannot be reached and a web
+		server is set, each MBean is read through the web server proxy with
+		jolokia_read instead, and so are later reads until set_node_root is
+		called again.
+		"""
+		nids = list(nids)
+		if self._jolokia_bulk:
+			try:
+				return responses_by_mbean(nids, self.send_jolokia_bulk_request(bulk_read_request(nids)))
+			except OSError:
+				if self._web_server_url is None:
+					raise
+				self._jolokia_bulk = False
+		return dict((nid, self.jolokia_read(nid)) for nid in nids)
 
-	def find_unconsumed_states_by_contract_state(self,contract_state_class_name):
-		unconsumed_states = self.get_vault_states()
-		return unconsumed_states[unconsumed_states.CONSUMED_TIMESTAMP.isnull()][unconsumed_states.CONTRACT_STATE_CLASS_NAME==contract_state_class_name]
+	def metrics_snapshot(self, metrics=None):
+		"""Reads the node's JVM and Corda metrics in a single round trip
 
-	def find_linear_id_by_transaction_id(self,tx_id):
-		linear_states = self.get_vault_linear_states()
-		linear = linear_states[linear_states.TRANSACTION_ID==tx_id]
-		return linear.iloc[0]['LINEAR_ID']
+		Parameters
+        ----------
+        metrics : list, optional
+            names from metrics.METRIC_NIDS, defaults to metrics.SNAPSHOT_METRICS
 
-	def jolokia_read(self, nid):
-		payload = {'url': self._node_root + "jolokia/", 'nid': nid}
-		return self.send_api_post_request("jolokia/read", payload)
+        Returns
+        -------
+        dict
+            Jolokia responses keyed by MBean name
+		"""
+		if metrics is None:
+			metrics = SNAPSHOT_METRICS
+		return self.jolokia_read_many([METRIC_NIDS[metric] for metric in metrics])
 
 	def jolokia_execute(self, nid, operation):
 		payload = {'url': self._node_root + "jolokia/", 'nid': nid, 'operation': operation}
 		return self.send_api_post_request("jolokia/execute", payload)
 
 	def memory(self):
-		return self.jolokia_read("java.lang:type=Memory")
+		return self.jolokia_read(METRIC_NIDS['memory'])
 
 	def operating_system(self):
-		return self.jolokia_read("java.lang:type=OperatingSystem")
+		return self.jolokia_read(METRIC_NIDS['operating_system'])
 
 	def runtime(self):
-		return self.jolokia_read("java.lang:type=Runtime")
+		return self.jolokia_read(METRIC_NIDS['runtime'])
 
 	def mbean_servers_info(self):
 		return self.jolokia_execute("jolokia:type=ServerHandler", "mBeanServersInfo()")
 
 	def attachments(self):
-		return self.jolokia_read("net.corda:name=Attachments")
+		return self.jolokia_read(METRIC_NIDS['attachments'])
 
 	def flows_started(self):
-		return self.jolokia_read("net.corda:type=Flows,name=Started")
+		return self.jolokia_read(METRIC_NIDS['flows_started'])
 
 	def flows_in_flight(self):
-		return self.jolokia_read("net.corda:type=Flows,name=InFlight")
+		return self.jolokia_read(METRIC_NIDS['flows_in_flight'])
 
-	def flows_finished(slef):
-		return self.jolokia_read("net.corda:type=Flows,name=Finished")
+	def flows_finished(self):
+		return self.jolokia_read(METRIC_NIDS['flows_finished'])
 
 	def flows_checkpointing_rate(self):
-		return self.jolokia_read("net.corda:type=Flows,name=Checkpointing Rate")
+		return self.jolokia_read(METRIC_NIDS['flows_checkpointing_rate'])
 
 	def flows_checkpoint_volume_bytes_per_second_hist(self):
-		return self.jolokia_read("net.corda:type=Flows,name=CheckpointVolumeBytesPerSecondHist")
+		return self.jolokia_read(METRIC_NIDS['flows_checkpoint_volume_bytes_per_second_hist'])
 
 	def flows_checkpoint_volume_bytes_per_second_current(self):
-		return self.jolokia_read("net.corda:type=Flows,name=CheckpointVolumeBytesPerSecondCurrent")
+		return self.jolokia_read(METRIC_NIDS['flows_checkpoint_volume_bytes_per_second_current'])
 
 	def hikari_pool_usage(self):
-		return self.jolokia_read("net.corda:type=HikariPool-1,name=pool.Usage")
+		return self.jolokia_read(METRIC_NIDS['hikari_pool_usage'])
 
-	def rpc_server(slef):
+	def rpc_server(self):
 		return self.jolokia_read(self.rpc_server_nid)
 
 	def rpc_server_browse(self):
@@ -310,90 +366,10 @@ class Node(object):
 	def log4j2(self):
 		return self.jolokia_read("org.apache.logging.log4j2:type=*")
 
-	def generate_snapshot(self,filename=None):
-		if filename == None:
-			filename = time.strftime(self._name+'-pycorda-snapshot-%Y%m%d-%H%M%S.log')
-		f = open(filename,"w+")
-
-		f.write(self._snapshot_headers('STATE_PARTY'))
-		self.get_state_party().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('NODE_ATTACHMENT'))
-		self.get_node_attachments().to_string(buf=f)
-
-		f.write(self._snapshot_headers('NODE_ATTACHMENT_CONTRACTS'))
-		self.get_node_attachments_contracts().to_string(buf=f)
-
-		f.write(self._snapshot_headers('NODE_CHECKPOINTS'))
-		self.get_node_checkpoints().to_string(buf=f)
-	
-		f.write(self._snapshot_headers('NODE_CONTRACT_UPGRADES'))
-		self.get_node_contract_upgrades().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('NODE_IDENTITIES'))		
-		self.get_node_indentities().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('NODE_INFOS'))
-		self.get_node_infos().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('NODE_INFO_HOSTS'))
-		self.get_node_info_hosts().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('NODE_INFO_PARTY_CERT'))
-		self.get_node_info_party_cert().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('NODE_LINK_NODEINFO_PARTY'))
-		self.get_node_link_nodeinfo_party().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('NODE_MESSAGE_IDS'))
-		self.get_node_message_ids().to_string(buf=f)
-		
-		#f.write(self._snapshot_headers('NODE_IDENTITIES'))
-		#self.get_node_message_retry()) - NEEDS TO BE REMOVED?
-		
-		f.write(self._snapshot_headers('NODE_NAMED_IDENTITIES'))
-		self.get_node_named_identities().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('NODE_OUR_KEY_PAIRS'))
-		self.get_node_our_key_pairs().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('NODE_PROPERTIES'))
-		self.get_node_properties().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('NODE_SCHEDULED_STATES'))
-		self.get_node_scheduled_states().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('NODE_TRANSACTIONS'))
-		self.get_node_transactions().to_string(buf=f)
-		
-		#f.write(self._snapshot_headers('NODE_IDENTITIES'))
-		#self.get_node_transaction_mappings()) - ??
-
-		f.write(self._snapshot_headers('VAULT_FUNGIBLE_STATES'))
-		self.get_vault_fungible_states().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('VAULT_FUNGIBLE_STATES_PARTS'))
-		self.get_vault_fungible_states_parts().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('VAULT_LINEAR_STATES'))
-		self.get_vault_linear_states().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('VAULT_LINEAR_STATES_PARTS'))
-		self.get_vault_linear_states_parts().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('VAULT_STATES'))
-		self.get_vault_states().to_string(buf=f)
-		
-		f.write(self._snapshot_headers('VAULT_TRANSACTION_NOTES'))
-		self.get_vault_transaction_notes().to_string(buf=f)
-		
-		
-		f.close()
-
 	def close(self):
 		"""Closes the connection to the database"""
-		self._curs.close()
-		self._conn.close()
+		self._pool.close()
+		self._http.close()
 
 def print_pem(der_bytes, type):
 	print("-----BEGIN %s-----" % type)
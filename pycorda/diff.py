@@ -0,0 +1,222 @@
+"""Differences between two snapshots of a node, or a snapshot and a live node
+
+Rows are matched on the natural key of their table, see schema.NATURAL_KEYS.
+Each side of a table is streamed in chunks and reduced to two 64 bit hashes
+per row, one of the key and one of the whole row, so memory grows by 16 bytes
+a row whatever the width of the table. Keys found on one side only are
+inserted or deleted rows, keys whose row hashes differ are changed rows.
+Rows sharing a key are folded into one hash per key, which does not depend
+on their order. Numbers are hashed by their whole part and the rest, so
+integers are compared exactly whether they were read as integers or floats.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from .schema import NATURAL_KEYS, SNAPSHOT_TABLES
+
+CHANGES = ['inserted', 'deleted', 'changed']
+
+SUMMARY_COLUMNS = ['TABLE', 'ROWS_BEFORE', 'ROWS_AFTER', 'INSERTED', 'DELETED', 'CHANGED']
+
+def _as_node(node):
+	"""Opens a directory as a snapshot if it has a manifest, otherwise as an OfflineNode"""
+	if isinstance(node, str):
+		from .snapshot import MANIFEST, SnapshotNode
+		if os.path.exists(os.path.join(node, MANIFEST)):
+			return SnapshotNode(node)
+		from .offline import OfflineNode
+		return OfflineNode(node)
+	return node
+
+# int64 bounds, as floats, of the floats whose whole part is kept exactly
+_INT64_RANGE = 2.0 ** 63
+
+def _split_numbers(column):
+	"""Returns the whole part of a numeric column as Int64 and the rest as float64
+
+	Integers are kept exactly. A column of integers with nulls is read as
+	floats, so a whole float must hash as the same integer. Floats outside
+	the int64 range keep their value in the fractional part.
+	"""
+	dtype = column.dtype
+	if isinstance(dtype, pd.CategoricalDtype):
+		dtype = dtype.categories.dtype
+		column = column.astype('Int64' if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype) else 'float64')
+	if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+		whole = column.astype('Int64')
+		return whole, pd.Series(np.where(whole.isna().values, np.nan, 0.0), index=column.index)
+	values = column.astype('float64').values
+	fits = np.isfinite(values) & (np.abs(values) < _INT64_RANGE)
+	whole = np.floor(np.where(fits, values, 0.0))
+	return (pd.Series(pd.arrays.IntegerArray(whole.astype(np.int64), ~fits), index=column.index),
+		pd.Series(np.where(fits, values - whole, values), index=column.index))
+
+def _normalize(df):
+	"""Converts columns so that equal values hash equally whichever source they were read from
+
+	Each number becomes its whole part, an Int64, and a fractional part
+	appended as a column of its own, see _split_numbers. Timestamps become
+	nanoseconds.
+	"""
+	columns = {}
+	fractions = {}
+	for name, column in df.items():
+		dtype = column.dtype
+		if isinstance(dtype, pd.CategoricalDtype):
+			numeric = pd.api.types.is_numeric_dtype(dtype.categories.dtype)
+		else:
+			numeric = pd.api.types.is_numeric_dtype(dtype)
+		if dtype.kind == 'M':
+			columns[name] = column.dt.as_unit('ns')
+		elif numeric:
+			columns[name], fractions[name] = _split_numbers(column)
+	if not columns:
+		return df
+	df = df.assign(**columns)
+	for name, fraction in fractions.items():
+		df.insert(len(df.columns), name + '_FRACTION', fraction, allow_duplicates=True)
+	return df
+
+def _hash(df):
+	return pd.util.hash_pandas_object(df, index=False).values
+
+def _key_columns(table_name, columns):
+	key = NATURAL_KEYS.get(table_name)
+	if key is None or not set(key) <= set(columns):
+		return list(columns)
+	return key
+
+def _columns(node, table_name, include_blobs):
+	return list(node._get_table(table_name, limit=0, include_blobs=include_blobs).columns)
+
+def _fold(keys, rows):
+	"""Returns the unique key hashes and, for each, the wrapping sum of its row hashes"""
+	if not len(keys):
+		return keys, rows
+	order = np.argsort(keys, kind='stable')
+	keys = keys[order]
+	starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+	return keys[starts], np.add.reduceat(rows[order], starts)
+
+def _table_hashes(node, table_name, columns, key, chunksize):
+	"""Streams a table and returns its row count, unique key hashes and folded row hashes"""
+	keys = [np.array([], dtype=np.uint64)]
+	rows = [np.array([], dtype=np.uint64)]
+	count = 0
+	for chunk in node.iter_table(table_name, chunksize=chunksize, columns=columns):
+		keys.append(_hash(_normalize(chunk[key])))
+		rows.append(_hash(_normalize(chunk)))
+		count += len(chunk)
+	return (count,) + _fold(np.concatenate(keys), np.concatenate(rows))
+
+def _compare(before, after):
+	"""Returns the inserted, deleted and changed key hashes of two _table_hashes results"""
+	before_keys, before_rows = before[1:]
+	after_keys, after_rows = after[1:]
+	common, i, j = np.intersect1d(before_keys, after_keys, assume_unique=True, return_indices=True)
+	return {
+		'inserted': np.setdiff1d(after_keys, before_keys, assume_unique=True),
+		'deleted': np.setdiff1d(before_keys, after_keys, assume_unique=True),
+		'changed': common[before_rows[i] != after_rows[j]],
+	}
+
+def _common_tables(before, after):
+	tables = set(SNAPSHOT_TABLES)
+	for node in (before, after):
+		if hasattr(node, 'tables'):
+			tables &= set(node.tables())
+	return [table_name for table_name in SNAPSHOT_TABLES if table_name in tables]
+
+def _plan(before, after, table_name, include_blobs):
+	"""Returns the columns present on both sides and the key columns of a table"""
+	after_columns = set(_columns(after, table_name, include_blobs))
+	columns = [column for column in _columns(before, table_name, include_blobs) if column in after_columns]
+	return columns, _key_columns(table_name, columns)
+
+def diff_snapshots(before, after, tables=None, include_blobs=False, chunksize=100000, workers=None):
+	"""Counts the inserted, deleted and changed rows of each table between two nodes
+
+	Parameters
+    ----------
+    before, after : pycorda.Node, pycorda.SnapshotNode, pycorda.OfflineNode or str
+        nodes to compare, a str is opened as a snapshot or offline directory
+    tables : list, optional
+        tables to compare, defaults to the schema.SNAPSHOT_TABLES both sides have
+    include_blobs : bool
+        also compare serialized payloads such as CHECKPOINT_VALUE
+    chunksize : int
+        rows read and hashed at a time
+    workers : int, optional
+        number of table sides hashed at the same time, defaults to the
+        concurrency of the two nodes together
+
+    Returns
+    -------
+    pandas.DataFrame
+        TABLE, ROWS_BEFORE, ROWS_AFTER, INSERTED, DELETED and CHANGED per table
+	"""
+	before, after = _as_node(before), _as_node(after)
+	if tables is None:
+		tables = _common_tables(before, after)
+	if workers is None:
+		workers = before._concurrency() + after._concurrency()
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		plans = dict(zip(tables, executor.map(lambda table_name: _plan(before, after, table_name, include_blobs), tables)))
+		futures = [(table_name,
+			executor.submit(_table_hashes, before, table_name, plans[table_name][0], plans[table_name][1], chunksize),
+			executor.submit(_table_hashes, after, table_name, plans[table_name][0], plans[table_name][1], chunksize))
+			for table_name in tables]
+		rows = []
+		for table_name, before_future, after_future in futures:
+			before_hashes, after_hashes = before_future.result(), after_future.result()
+			changes = _compare(before_hashes, after_hashes)
+			rows.append([table_name, before_hashes[0], after_hashes[0]] + [len(changes[change]) for change in CHANGES])
+	return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+def _changed_keys(node, table_name, key, hashes, chunksize):
+	"""Streams a table and returns the key columns of the rows whose key hash is in hashes"""
+	frames = []
+	for chunk in node.iter_table(table_name, chunksize=chunksize, columns=key):
+		selected = np.isin(_hash(_normalize(chunk)), hashes)
+		if selected.any():
+			frames.append(chunk[selected])
+	return pd.concat(frames, ignore_index=True).drop_duplicates()
+
+def diff_table(before, after, table_name, include_blobs=False, chunksize=100000):
+	"""Returns the key of every inserted, deleted or changed row of a table between two nodes
+
+	The table is read twice from each side, first to hash it and then to
+	look up the keys of the rows that differ.
+
+	Parameters
+    ----------
+    before, after : pycorda.Node, pycorda.SnapshotNode, pycorda.OfflineNode or str
+        nodes to compare, a str is opened as a snapshot or offline directory
+    table_name : str
+        name of table
+    include_blobs : bool
+        also compare serialized payloads such as CHECKPOINT_VALUE
+    chunksize : int
+        rows read and hashed at a time
+
+    Returns
+    -------
+    pandas.DataFrame
+        the key columns, see schema.NATURAL_KEYS, and CHANGE: inserted, deleted or changed
+	"""
+	before, after = _as_node(before), _as_node(after)
+	columns, key = _plan(before, after, table_name, include_blobs)
+	changes = _compare(_table_hashes(before, table_name, columns, key, chunksize),
+		_table_hashes(after, table_name, columns, key, chunksize))
+	frames = []
+	for change in CHANGES:
+		if len(changes[change]):
+			node = before if change == 'deleted' else after
+			df = _changed_keys(node, table_name, key, changes[change], chunksize)
+			frames.append(df.assign(CHANGE=change))
+	if not frames:
+		return pd.DataFrame(columns=key + ['CHANGE'])
+	df = pd.concat(frames, ignore_index=True)
+	df['CHANGE'] = pd.Categorical(df['CHANGE'], categories=CHANGES)
+	return df.sort_values(['CHANGE'] + key, kind='stable').reset_index(drop=True)
@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from .metrics import name_nodes
+
+class Fleet(object):
+	"""Group of nodes queried in parallel
+
+	Any get_tbname or find_* method called on a fleet runs on every node
+	on a thread pool. The results are concatenated into one dataframe with
+	a NODE column holding each node's name. A node that fails is left out
+	of the result and its exception is kept in errors.
+
+	    fleet = Fleet.connect({'PartyA': url_a, 'PartyB': url_b}, 'sa', '')
+	    transactions = fleet.get_node_transactions()
+	"""
+
+	def __init__(self, nodes, workers=8):
+		"""
+        Parameters
+        ----------
+        nodes : list
+            pycorda.Node, OfflineNode or SnapshotNode objects. Nodes without
+            a name are named by their position, see metrics.name_nodes, and
+            nodes sharing a name raise ValueError
+        workers : int
+            maximum number of nodes queried at the same time
+        """
+		self.nodes = list(nodes)
+		name_nodes(self.nodes)
+		self.workers = workers
+		self.errors = {}
+
+	@classmethod
+	def connect(cls, urls, username, password, path_to_jar='./h2.jar', workers=8):
+		"""Connects to every url in parallel and returns a fleet of the nodes that connected
+
+		Parameters
+        ----------
+        urls : dict
+            node name to database url
+        username : str
+            username of database user
+        password : str
+            password of database user
+        path_to_jar : str
+            path to h2 jar file
+        workers : int
+            maximum number of nodes connected or queried at the same time
+		"""
+		from .core import Node
+		def connect(item):
+			name, url = item
+			try:
+				return name, Node(url, username, password, path_to_jar, name=name), None
+			except OSError as e:
+				return name, None, e
+		with ThreadPoolExecutor(max_workers=workers) as executor:
+			results = list(executor.map(connect, urls.items()))
+		fleet = cls([node for name, node, error in results if node is not None], workers=workers)
+		fleet.errors = dict((name, error) for name, node, error in results if error is not None)
+		return fleet
+
+	def _call(self, node, method, args, kwargs):
+		try:
+			return node, getattr(node, method)(*args, **kwargs), None
+		except Exception as e:
+			return node, None, e
+
+	def query(self, method, *args, **kwargs):
+		"""Calls method with args on every node and combines the results
+
+		Parameters
+        ----------
+        method : str
+            name of a node method returning a dataframe or a single value
+
+        Returns
+        -------
+        pandas.DataFrame
+            the nodes' results with a leading NODE column. Single values
+            are returned in a VALUE column
+		"""
+		with ThreadPoolExecutor(max_workers=self.workers) as executor:
+			results = list(executor.map(lambda node: self._call(node, method, args, kwargs), self.nodes))
+		self.errors = {}
+		frames = []
+		for node, result, error in results:
+			if error is not None:
+				self.errors[node._name] = error
+				continue
+			if not isinstance(result, pd.DataFrame):
+				result = pd.DataFrame({'VALUE': [result]})
+			result = result.copy()
+			result.insert(0, 'NODE', node._name)
+			frames.append(result)
+		if not frames:
+			return pd.DataFrame(columns=['NODE'])
+		return pd.concat(frames, ignore_index=True)
+
+	def __getattr__(self, name):
+		if name.startswith(('get_', 'find_')):
+			return lambda *args, **kwargs: self.query(name, *args, **kwargs)
+		raise AttributeError("'Fleet' object has no attribute " + repr(name))
+
+	def close(self):
+		"""Closes every node"""
+		for node in self.nodes:
+			node.close()
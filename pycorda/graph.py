@@ -0,0 +1,270 @@
+"""Transaction provenance graph
+
+Each transaction points at the transactions whose states it depends on. These
+edges are read from NODE_TRANSACTIONS: every TRANSACTION_VALUE is decoded with
+serialization.transaction_inputs, which gives the StateRefs of its inputs and
+reference states, the states a node resolves the back chain of. Transactions
+that are only in the back chain of the vault's, and those whose inputs are
+outside the node, are part of the graph too.
+
+The vault tables do not record inputs, so without NODE_TRANSACTIONS, or for
+blobs that cannot be decoded such as Kryo transactions of Corda 3, edges are
+only inferred:
+
+- linear chains: the transactions holding outputs with the same UUID in
+  VAULT_LINEAR_STATES, in RECORDED_TIMESTAMP order, each spending the previous one
+- consumption matching (optional): a state whose CONSUMED_TIMESTAMP equals a
+  transaction's RECORDED_TIMESTAMP is taken to be an input of that transaction.
+  This is a heuristic. Corda does not guarantee the two are equal, it misses
+  inputs of transactions without outputs in the vault and links every
+  transaction recorded at the same instant
+
+Transactions are numbered in the order they are first seen and the edges are
+kept as CSR arrays, so traversals are NumPy gathers over integer arrays.
+"""
+import numpy as np
+import pandas as pd
+from .serialization import INPUT_COLUMNS, read_transaction_inputs
+from .vault import VaultSync, _hash_index
+
+def _csr(rows, cols, size):
+	"""Returns the indptr and indices arrays of the edges rows -> cols"""
+	order = np.argsort(rows, kind='stable')
+	indptr = np.zeros(size + 1, dtype=np.int64)
+	np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+	return indptr, cols[order]
+
+def _gather(indptr, indices, rows):
+	"""Returns the neighbours of all of rows, concatenated"""
+	starts = indptr[rows]
+	counts = indptr[rows + 1] - starts
+	offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+	return indices[offsets + np.arange(len(offsets))]
+
+class TransactionGraph(object):
+	"""Back-chain graph of the transactions in a node's vault
+
+	Each transaction points at the transactions whose states it spends or
+	references, see the module docstring for where these edges come from.
+	Build it once, then query back-chain depth, linear state lineage and the
+	unconsumed frontier without further queries. Call refresh to add
+	transactions recorded since. Transactions whose TRANSACTION_VALUE could
+	not be decoded are listed in errors.
+	"""
+
+	def __init__(self, node, incremental=False, match_consumption=False, read_transactions=True, workers=None):
+		"""
+        Parameters
+        ----------
+        node : pycorda.Node
+            node the tables are read from
+        incremental : bool
+            refresh through a VaultSync, which only fetches states recorded or
+            consumed since the previous refresh. Needs a database backed node
+        match_consumption : bool
+            also add edges by matching CONSUMED_TIMESTAMP to RECORDED_TIMESTAMP
+        read_transactions : bool
+            read the inputs of NODE_TRANSACTIONS. If False, or if the node has
+            no such table, only the inferred edges are used
+        workers : int, optional
+            number of processes decoding transactions, see serialization.decode_blobs
+        """
+		self.node = node
+		self.match_consumption = match_consumption
+		self.read_transactions = read_transactions and ('NODE_TRANSACTIONS' in node.tables() if hasattr(node, 'tables') else True)
+		self.workers = workers
+		self.errors = pd.DataFrame(columns=['TX_ID', 'ERROR'])
+		self._sync = VaultSync(node) if incremental else None
+		self._decoded = set()
+		self.transaction_ids = pd.Index([], dtype=object)
+		self._recorded = np.array([], dtype='datetime64[ns]')
+		self._child = np.array([], dtype=np.int64)
+		self._parent = np.array([], dtype=np.int64)
+		self._linear = pd.DataFrame({'UUID': pd.Series([], dtype=object), 'ID': pd.Series([], dtype=np.int64)})
+		self.refresh()
+
+	def __len__(self):
+		return len(self.transaction_ids)
+
+	def _read_vault(self):
+		if self._sync is not None:
+			self._sync.refresh()
+			return self._sync.vault_states, self._sync.vault_linear_states
+		vault_states = self.node.get_vault_states(
+			columns=['TRANSACTION_ID', 'OUTPUT_INDEX', 'RECORDED_TIMESTAMP', 'CONSUMED_TIMESTAMP'])
+		linear_states = self.node.get_vault_linear_states(columns=['TRANSACTION_ID', 'UUID'])
+		return vault_states, linear_states
+
+	def _read_inputs(self):
+		"""Decodes the transactions of NODE_TRANSACTIONS not decoded yet and returns their inputs"""
+		if not self.read_transactions:
+			return pd.DataFrame(columns=INPUT_COLUMNS)
+		tx_ids = pd.Index(self.node.get_node_transactions(columns=['TX_ID']).TX_ID.astype(object))
+		tx_ids = tx_ids[~tx_ids.isin(self._decoded)]
+		inputs = read_transaction_inputs(self.node, tx_ids=tx_ids, workers=self.workers)
+		self._decoded.update(tx_ids)
+		failed = inputs[inputs.ERROR.notnull()]
+		if len(failed):
+			self.errors = pd.concat([self.errors, failed[['TX_ID', 'ERROR']]], ignore_index=True)
+		inputs = inputs[inputs.ERROR.isnull()]
+		# Transactions without inputs, or that failed to decode, get a row too so that they are part of the graph
+		others = pd.DataFrame({'TX_ID': tx_ids.difference(inputs.TX_ID).values})
+		return pd.concat([inputs, others], ignore_index=True)
+
+	def refresh(self):
+		"""Adds transactions that are not in the graph yet and returns how many were added"""
+		vault_states, linear_states = self._read_vault()
+		inputs = self._read_inputs()
+		recorded = vault_states.groupby('TRANSACTION_ID', sort=False, observed=True)['RECORDED_TIMESTAMP'].min()
+		recorded = recorded[self.transaction_ids.get_indexer(recorded.index) < 0]
+		recorded = recorded.sort_values(kind='stable')
+		# Transactions outside the vault follow, without a recorded time
+		others = pd.Index(pd.concat([inputs.TX_ID, inputs.INPUT_TX_ID.dropna()]).astype(object).unique())
+		others = others[(self.transaction_ids.get_indexer(others) < 0) & ~others.isin(recorded.index)].sort_values()
+		first = len(self.transaction_ids)
+		new_ids = pd.Index(recorded.index.astype(object)).append(others)
+		ids = pd.Series(np.arange(first, first + len(new_ids)), index=new_ids)
+		self.transaction_ids = self.transaction_ids.append(new_ids)
+		self._recorded = np.concatenate([self._recorded, recorded.values.astype('datetime64[ns]'),
+			np.full(len(others), np.datetime64('NaT'), dtype='datetime64[ns]')])
+
+		edges = [self._linear_edges(linear_states, ids)]
+		if self.match_consumption:
+			edges.append(self._consumption_edges(vault_states, recorded, ids))
+		edges.append(self._input_edges(inputs))
+		self._add_edges(edges)
+
+		unconsumed = vault_states[vault_states.CONSUMED_TIMESTAMP.isnull()]
+		counts = unconsumed.groupby('TRANSACTION_ID', sort=False, observed=True).size()
+		self._unconsumed = pd.Series(counts.values, index=self.transaction_ids.get_indexer(counts.index))
+		return len(ids)
+
+	def _linear_edges(self, linear_states, ids):
+		"""Chains the new linear states after the latest known transaction of their UUID"""
+		rows = linear_states[linear_states.TRANSACTION_ID.isin(ids.index)]
+		new = pd.DataFrame({'UUID': rows.UUID.astype(object).values, 'ID': ids.reindex(rows.TRANSACTION_ID).values})
+		new = new.drop_duplicates().sort_values('ID', kind='stable')
+		# _linear is kept in ID order, so the last row of a UUID is its latest transaction
+		tips = self._linear.drop_duplicates('UUID', keep='last')
+		tips = tips[tips.UUID.isin(new.UUID)]
+		# ids are in recorded order, so sorting by them orders each chain
+		chain = pd.concat([tips, new], ignore_index=True).sort_values(['UUID', 'ID'], kind='stable')
+		parents = chain.groupby('UUID', sort=False)['ID'].shift()
+		linked = parents.notnull() & chain.ID.isin(new.ID)
+		self._linear = pd.concat([self._linear, new], ignore_index=True)
+		self._linear_index = _hash_index(self._linear, 'UUID')
+		return chain.ID[linked].values, parents[linked].values.astype(np.int64)
+
+	def _consumption_edges(self, vault_states, recorded, ids):
+		"""Links each new transaction to the states consumed when it was recorded"""
+		consumed = vault_states[vault_states.CONSUMED_TIMESTAMP.isin(recorded.values)]
+		spenders = pd.DataFrame({'CONSUMED_TIMESTAMP': recorded.values, 'CHILD': ids.reindex(recorded.index).values})
+		pairs = consumed[['TRANSACTION_ID', 'CONSUMED_TIMESTAMP']].merge(spenders, on='CONSUMED_TIMESTAMP')
+		parents = self.transaction_ids.get_indexer(pairs.TRANSACTION_ID.astype(object))
+		keep = (parents >= 0) & (parents != pairs.CHILD.values)
+		return pairs.CHILD.values[keep], parents[keep]
+
+	def _input_edges(self, inputs):
+		"""Links each decoded transaction to the transactions of its input and reference states"""
+		inputs = inputs[inputs.INPUT_TX_ID.notnull()]
+		child = self.transaction_ids.get_indexer(inputs.TX_ID.astype(object))
+		parent = self.transaction_ids.get_indexer(inputs.INPUT_TX_ID.astype(object))
+		return child, parent
+
+	def _add_edges(self, edges):
+		size = max(len(self.transaction_ids), 1)
+		child = np.concatenate([self._child] + [np.asarray(c, dtype=np.int64) for c, p in edges])
+		parent = np.concatenate([self._parent] + [np.asarray(p, dtype=np.int64) for c, p in edges])
+		keys = np.unique(child * size + parent)
+		self._child, self._parent = keys // size, keys % size
+		self._parents = _csr(self._child, self._parent, len(self.transaction_ids))
+		self._children = _csr(self._parent, self._child, len(self.transaction_ids))
+		self._depths = None
+
+	def _position(self, tx_id):
+		return self.transaction_ids.get_loc(tx_id)
+
+	def _ids(self, positions):
+		return list(self.transaction_ids[np.sort(positions)])
+
+	def parents(self, tx_id):
+		"""Returns the transactions whose states tx_id spends or references"""
+		return self._ids(_gather(*self._parents, np.array([self._position(tx_id)])))
+
+	def children(self, tx_id):
+		"""Returns the transactions spending or referencing states of tx_id"""
+		return self._ids(_gather(*self._children, np.array([self._position(tx_id)])))
+
+	def back_chain(self, tx_id):
+		"""Returns every transaction in the back chain of tx_id, in the order they were added
+
+		Without NODE_TRANSACTIONS the back chain only follows the inferred
+		edges, that is linear chains and, if enabled, consumption matching.
+		"""
+		visited = np.zeros(len(self.transaction_ids), dtype=np.bool_)
+		frontier = np.array([self._position(tx_id)])
+		while frontier.size:
+			frontier = np.unique(_gather(*self._parents, frontier))
+			frontier = frontier[~visited[frontier]]
+			visited[frontier] = True
+		return self._ids(np.flatnonzero(visited))
+
+	def depths(self):
+		"""Returns the back-chain depth of every transaction, the longest path to a transaction without parents
+
+		Without NODE_TRANSACTIONS only the inferred edges are followed, so
+		depths measure linear chains and every fungible transaction, such as
+		a cash payment, has depth 0. Transactions on a cycle, which the
+		heuristics can produce from inconsistent timestamps, get -1.
+		"""
+		if self._depths is None:
+			# Kahn's algorithm level by level: a transaction is reached once all its parents are
+			size = len(self.transaction_ids)
+			remaining = np.diff(self._parents[0])
+			depths = np.full(size, -1, dtype=np.int64)
+			frontier = np.flatnonzero(remaining == 0)
+			level = 0
+			while frontier.size:
+				depths[frontier] = level
+				children, counts = np.unique(_gather(*self._children, frontier), return_counts=True)
+				remaining[children] -= counts
+				frontier = children[remaining[children] == 0]
+				level += 1
+			self._depths = pd.Series(depths, index=self.transaction_ids)
+		return self._depths
+
+	def depth(self, tx_id):
+		"""Returns the back-chain depth of a transaction"""
+		return int(self.depths().iloc[self._position(tx_id)])
+
+	def lineage(self, linear_id):
+		"""Returns the transactions of a linear state's UUID in order, with their RECORDED_TIMESTAMP and DEPTH"""
+		positions = np.sort(self._linear.ID.values[self._linear_index.get(linear_id, [])])
+		return pd.DataFrame({
+			'TRANSACTION_ID': self.transaction_ids[positions].values,
+			'RECORDED_TIMESTAMP': self._recorded[positions],
+			'DEPTH': self.depths().values[positions],
+		})
+
+	def unconsumed_frontier(self):
+		"""Returns the transactions with unconsumed outputs, deepest back chain first
+
+		Returns
+        -------
+        pandas.DataFrame
+            TRANSACTION_ID, UNCONSUMED, the number of unconsumed outputs, and DEPTH
+		"""
+		positions = self._unconsumed.index.values
+		df = pd.DataFrame({
+			'TRANSACTION_ID': self.transaction_ids[positions].values,
+			'UNCONSUMED': self._unconsumed.values,
+			'DEPTH': self.depths().values[positions],
+		})
+		return df.sort_values(['DEPTH', 'TRANSACTION_ID'], ascending=[False, True], kind='stable').reset_index(drop=True)
+
+	def edges(self):
+		"""Returns the edges as CHILD and PARENT transaction ids"""
+		return pd.DataFrame({
+			'CHILD': self.transaction_ids[self._child].values,
+			'PARENT': self.transaction_ids[self._parent].values,
+		})
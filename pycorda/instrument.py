@@ -0,0 +1,262 @@
+"""Instrumentation of table reads, HTTP calls and plots
+
+Methods decorated with instrumented record a Span per call in their node's
+Registry: the wall time, the rows and bytes returned, and the time spent in
+each phase of a query:
+
+- execute: running the statement
+- fetch: moving rows from the driver, which for H2 includes converting each
+  cell from Java
+- convert: turning buffered values into typed columns
+- frame: building the dataframe
+
+Backends mark phases with the phase context manager, which adds to the span
+of the innermost instrumented call on the thread and does nothing outside one.
+Exporters, such as OpenTelemetryExporter, are called with every finished span.
+"""
+import functools
+import threading
+import time
+import types
+import warnings
+from collections import deque
+from contextlib import contextmanager
+import pandas as pd
+
+PHASES = ['execute', 'fetch', 'convert', 'frame']
+
+COLUMNS = ['NAME', 'TARGET', 'START', 'SECONDS', 'ROWS', 'BYTES', 'ERROR'] + [p.upper() + '_S' for p in PHASES]
+
+_local = threading.local()
+
+class Span(object):
+	"""One instrumented call
+
+	START is a Unix timestamp, SECONDS the time spent in the call, or in
+	the next() calls of a returned generator of chunks. BYTES is the
+	shallow memory of returned dataframes or the size of HTTP responses.
+	"""
+
+	__slots__ = ('name', 'target', 'start', 'seconds', 'rows', 'bytes', 'error', 'phases')
+
+	def __init__(self, name, target=None):
+		self.name = name
+		self.target = target
+		self.start = time.time()
+		self.seconds = 0.0
+		self.rows = 0
+		self.bytes = 0
+		self.error = None
+		self.phases = {}
+
+	def as_row(self):
+		return [self.name, self.target, self.start, self.seconds, self.rows, self.bytes, self.error] + \
+			[self.phases.get(p, 0.0) for p in PHASES]
+
+def _stack():
+	stack = getattr(_local, 'stack', None)
+	if stack is None:
+		stack = _local.stack = []
+	return stack
+
+def current_span():
+	"""Returns the span of the innermost instrumented call on this thread, or None"""
+	stack = _stack()
+	return stack[-1] if stack else None
+
+@contextmanager
+def phase(name):
+	"""Adds the time spent in the block to a phase of the current span"""
+	span = current_span()
+	if span is None:
+		yield
+		return
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		span.phases[name] = span.phases.get(name, 0.0) + time.perf_counter() - start
+
+def annotate(rows=0, bytes=0):
+	"""Adds rows and bytes to the current span"""
+	span = current_span()
+	if span is not None:
+		span.rows += rows
+		span.bytes += bytes
+
+class Registry(object):
+	"""In-process store of the spans of a node
+
+	Keeps the last maxlen spans. Set enabled to False to stop recording.
+	"""
+
+	def __init__(self, maxlen=10000):
+		self.enabled = True
+		self._spans = deque(maxlen=maxlen)
+		self._exporters = []
+		self._lock = threading.Lock()
+
+	def add_exporter(self, exporter):
+		"""Calls exporter with each finished Span, e.g. an OpenTelemetryExporter or any callable"""
+		self._exporters.append(exporter)
+
+	def remove_exporter(self, exporter):
+		self._exporters.remove(exporter)
+
+	def record(self, span):
+		with self._lock:
+			self._spans.append(span)
+		for exporter in list(self._exporters):
+			try:
+				exporter(span)
+			except Exception as e:
+				# A failing exporter must not fail the query it reports on
+				warnings.warn('instrumentation exporter failed: ' + repr(e))
+
+	def spans(self):
+		"""Returns a dataframe with one row per recorded span, see COLUMNS"""
+		with self._lock:
+			rows = [span.as_row() for span in self._spans]
+		df = pd.DataFrame(rows, columns=COLUMNS)
+		df['START'] = pd.to_datetime(df['START'], unit='s')
+		return df
+
+	def summary(self):
+		"""Returns calls, errors, rows, bytes, latency percentiles and phase totals per NAME and TARGET"""
+		df = self.spans()
+		df['TARGET'] = df['TARGET'].fillna('')
+		groups = df.groupby(['NAME', 'TARGET'], sort=True)
+		ms = groups['SECONDS']
+		summary = pd.DataFrame({
+			'CALLS': groups.size(),
+			'ERRORS': groups['ERROR'].count(),
+			'ROWS': groups['ROWS'].sum(),
+			'BYTES': groups['BYTES'].sum(),
+			'TOTAL_MS': ms.sum() * 1000,
+			'MEAN_MS': ms.mean() * 1000,
+			'P50_MS': ms.quantile(0.5) * 1000,
+			'P95_MS': ms.quantile(0.95) * 1000,
+			'MAX_MS': ms.max() * 1000,
+		})
+		for p in PHASES:
+			summary[p.upper() + '_MS'] = groups[p.upper() + '_S'].sum() * 1000
+		return summary.reset_index()
+
+	def reset(self):
+		with self._lock:
+			self._spans.clear()
+
+class OpenTelemetryExporter(object):
+	"""Exports spans to OpenTelemetry, which needs `pip install pycorda[otel]`
+
+	Each pycorda span becomes an OpenTelemetry span named after the method,
+	with the target, rows, bytes and phase times as pycorda.* attributes.
+	"""
+
+	def __init__(self, tracer=None):
+		"""
+        Parameters
+        ----------
+        tracer : opentelemetry.trace.Tracer, optional
+            defaults to the tracer of the global tracer provider
+        """
+		if tracer is None:
+			from opentelemetry import trace
+			tracer = trace.get_tracer('pycorda')
+		self.tracer = tracer
+
+	def __call__(self, span):
+		start = int(span.start * 1e9)
+		attributes = {'pycorda.rows': span.rows, 'pycorda.bytes': span.bytes}
+		if span.target is not None:
+			attributes['pycorda.target'] = str(span.target)
+		if span.error is not None:
+			attributes['pycorda.error'] = span.error
+		for name, seconds in span.phases.items():
+			attributes['pycorda.' + name + '_ms'] = seconds * 1000
+		otel_span = self.tracer.start_span(span.name, start_time=start, attributes=attributes)
+		otel_span.end(end_time=start + int(span.seconds * 1e9))
+
+def _frame_bytes(df):
+	try:
+		# memory_usage builds a Series per call, which costs more than many small queries
+		return int(sum(block.values.nbytes for block in df._mgr.blocks))
+	except AttributeError:
+		return int(df.memory_usage(index=False).sum())
+
+def _measure(span, result):
+	if isinstance(result, pd.DataFrame):
+		span.rows += len(result)
+		span.bytes += _frame_bytes(result)
+
+def _iterate(registry, span, chunks):
+	"""Yields the chunks of a generator, timing each next() call as part of span"""
+	try:
+		while True:
+			stack = _stack()
+			stack.append(span)
+			start = time.perf_counter()
+			try:
+				chunk = next(chunks)
+			except StopIteration:
+				break
+			finally:
+				span.seconds += time.perf_counter() - start
+				stack.pop()
+			_measure(span, chunk)
+			yield chunk
+	except GeneratorExit:
+		raise
+	except BaseException as e:
+		span.error = type(e).__name__
+		raise
+	finally:
+		chunks.close()
+		registry.record(span)
+
+def first_argument(*args, **kwargs):
+	"""Span target of methods whose first argument is a table name, contract or API path"""
+	return args[0] if args else None
+
+def _node_registry(obj):
+	return obj.instruments
+
+def instrumented(name, target=None, registry=_node_registry):
+	"""Decorates a method so that its calls are recorded in a Registry
+
+	Parameters
+    ----------
+    name : str
+        name of the spans
+    target : function, optional
+        returns the span's target, e.g. a table name, from the call's arguments
+    registry : function
+        returns the Registry from the method's self, defaults to self.instruments
+	"""
+	def decorate(method):
+		@functools.wraps(method)
+		def wrapper(self, *args, **kwargs):
+			spans = registry(self)
+			if not spans.enabled:
+				return method(self, *args, **kwargs)
+			span = Span(name, target(*args, **kwargs) if target is not None else None)
+			stack = _stack()
+			stack.append(span)
+			start = time.perf_counter()
+			try:
+				result = method(self, *args, **kwargs)
+			except BaseException as e:
+				span.error = type(e).__name__
+				span.seconds = time.perf_counter() - start
+				spans.record(span)
+				raise
+			finally:
+				stack.pop()
+			span.seconds = time.perf_counter() - start
+			if isinstance(result, types.GeneratorType):
+				return _iterate(spans, span, result)
+			_measure(span, result)
+			spans.record(span)
+			return result
+		return wrapper
+	return decorate
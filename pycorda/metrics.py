@@ -0,0 +1,88 @@
+# Jolokia MBean names of the JVM and Corda node metrics
+
+RPC_SERVER_NID = 'org.apache.activemq.artemis:broker="RPC",component=addresses,address="rpc.server",subcomponent=queues,routing-type="multicast",queue="rpc.server"'
+
+METRIC_NIDS = {
+	'memory': 'java.lang:type=Memory',
+	'operating_system': 'java.lang:type=OperatingSystem',
+	'runtime': 'java.lang:type=Runtime',
+	'attachments': 'net.corda:name=Attachments',
+	'flows_started': 'net.corda:type=Flows,name=Started',
+	'flows_in_flight': 'net.corda:type=Flows,name=InFlight',
+	'flows_finished': 'net.corda:type=Flows,name=Finished',
+	'flows_checkpointing_rate': 'net.corda:type=Flows,name=Checkpointing Rate',
+	'flows_checkpoint_volume_bytes_per_second_hist': 'net.corda:type=Flows,name=CheckpointVolumeBytesPerSecondHist',
+	'flows_checkpoint_volume_bytes_per_second_current': 'net.corda:type=Flows,name=CheckpointVolumeBytesPerSecondCurrent',
+	'hikari_pool_usage': 'net.corda:type=HikariPool-1,name=pool.Usage',
+	'rpc_server': RPC_SERVER_NID,
+}
+
+# Read by Node.metrics_snapshot
+SNAPSHOT_METRICS = [
+	'memory',
+	'operating_system',
+	'runtime',
+	'flows_started',
+	'flows_in_flight',
+	'flows_finished',
+	'flows_checkpointing_rate',
+	'hikari_pool_usage',
+	'rpc_server',
+]
+
+def bulk_read_request(nids):
+	"""Returns the body of a Jolokia bulk request reading every MBean in nids"""
+	return [{'type': 'read', 'mbean': nid} for nid in nids]
+
+def responses_by_mbean(nids, responses):
+	"""Keys the responses to a bulk request by MBean name
+
+	Jolokia answers a bulk request with one response per request, in order.
+	A failed read has a status other than 200 and an error message instead
+	of a value, so one missing MBean does not fail the others.
+	"""
+	if not isinstance(responses, list) or len(responses) != len(nids):
+		raise OSError('unexpected response to Jolokia bulk request')
+	return dict(zip(nids, responses))
+
+# Numeric samples taken by collector.MetricsCollector: sample name to the
+# metric read and the path to a number inside its Jolokia value.
+# Meters are sampled by their cumulative Count, the collector derives rates.
+SAMPLES = {
+	'flows_in_flight': ('flows_in_flight', ['Value']),
+	'flows_started': ('flows_started', ['Count']),
+	'flows_checkpointing': ('flows_checkpointing_rate', ['Count']),
+	'hikari_pool_usage': ('hikari_pool_usage', ['Mean']),
+	'heap_used': ('memory', ['HeapMemoryUsage', 'used']),
+	'rpc_server_messages': ('rpc_server', ['MessageCount']),
+}
+
+def sample_value(response, path):
+	"""Returns the number at path in the value of a Jolokia response, or None if the read failed"""
+	if response.get('status') != 200:
+		return None
+	value = response.get('value')
+	for key in path:
+		if not isinstance(value, dict) or key not in value:
+			return None
+		value = value[key]
+	return float(value)
+
+def name_nodes(nodes):
+	"""Names unnamed nodes by their position and returns the names
+
+	The nodes are changed: each node without a name is given 'node' and its
+	position through set_name, so the name stays with it after the fleet or
+	collector that named it is gone. Nodes that already have a name keep it.
+	Raises ValueError if two nodes share a name, since whatever is kept per
+	name, such as samples, would be mixed.
+	"""
+	names = []
+	for i, node in enumerate(nodes):
+		if not node._name:
+			node.set_name('node' + str(i))
+		names.append(node._name)
+	duplicates = sorted(set(name for name in names if names.count(name) > 1))
+	if duplicates:
+		raise ValueError('nodes must have distinct names, found more than one ' + ', '.join(duplicates))
+	return names
@@ -0,0 +1,100 @@
+import os
+import pandas as pd
+from .base import BaseNode
+from .instrument import first_argument, instrumented
+from .query import filter_df
+
+_READERS = {
+	'.parquet': pd.read_parquet,
+	'.arrow': pd.read_feather,
+	'.feather': pd.read_feather,
+	'.csv': pd.read_csv,
+}
+
+class OfflineNode(BaseNode):
+	"""Node-like object that serves tables from local files
+
+	Tables are read from files named after them, e.g. VAULT_STATES.parquet,
+	VAULT_STATES.csv or VAULT_STATES.arrow, in a single directory such as a
+	TableCache directory or a database export. Offers the same get_tbname,
+	iter_table, find_* and generate_snapshot methods as pycorda.Node, evaluates
+	filters in memory and needs no JVM or database connection.
+	"""
+
+	def __init__(self, path, name=''):
+		"""
+        Parameters
+        ----------
+        path : str
+            directory holding one file per table
+        name : str
+            node name used e.g. in snapshot file names
+        """
+		self.path = path
+		self.set_name(name)
+		self._files = {}
+		for filename in sorted(os.listdir(path)):
+			table_name, extension = os.path.splitext(filename)
+			if extension.lower() in _READERS:
+				self._files.setdefault(table_name.upper(), os.path.join(path, filename))
+
+	def tables(self):
+		"""Returns the names of the tables available offline"""
+		return list(self._files)
+
+	def _parts(self, table_name):
+		"""Returns the parts that make up a table, read in order with _read_part"""
+		try:
+			return [self._files[table_name]]
+		except KeyError:
+			raise ValueError(table_name + ' is not in ' + self.path)
+
+	def _read_part(self, part, columns=None):
+		extension = os.path.splitext(part)[1].lower()
+		if columns is None:
+			return _READERS[extension](part)
+		if extension == '.csv':
+			return pd.read_csv(part, usecols=columns)
+		return _READERS[extension](part, columns=columns)
+
+	def _columns(self, table_name):
+		return []
+
+	def _concurrency(self):
+		return 4
+
+	@instrumented('_get_df', target=first_argument)
+	def _get_df(self, table_name, where=None, params=None, limit=None, chunksize=None, exclude=None, columns=None):
+		parts = self._parts(table_name)
+		read_columns = None
+		if columns is not None:
+			# Filter columns are read too and dropped after filtering
+			read_columns = list(columns) + [column for column in (where or {}) if column not in columns]
+		if chunksize is not None:
+			return self._iter_df(parts, where, limit, chunksize, exclude, columns, read_columns)
+		frames = [self._read_part(part, read_columns) for part in parts]
+		if frames:
+			df = pd.concat(frames, ignore_index=True)
+		else:
+			df = pd.DataFrame(columns=self._columns(table_name))
+		return self._project(filter_df(df, where, limit).reset_index(drop=True), exclude, columns)
+
+	def _project(self, df, exclude, columns):
+		if columns is not None:
+			return df[columns]
+		return df.drop(columns=exclude or [], errors='ignore')
+
+	def _iter_df(self, parts, where, limit, chunksize, exclude, columns, read_columns):
+		remaining = limit
+		for part in parts:
+			df = filter_df(self._read_part(part, read_columns), where, remaining)
+			df = self._project(df, exclude, columns)
+			for start in range(0, len(df), chunksize):
+				yield df.iloc[start:start + chunksize].reset_index(drop=True)
+			if remaining is not None:
+				remaining -= len(df)
+				if remaining <= 0:
+					break
+
+	def close(self):
+		pass
@@ -0,0 +1,87 @@
+import threading
+from contextlib import contextmanager
+
+class ConnectionPool(object):
+	"""Thread-safe pool of DB-API connections
+
+	Connections are opened lazily by calling connect, up to max_size of them,
+	and are reused once released. Callers beyond max_size wait for a release.
+	"""
+
+	def __init__(self, connect, max_size=1):
+		"""
+        Parameters
+        ----------
+        connect : callable
+            returns a new DB-API connection
+        max_size : int
+            maximum number of open connections
+        """
+		if max_size < 1:
+			raise ValueError('max_size must be at least 1')
+		self._connect = connect
+		self.max_size = max_size
+		self._idle = []
+		self._size = 0
+		self._closed = False
+		self._cond = threading.Condition()
+
+	def acquire(self):
+		"""Returns an idle connection, opening a new one if the pool is not full"""
+		with self._cond:
+			while True:
+				if self._closed:
+					raise OSError('connection pool is closed')
+				if self._idle:
+					return self._idle.pop()
+				if self._size < self.max_size:
+					self._size += 1
+					break
+				self._cond.wait()
+		try:
+			return self._connect()
+		except BaseException:
+			with self._cond:
+				self._size -= 1
+				self._cond.notify()
+			raise
+
+	def release(self, conn):
+		"""Returns conn to the pool"""
+		with self._cond:
+			if self._closed:
+				conn.close()
+			else:
+				self._idle.append(conn)
+			self._cond.notify()
+
+	@contextmanager
+	def connection(self):
+		"""Context manager yielding a pooled connection"""
+		conn = self.acquire()
+		try:
+			yield conn
+		finally:
+			self.release(conn)
+
+	@contextmanager
+	def cursor(self):
+		"""Context manager yielding a cursor on a pooled connection"""
+		conn = self.acquire()
+		try:
+			curs = conn.cursor()
+			try:
+				yield curs
+			finally:
+				curs.close()
+		finally:
+			self.release(conn)
+
+	def close(self):
+		"""Closes idle connections now and busy connections when they are released"""
+		with self._cond:
+			self._closed = True
+			idle, self._idle = self._idle, []
+			self._cond.notify_all()
+		for conn in idle:
+			conn.close()
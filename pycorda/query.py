@@ -0,0 +1,135 @@
+import re
+
+# Table and column names are interpolated into SQL, so only plain identifiers are accepted.
+# Values are always passed as parameters and never interpolated.
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+def check_identifier(name):
+	"""Returns name if it is a plain SQL identifier, otherwise raises ValueError"""
+	if not isinstance(name, str) or not _IDENTIFIER.match(name):
+		raise ValueError('invalid SQL identifier: ' + repr(name))
+	return name
+
+def build_where(where):
+	"""Builds a WHERE predicate and its parameters
+
+	Parameters
+    ----------
+    where : dict
+        mapping of column name to value. Columns are compared with =,
+        a value of None is compared with IS NULL and a list, tuple or set
+        of values with IN
+	"""
+	clauses = []
+	params = []
+	for column, value in where.items():
+		check_identifier(column)
+		if value is None:
+			clauses.append(column + ' IS NULL')
+		elif isinstance(value, (list, tuple, set, frozenset)):
+			value = list(value)
+			# An empty IN () is not valid SQL, and matches no rows
+			clauses.append(column + ' IN (' + ', '.join('?' * len(value)) + ')' if value else '1 = 0')
+			params.extend(value)
+		else:
+			clauses.append(column + ' = ?')
+			params.append(value)
+	return ' AND '.join(clauses), params
+
+def build_select(table_name, where=None, params=None, limit=None, columns=None):
+	"""Builds a parameterized SELECT statement for a single table
+
+	Parameters
+    ----------
+    table_name : str
+        name of table in database
+    where : dict or str, optional
+        equality filters, see build_where, or an SQL predicate using ? placeholders.
+        A ? inside a quoted literal is part of the literal
+    params : list, optional
+        parameters for the ? placeholders of a str where
+    limit : int, optional
+        maximum number of rows to return
+    columns : list, optional
+        columns to select, defaults to all of them
+
+    Returns
+    -------
+    (str, list)
+        the SQL statement using ? placeholders and its parameters
+	"""
+	selected = ', '.join(check_identifier(column) for column in columns) if columns else '*'
+	sql = 'SELECT ' + selected + ' FROM ' + check_identifier(table_name)
+	if isinstance(where, str):
+		sql += ' WHERE ' + where
+		params = list(params or [])
+	elif where:
+		predicate, params = build_where(where)
+		sql += ' WHERE ' + predicate
+	else:
+		params = []
+	if limit is not None:
+		sql += ' LIMIT ' + str(int(limit))
+	return sql, params
+
+# Units of time a series can be bucketed by, with their pandas frequency
+TIME_UNITS = {'minute': 'min', 'hour': 'h', 'day': 'D'}
+
+def check_time_unit(unit):
+	"""Returns unit if it is a key of TIME_UNITS, otherwise raises ValueError"""
+	if unit not in TIME_UNITS:
+		raise ValueError('time unit must be one of ' + ', '.join(TIME_UNITS))
+	return unit
+
+def build_fungible_quantity(contract, bucket=None):
+	"""Builds the query of the fungible state quantities of a contract over time
+
+	VAULT_STATES is joined with VAULT_FUNGIBLE_STATES on the state reference
+	and filtered by CONTRACT_STATE_CLASS_NAME in the database.
+
+	Parameters
+    ----------
+    contract : str
+        contract state class name, e.g. net.corda.finance.contracts.asset.Cash$State
+    bucket : str, optional
+        SQL expression truncating V.RECORDED_TIMESTAMP, see Backend.time_bucket.
+        If given, QUANTITY is summed per bucket
+
+    Returns
+    -------
+    (str, list)
+        the SQL statement using ? placeholders and its parameters
+	"""
+	timestamp = bucket or 'V.RECORDED_TIMESTAMP'
+	quantity = 'SUM(F.QUANTITY)' if bucket else 'F.QUANTITY'
+	sql = ('SELECT ' + timestamp + ' AS RECORDED_TIMESTAMP, ' + quantity + ' AS QUANTITY'
+		' FROM VAULT_STATES V JOIN VAULT_FUNGIBLE_STATES F'
+		' ON V.TRANSACTION_ID = F.TRANSACTION_ID AND V.OUTPUT_INDEX = F.OUTPUT_INDEX'
+		' WHERE V.CONTRACT_STATE_CLASS_NAME = ?')
+	if bucket:
+		sql += ' GROUP BY ' + bucket
+	sql += ' ORDER BY 1'
+	return sql, [contract]
+
+def filter_df(df, where=None, limit=None):
+	"""Applies equality filters and a row limit to a dataframe held in memory
+
+	This is the in-memory counterpart of build_select for nodes that are not
+	backed by a database. SQL predicates cannot be evaluated and raise ValueError.
+	"""
+	if isinstance(where, str):
+		raise ValueError('SQL predicates need a database connection, use a dict of column values')
+	if where:
+		mask = None
+		for column, value in where.items():
+			if value is None:
+				column_mask = df[column].isnull()
+			elif isinstance(value, (list, tuple, set, frozenset)):
+				column_mask = df[column].isin(list(value))
+			else:
+				column_mask = df[column] == value
+			mask = column_mask if mask is None else mask & column_mask
+		df = df[mask]
+	if limit is not None:
+		df = df.head(int(limit))
+	return df
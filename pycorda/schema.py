@@ -0,0 +1,133 @@
+# Layout of the Corda node tables read by pycorda
+
+import pandas as pd
+
+TABLES = [
+	'NODE_ATTACHMENTS',
+	'NODE_ATTACHMENTS_CONTRACTS',
+	'NODE_CHECKPOINTS',
+	'NODE_CONTRACT_UPGRADES',
+	'NODE_IDENTITIES',
+	'NODE_INFOS',
+	'NODE_INFO_HOSTS',
+	'NODE_INFO_PARTY_CERT',
+	'NODE_LINK_NODEINFO_PARTY',
+	'NODE_MESSAGE_IDS',
+	'NODE_MESSAGE_RETRY',
+	'NODE_NAMED_IDENTITIES',
+	'NODE_OUR_KEY_PAIRS',
+	'NODE_PROPERTIES',
+	'NODE_SCHEDULED_STATES',
+	'NODE_TRANSACTIONS',
+	'NODE_TRANSACTION_MAPPINGS',
+	'STATE_PARTY',
+	'VAULT_FUNGIBLE_STATES',
+	'VAULT_FUNGIBLE_STATES_PARTS',
+	'VAULT_LINEAR_STATES',
+	'VAULT_LINEAR_STATES_PARTS',
+	'VAULT_STATES',
+	'VAULT_TRANSACTION_NOTES',
+]
+
+# Tables written by Node.generate_snapshot, in order.
+# NODE_MESSAGE_RETRY and NODE_TRANSACTION_MAPPINGS are not present on every Corda version.
+SNAPSHOT_TABLES = [
+	'STATE_PARTY',
+	'NODE_ATTACHMENTS',
+	'NODE_ATTACHMENTS_CONTRACTS',
+	'NODE_CHECKPOINTS',
+	'NODE_CONTRACT_UPGRADES',
+	'NODE_IDENTITIES',
+	'NODE_INFOS',
+	'NODE_INFO_HOSTS',
+	'NODE_INFO_PARTY_CERT',
+	'NODE_LINK_NODEINFO_PARTY',
+	'NODE_MESSAGE_IDS',
+	'NODE_NAMED_IDENTITIES',
+	'NODE_OUR_KEY_PAIRS',
+	'NODE_PROPERTIES',
+	'NODE_SCHEDULED_STATES',
+	'NODE_TRANSACTIONS',
+	'VAULT_FUNGIBLE_STATES',
+	'VAULT_FUNGIBLE_STATES_PARTS',
+	'VAULT_LINEAR_STATES',
+	'VAULT_LINEAR_STATES_PARTS',
+	'VAULT_STATES',
+	'VAULT_TRANSACTION_NOTES',
+]
+
+# Column types applied by the get_tbname and find_* methods. Columns missing
+# from a table, e.g. on another Corda version, are skipped.
+
+# Timestamps, converted to datetime64
+TIMESTAMP_COLUMNS = {
+	'NODE_ATTACHMENTS': ['INSERTION_DATE'],
+	'NODE_MESSAGE_IDS': ['INSERTION_TIME'],
+	'NODE_SCHEDULED_STATES': ['SCHEDULED_AT'],
+	'VAULT_STATES': ['RECORDED_TIMESTAMP', 'CONSUMED_TIMESTAMP', 'LOCK_TIMESTAMP'],
+}
+
+# Columns with few distinct values, converted to categoricals
+CATEGORY_COLUMNS = {
+	'NODE_ATTACHMENTS': ['UPLOADER', 'VERSION'],
+	'NODE_ATTACHMENTS_CONTRACTS': ['CONTRACT_CLASS_NAME'],
+	'NODE_CONTRACT_UPGRADES': ['CONTRACT_CLASS_NAME'],
+	'NODE_INFOS': ['PLATFORM_VERSION'],
+	'NODE_MESSAGE_IDS': ['SENDER'],
+	'NODE_TRANSACTIONS': ['STATUS'],
+	'STATE_PARTY': ['X500_NAME'],
+	'VAULT_FUNGIBLE_STATES': ['ISSUER_NAME', 'OWNER_NAME'],
+	'VAULT_FUNGIBLE_STATES_PARTS': ['PARTICIPANTS'],
+	'VAULT_LINEAR_STATES_PARTS': ['PARTICIPANTS'],
+	'VAULT_STATES': ['CONTRACT_STATE_CLASS_NAME', 'STATE_STATUS', 'NOTARY_NAME', 'RELEVANCY_STATUS', 'CONSTRAINT_TYPE', 'LOCK_ID'],
+}
+
+# Serialized payloads, only read when include_blobs is True
+BLOB_COLUMNS = {
+	'NODE_ATTACHMENTS': ['CONTENT'],
+	'NODE_CHECKPOINTS': ['CHECKPOINT_VALUE'],
+	'NODE_IDENTITIES': ['IDENTITY_VALUE'],
+	'NODE_INFO_PARTY_CERT': ['PARTY_CERT_BINARY'],
+	'NODE_MESSAGE_RETRY': ['MESSAGE'],
+	'NODE_TRANSACTIONS': ['TRANSACTION_VALUE'],
+	'VAULT_STATES': ['CONSTRAINT_DATA'],
+}
+
+# Columns identifying a row, used to match rows when diffing snapshots
+NATURAL_KEYS = {
+	'NODE_ATTACHMENTS': ['ATT_ID'],
+	'NODE_ATTACHMENTS_CONTRACTS': ['ATT_ID', 'CONTRACT_CLASS_NAME'],
+	'NODE_CHECKPOINTS': ['CHECKPOINT_ID'],
+	'NODE_CONTRACT_UPGRADES': ['STATE_REF'],
+	'NODE_IDENTITIES': ['PK_HASH'],
+	'NODE_INFOS': ['NODE_INFO_ID'],
+	'NODE_INFO_HOSTS': ['HOSTS_ID'],
+	'NODE_INFO_PARTY_CERT': ['PARTY_NAME'],
+	'NODE_LINK_NODEINFO_PARTY': ['NODE_INFO_ID', 'PARTY_NAME'],
+	'NODE_MESSAGE_IDS': ['MESSAGE_ID'],
+	'NODE_MESSAGE_RETRY': ['MESSAGE_ID'],
+	'NODE_NAMED_IDENTITIES': ['NAME'],
+	'NODE_OUR_KEY_PAIRS': ['PUBLIC_KEY_HASH'],
+	'NODE_PROPERTIES': ['PROPERTY_KEY'],
+	'NODE_SCHEDULED_STATES': ['TRANSACTION_ID', 'OUTPUT_INDEX'],
+	'NODE_TRANSACTIONS': ['TX_ID'],
+	'NODE_TRANSACTION_MAPPINGS': ['TX_ID'],
+	'STATE_PARTY': ['TRANSACTION_ID', 'OUTPUT_INDEX', 'PUBLIC_KEY_HASH'],
+	'VAULT_FUNGIBLE_STATES': ['TRANSACTION_ID', 'OUTPUT_INDEX'],
+	'VAULT_FUNGIBLE_STATES_PARTS': ['TRANSACTION_ID', 'OUTPUT_INDEX', 'PARTICIPANTS'],
+	'VAULT_LINEAR_STATES': ['TRANSACTION_ID', 'OUTPUT_INDEX'],
+	'VAULT_LINEAR_STATES_PARTS': ['TRANSACTION_ID', 'OUTPUT_INDEX', 'PARTICIPANTS'],
+	'VAULT_STATES': ['TRANSACTION_ID', 'OUTPUT_INDEX'],
+	'VAULT_TRANSACTION_NOTES': ['SEQ_NO'],
+}
+
+def apply_dtypes(table_name, df):
+	"""Converts the timestamp and categorical columns of a table read as Python objects"""
+	df = df.copy(deep=False)
+	for column in TIMESTAMP_COLUMNS.get(table_name, []):
+		if column in df.columns:
+			df[column] = pd.to_datetime(df[column], format='ISO8601')
+	for column in CATEGORY_COLUMNS.get(table_name, []):
+		if column in df.columns:
+			df[column] = df[column].astype('category')
+	return df
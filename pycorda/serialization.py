@@ -0,0 +1,525 @@
+"""Decoding of serialized Corda blobs such as checkpoints and transactions
+
+A Corda serialized blob starts with the 7 byte magic b'corda' plus a format
+version, 1.0 for AMQP and 0.0 for Kryo, followed by sections. An ENCODING
+section names the compression (DEFLATE or SNAPPY) of everything after it.
+DATA_AND_STOP or ALT_DATA_AND_STOP is followed by the serialized object.
+
+decode_blob parses the envelope without deserializing the object. For AMQP
+it measures the object, schema and transforms parts of the envelope and reads
+the class names from the schema. For Kryo it collects the class names Kryo
+writes inline. decode_table streams a table's blobs through a process pool.
+
+transaction_inputs decodes just enough of an AMQP SignedTransaction to read
+the StateRefs of its inputs and reference states. The fields of an AMQP
+object are named by the schema sent with it, so the walk follows field names
+rather than positions.
+"""
+import os
+import re
+import struct
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+MAGIC = b'corda'
+FORMATS = {(1, 0): 'AMQP', (0, 0): 'KRYO'}
+
+# Section ids
+DATA_AND_STOP = 0
+ENCODING = 1
+ALT_DATA_AND_STOP = 2
+
+ENCODINGS = {0: 'DEFLATE', 1: 'SNAPPY'}
+
+# Tables holding serialized blobs, with their key and blob columns
+BLOB_TABLES = {
+	'NODE_CHECKPOINTS': ('CHECKPOINT_ID', 'CHECKPOINT_VALUE'),
+	'NODE_TRANSACTIONS': ('TX_ID', 'TRANSACTION_VALUE'),
+}
+
+COLUMNS = ['FORMAT', 'ENCODING', 'SIZE', 'PAYLOAD_SIZE', 'HEADER_BYTES', 'OBJECT_BYTES',
+	'SCHEMA_BYTES', 'TRANSFORMS_BYTES', 'CLASS_COUNT', 'CLASSES', 'ERROR']
+
+INPUT_COLUMNS = ['TX_ID', 'INPUT_TX_ID', 'INPUT_INDEX', 'KIND', 'ERROR']
+
+# Component groups of a WireTransaction holding StateRefs, see ComponentGroupEnum
+STATE_REF_GROUPS = {0: 'input', 7: 'reference'}
+
+_CLASS_NAME = re.compile(r'^[A-Za-z_$][\w$]*(\.[A-Za-z_$][\w$]*)+(\[\])*$')
+
+# Kryo writes an ASCII string with the high bit set on its last character
+_KRYO_CLASS_NAME = re.compile(rb'(?:[A-Za-z_$][\w$]*\.)+[\w$]*[\xa4\xc1-\xda\xdf\xe1-\xfa\xb0-\xb9]')
+
+# Errors raised by blobs that cannot be parsed, which are reported per blob
+_DECODE_ERRORS = (ValueError, IndexError, KeyError, TypeError, AttributeError, StopIteration, struct.error, zlib.error)
+
+def _decompress(encoding, data):
+	if encoding == 'DEFLATE':
+		# Java's DeflaterOutputStream writes a zlib stream
+		return zlib.decompress(data)
+	if encoding != 'SNAPPY':
+		raise ValueError('unknown encoding')
+	try:
+		import snappy
+	except ImportError:
+		raise ValueError('python-snappy is needed to decode SNAPPY blobs')
+	try:
+		return snappy.StreamDecompressor().decompress(data)
+	except (snappy.UncompressError, OSError) as e:
+		# python-snappy 0.7 decompresses through cramjam, which raises OSError
+		raise ValueError('corrupt SNAPPY data: ' + str(e))
+
+# --- AMQP 1.0 encoding ---
+# The high nibble of a constructor byte gives the width of what follows:
+# fixed widths up to 0x9f, then a 1 or 4 byte size for variable, compound
+# and array values.
+
+_FIXED_WIDTHS = {0x4: 0, 0x5: 1, 0x6: 2, 0x7: 4, 0x8: 8, 0x9: 16}
+
+def _amqp_skip(data, pos):
+	"""Returns the position after the AMQP value starting at pos"""
+	code = data[pos]
+	pos += 1
+	if code == 0x00:
+		# described type: a descriptor and a value
+		return _amqp_skip(data, _amqp_skip(data, pos))
+	nibble = code >> 4
+	if nibble in _FIXED_WIDTHS:
+		end = pos + _FIXED_WIDTHS[nibble]
+	elif nibble in (0xa, 0xc, 0xe):
+		end = pos + 1 + data[pos]
+	elif nibble in (0xb, 0xd, 0xf):
+		end = pos + 4 + struct.unpack_from('>I', data, pos)[0]
+	else:
+		raise ValueError('invalid AMQP constructor 0x%02x' % code)
+	if end > len(data):
+		raise ValueError('truncated AMQP value')
+	return end
+
+Described = namedtuple('Described', ['descriptor', 'value'])
+
+# Constructors of fixed width values, with their struct format, or with a
+# constant for those without a body. 0x45 is the empty list
+_AMQP_CONSTANTS = {0x40: None, 0x41: True, 0x42: False, 0x43: 0, 0x44: 0}
+_AMQP_FORMATS = {
+	0x50: '>B', 0x51: '>b', 0x52: '>B', 0x53: '>B', 0x54: '>b', 0x55: '>b', 0x56: '>?',
+	0x60: '>H', 0x61: '>h', 0x70: '>I', 0x71: '>i', 0x72: '>f', 0x73: '>I',
+	0x80: '>Q', 0x81: '>q', 0x82: '>d', 0x83: '>q',
+}
+
+def _amqp_items(data, pos, end, count):
+	items = []
+	for i in range(count):
+		value, pos = _amqp_decode(data, pos)
+		items.append(value)
+	if pos != end:
+		raise ValueError('AMQP compound value does not match its size')
+	return items
+
+def _amqp_array(data, pos, end, count):
+	code = data[pos]
+	pos += 1
+	descriptor = None
+	if code == 0x00:
+		descriptor, pos = _amqp_decode(data, pos)
+		code = data[pos]
+		pos += 1
+	items = []
+	for i in range(count):
+		value, pos = _amqp_value(data, pos, code)
+		items.append(value if descriptor is None else Described(descriptor, value))
+	if pos != end:
+		raise ValueError('AMQP array does not match its size')
+	return items
+
+def _amqp_value(data, pos, code):
+	"""Decodes the value of constructor code at pos and returns it with the position after it"""
+	if code == 0x45:
+		return [], pos
+	if code in _AMQP_CONSTANTS:
+		return _AMQP_CONSTANTS[code], pos
+	if code in _AMQP_FORMATS:
+		value = struct.unpack_from(_AMQP_FORMATS[code], data, pos)[0]
+		return value, pos + struct.calcsize(_AMQP_FORMATS[code])
+	nibble = code >> 4
+	if nibble in _FIXED_WIDTHS:
+		# decimals and uuids are kept as bytes
+		end = pos + _FIXED_WIDTHS[nibble]
+		return data[pos:end], end
+	if nibble in (0xa, 0xc, 0xe):
+		size, pos = data[pos], pos + 1
+	elif nibble in (0xb, 0xd, 0xf):
+		size, pos = struct.unpack_from('>I', data, pos)[0], pos + 4
+	else:
+		raise ValueError('invalid AMQP constructor 0x%02x' % code)
+	end = pos + size
+	if end > len(data):
+		raise ValueError('truncated AMQP value')
+	if code in (0xa0, 0xb0):
+		return bytes(data[pos:end]), end
+	if code in (0xa1, 0xb1, 0xa3, 0xb3):
+		return data[pos:end].decode('utf-8'), end
+	if nibble in (0xc, 0xe):
+		count, pos = data[pos], pos + 1
+	else:
+		count, pos = struct.unpack_from('>I', data, pos)[0], pos + 4
+	if nibble in (0xe, 0xf):
+		return _amqp_array(data, pos, end, count), end
+	items = _amqp_items(data, pos, end, count)
+	if code in (0xc1, 0xd1):
+		return list(zip(items[::2], items[1::2])), end
+	return items, end
+
+def _amqp_decode(data, pos):
+	"""Decodes the AMQP value at pos and returns it with the position after it
+
+	Lists and arrays become lists, maps lists of key and value pairs and
+	described types Described tuples.
+	"""
+	code = data[pos]
+	pos += 1
+	if code == 0x00:
+		descriptor, pos = _amqp_decode(data, pos)
+		value, pos = _amqp_decode(data, pos)
+		return Described(descriptor, value), pos
+	return _amqp_value(data, pos, code)
+
+def _amqp_list_items(data, pos):
+	"""Returns the start and end of each item of the AMQP list at pos"""
+	code = data[pos]
+	if code == 0x45:
+		return []
+	if code == 0xc0:
+		count, pos = data[pos + 2], pos + 3
+	elif code == 0xd0:
+		count, pos = struct.unpack_from('>I', data, pos + 5)[0], pos + 9
+	else:
+		raise ValueError('expected an AMQP list, found 0x%02x' % code)
+	items = []
+	for i in range(count):
+		end = _amqp_skip(data, pos)
+		items.append((pos, end))
+		pos = end
+	return items
+
+def _amqp_strings(data):
+	"""Yields the str and sym values found by scanning AMQP bytes"""
+	pos = 0
+	end = len(data) - 1
+	while pos < end:
+		code = data[pos]
+		if code in (0xa1, 0xa3):
+			size, start = data[pos + 1], pos + 2
+		elif code in (0xb1, 0xb3) and pos + 5 <= len(data):
+			size, start = struct.unpack_from('>I', data, pos + 1)[0], pos + 5
+		else:
+			pos += 1
+			continue
+		value = data[start:start + size]
+		try:
+			yield value.decode('utf-8')
+			pos = start + size
+		except UnicodeDecodeError:
+			pos += 1
+
+def _class_names(strings):
+	names = []
+	for value in strings:
+		if _CLASS_NAME.match(value) and value not in names:
+			names.append(value)
+	return names
+
+def _decode_amqp(data, result):
+	# The envelope is a described list of the object, its schema and, since
+	# Corda 4, a transforms schema
+	if data[:1] != b'\x00':
+		raise ValueError('AMQP envelope is not a described type')
+	items = _amqp_list_items(data, _amqp_skip(data, 1))
+	names = ['OBJECT_BYTES', 'SCHEMA_BYTES', 'TRANSFORMS_BYTES']
+	for name, (start, end) in zip(names, items):
+		result[name] = end - start
+	schema = data[items[1][0]:items[1][1]] if len(items) > 1 else data
+	return _class_names(_amqp_strings(schema))
+
+def _decode_kryo(data):
+	names = []
+	for match in _KRYO_CLASS_NAME.finditer(data):
+		value = match.group()
+		name = (value[:-1] + bytes([value[-1] & 0x7f])).decode('ascii')
+		if _CLASS_NAME.match(name) and name not in names:
+			names.append(name)
+	return names
+
+def _unwrap(data, result):
+	"""Returns the serialized object of a blob, without its header and compression
+
+	FORMAT, ENCODING and HEADER_BYTES of result are set as parsing goes.
+	"""
+	if data[:5] != MAGIC or len(data) < 7:
+		raise ValueError('no Corda serialization magic')
+	result['FORMAT'] = FORMATS.get((data[5], data[6]), 'UNKNOWN')
+	pos = 7
+	header = 7
+	while True:
+		if pos >= len(data):
+			raise ValueError('no data section')
+		section = data[pos]
+		if section == ENCODING:
+			result['ENCODING'] = ENCODINGS.get(data[pos + 1], 'UNKNOWN')
+			header += 2
+			data = _decompress(result['ENCODING'], data[pos + 2:])
+			pos = 0
+		elif section in (DATA_AND_STOP, ALT_DATA_AND_STOP):
+			result['HEADER_BYTES'] = header + 1
+			return data[pos + 1:]
+		else:
+			raise ValueError('unknown section id %d' % section)
+
+def decode_blob(blob):
+	"""Parses the serialization envelope of a blob
+
+	Parameters
+    ----------
+    blob : bytes
+        serialized value, e.g. a CHECKPOINT_VALUE
+
+    Returns
+    -------
+    dict
+        FORMAT (AMQP or KRYO), ENCODING (DEFLATE, SNAPPY or None), SIZE of the
+        blob, PAYLOAD_SIZE of the object after decompression, HEADER_BYTES
+        before it, for AMQP the OBJECT_BYTES, SCHEMA_BYTES and TRANSFORMS_BYTES
+        of the envelope, CLASS_COUNT and CLASSES, the class names found. ERROR
+        describes a blob that could not be parsed, the other values are then
+        as far as parsing got
+	"""
+	result = dict((column, None) for column in COLUMNS)
+	if blob is None:
+		return result
+	data = bytes(blob)
+	result['SIZE'] = len(data)
+	try:
+		data = _unwrap(data, result)
+		result['PAYLOAD_SIZE'] = len(data)
+		if result['FORMAT'] == 'AMQP':
+			classes = _decode_amqp(data, result)
+		else:
+			classes = _decode_kryo(data)
+		result['CLASS_COUNT'] = len(classes)
+		result['CLASSES'] = classes
+	except _DECODE_ERRORS as e:
+		result['ERROR'] = str(e) or type(e).__name__
+	return result
+
+def decode_blobs(blobs, workers=None, chunksize=64):
+	"""Decodes blobs on a process pool and returns a list of decode_blob results in order
+
+	Parameters
+    ----------
+    blobs : iterable
+        serialized values
+    workers : int, optional
+        number of processes, defaults to the number of CPUs. With 1 the
+        blobs are decoded in this process
+    chunksize : int
+        blobs sent to a process at a time
+	"""
+	if workers is None:
+		workers = os.cpu_count() or 1
+	if workers <= 1:
+		return [decode_blob(blob) for blob in blobs]
+	with ProcessPoolExecutor(max_workers=workers) as executor:
+		return list(executor.map(decode_blob, blobs, chunksize=chunksize))
+
+def decode_table(node, table_name='NODE_CHECKPOINTS', workers=None, chunksize=1000):
+	"""Streams the blobs of a table through decode_blobs
+
+	Only chunksize rows are held at a time, and the blobs themselves are not
+	kept in the result.
+
+	Parameters
+    ----------
+    node : pycorda.Node
+        node, offline node or snapshot to read from
+    table_name : str
+        a table of BLOB_TABLES
+    workers : int, optional
+        number of processes, see decode_blobs
+    chunksize : int
+        rows read and decoded at a time
+
+    Returns
+    -------
+    pandas.DataFrame
+        the key column of the table followed by the columns of decode_blob
+	"""
+	key, value = BLOB_TABLES[table_name]
+	if workers is None:
+		workers = os.cpu_count() or 1
+	executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+	frames = []
+	try:
+		for chunk in node.iter_table(table_name, chunksize=chunksize, columns=[key, value]):
+			blobs = list(chunk[value])
+			if executor is None:
+				decoded = [decode_blob(blob) for blob in blobs]
+			else:
+				# A few tasks per process balances blobs of uneven size
+				decoded = list(executor.map(decode_blob, blobs, chunksize=max(len(blobs) // (4 * workers), 1)))
+			df = pd.DataFrame(decoded, columns=COLUMNS)
+			df.insert(0, key, chunk[key].values)
+			frames.append(df)
+	finally:
+		if executor is not None:
+			executor.shutdown()
+	if not frames:
+		return pd.DataFrame(columns=[key] + COLUMNS)
+	return pd.concat(frames, ignore_index=True)
+
+class _Envelope(object):
+	"""The object of an AMQP blob with the field names of its schema's composite types"""
+
+	def __init__(self, blob):
+		result = {}
+		data = _unwrap(bytes(blob), result)
+		if result['FORMAT'] != 'AMQP':
+			raise ValueError('only AMQP blobs can be walked, found ' + str(result['FORMAT']))
+		envelope, end = _amqp_decode(data, 0)
+		if not isinstance(envelope, Described) or len(envelope.value) < 2:
+			raise ValueError('AMQP envelope is not a described list')
+		self.object = envelope.value[0]
+		self.fields = {}
+		schema = envelope.value[1].value
+		for notation in schema[0]:
+			# composite types are name, label, provides, descriptor and fields,
+			# restricted types have a source and choices instead of fields
+			if isinstance(notation, Described) and len(notation.value) == 5:
+				descriptor, fields = notation.value[3], notation.value[4]
+				self.fields[descriptor.value[0]] = [field.value[0] for field in fields]
+
+	def record(self, value):
+		"""Returns the fields of a described object as a dict keyed by field name"""
+		if not isinstance(value, Described) or value.descriptor not in self.fields:
+			raise ValueError('expected a described object')
+		return dict(zip(self.fields[value.descriptor], value.value))
+
+	def bytes(self, value):
+		"""Returns the bytes of a binary value or of an object wrapping one, such as OpaqueBytes"""
+		if isinstance(value, bytes):
+			return value
+		fields = self.record(value)
+		data = next(field for field in fields.values() if isinstance(field, bytes))
+		if 'offset' in fields and 'size' in fields:
+			return data[fields['offset']:fields['offset'] + fields['size']]
+		return data
+
+def _state_refs(blob):
+	"""Returns the (transaction id, output index) of a serialized StateRef or list of them"""
+	envelope = _Envelope(blob)
+	refs = envelope.object if isinstance(envelope.object, list) else [envelope.object]
+	states = []
+	for ref in refs:
+		fields = envelope.record(ref)
+		states.append((envelope.bytes(fields['txhash']).hex().upper(), int(fields['index'])))
+	return states
+
+def transaction_inputs(blob):
+	"""Reads the StateRefs a serialized SignedTransaction depends on
+
+	WireTransactions list them in their input and reference component groups,
+	notary change and contract upgrade transactions in their first serialized
+	component.
+
+	Parameters
+    ----------
+    blob : bytes
+        AMQP serialized SignedTransaction, e.g. a TRANSACTION_VALUE
+
+    Returns
+    -------
+    list
+        (TX_ID, OUTPUT_INDEX, KIND) of each state, KIND being input or reference
+	"""
+	signed = _Envelope(blob)
+	transaction = _Envelope(signed.bytes(signed.record(signed.object)['txBits']))
+	fields = transaction.record(transaction.object)
+	states = []
+	if 'componentGroups' in fields:
+		for group in fields['componentGroups']:
+			group = transaction.record(group)
+			kind = STATE_REF_GROUPS.get(group['groupIndex'])
+			if kind is None:
+				continue
+			for component in group['components']:
+				states.extend(ref + (kind,) for ref in _state_refs(transaction.bytes(component)))
+	elif 'serializedComponents' in fields:
+		components = fields['serializedComponents']
+		if components:
+			states.extend(ref + ('input',) for ref in _state_refs(transaction.bytes(components[0])))
+	else:
+		raise ValueError('no component groups in ' + ', '.join(fields))
+	return states
+
+def _transaction_input_rows(blob):
+	"""Returns transaction_inputs of a blob, or an error message, in a form the process pool can send back"""
+	try:
+		return transaction_inputs(blob), None
+	except _DECODE_ERRORS as e:
+		return [], str(e) or type(e).__name__
+
+def read_transaction_inputs(node, tx_ids=None, skip=(), workers=None, chunksize=500):
+	"""Reads NODE_TRANSACTIONS through transaction_inputs on a process pool
+
+	The TX_ID column is read first, and only the TRANSACTION_VALUE blobs of
+	the transactions left after skip are fetched, chunksize at a time with a
+	TX_ID IN (...) filter.
+
+	Parameters
+    ----------
+    node : pycorda.Node
+        node, offline node or snapshot to read from
+    tx_ids : collection, optional
+        TX_IDs to decode, defaults to all of NODE_TRANSACTIONS
+    skip : collection, optional
+        TX_IDs that are not decoded, e.g. those already read
+    workers : int, optional
+        number of processes, see decode_blobs
+    chunksize : int
+        transactions fetched and decoded at a time, each a parameter of the query
+
+    Returns
+    -------
+    pandas.DataFrame
+        one row per state a transaction depends on, with the TX_ID of the
+        transaction, INPUT_TX_ID and INPUT_INDEX of the state and its KIND.
+        A transaction that could not be decoded has one row with its ERROR
+	"""
+	if workers is None:
+		workers = os.cpu_count() or 1
+	if tx_ids is None:
+		tx_ids = node.get_node_transactions(columns=['TX_ID']).TX_ID.astype(object)
+	skip = set(skip)
+	tx_ids = [tx_id for tx_id in pd.unique(pd.Series(list(tx_ids), dtype=object)) if tx_id not in skip]
+	executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and tx_ids else None
+	rows = []
+	try:
+		for start in range(0, len(tx_ids), chunksize):
+			chunk = node.get_node_transactions(columns=['TX_ID', 'TRANSACTION_VALUE'],
+				where={'TX_ID': tx_ids[start:start + chunksize]})
+			blobs = list(chunk.TRANSACTION_VALUE)
+			if executor is None:
+				decoded = [_transaction_input_rows(blob) for blob in blobs]
+			else:
+				decoded = executor.map(_transaction_input_rows, blobs, chunksize=max(len(blobs) // (4 * workers), 1))
+			for tx_id, (states, error) in zip(chunk.TX_ID, decoded):
+				if error is not None:
+					rows.append((tx_id, None, None, None, error))
+				rows.extend((tx_id,) + state + (None,) for state in states)
+	finally:
+		if executor is not None:
+			executor.shutdown()
+	df = pd.DataFrame(rows, columns=INPUT_COLUMNS)
+	df['INPUT_INDEX'] = df['INPUT_INDEX'].astype('Int64')
+	return df
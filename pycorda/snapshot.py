@@ -0,0 +1,161 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import pandas as pd
+from .offline import OfflineNode
+from .schema import SNAPSHOT_TABLES
+
+# A snapshot is a directory holding manifest.json and one folder of Parquet
+# parts per table. The manifest is rewritten after every completed table, so
+# an interrupted snapshot can be resumed from the last complete table.
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+def _sha256(path):
+	digest = hashlib.sha256()
+	with open(path, 'rb') as f:
+		for block in iter(lambda: f.read(1 << 20), b''):
+			digest.update(block)
+	return digest.hexdigest()
+
+def _part_path(path, part):
+	return os.path.join(path, *part['file'].split('/'))
+
+def read_manifest(path):
+	"""Returns the manifest of the snapshot in directory path"""
+	with open(os.path.join(path, MANIFEST)) as f:
+		return json.load(f)
+
+def _write_manifest(path, manifest):
+	tmp_path = os.path.join(path, MANIFEST + '.tmp')
+	with open(tmp_path, 'w') as f:
+		json.dump(manifest, f, indent=1)
+	os.replace(tmp_path, os.path.join(path, MANIFEST))
+
+def _table_is_intact(path, entry):
+	for part in entry['parts']:
+		part_path = _part_path(path, part)
+		if not os.path.exists(part_path) or _sha256(part_path) != part['sha256']:
+			return False
+	return True
+
+def _write_table(node, path, table_name, chunksize, compression):
+	import pyarrow as pa
+	import pyarrow.parquet as pq
+	table_dir = os.path.join(path, table_name)
+	shutil.rmtree(table_dir, ignore_errors=True)
+	os.makedirs(table_dir)
+	columns = None
+	parts = []
+	for i, chunk in enumerate(node.iter_table(table_name, chunksize=chunksize, include_blobs=True)):
+		columns = list(chunk.columns)
+		part = {'file': table_name + '/part-%05d.parquet' % i, 'rows': len(chunk)}
+		part_path = _part_path(path, part)
+		pq.write_table(pa.Table.from_pandas(chunk, preserve_index=False), part_path, compression=compression)
+		part['sha256'] = _sha256(part_path)
+		parts.append(part)
+	if columns is None:
+		columns = list(node._get_df(table_name, limit=0).columns)
+	return {'columns': columns, 'rows': sum(part['rows'] for part in parts), 'parts': parts}
+
+def write_snapshot(node, path, tables=None, resume=False, chunksize=50000, compression='zstd'):
+	"""Writes node tables to a snapshot directory of compressed Parquet files
+
+	Each table is streamed in chunks of chunksize rows, so memory use does not
+	grow with table size. Requires pyarrow.
+
+	Parameters
+    ----------
+    node : pycorda.base.BaseNode
+        node the tables are read from
+    path : str
+        snapshot directory, created if missing
+    tables : list, optional
+        table names to write, defaults to schema.SNAPSHOT_TABLES
+    resume : bool
+        keep the tables of an interrupted snapshot in path whose checksums
+        still match and only write the missing ones
+    chunksize : int
+        number of rows per Parquet part
+    compression : str
+        Parquet compression codec
+
+    Returns
+    -------
+    dict
+        the snapshot manifest with row counts and SHA-256 checksums
+	"""
+	if tables is None:
+		tables = SNAPSHOT_TABLES
+	os.makedirs(path, exist_ok=True)
+	manifest = None
+	if resume and os.path.exists(os.path.join(path, MANIFEST)):
+		manifest = read_manifest(path)
+	if manifest is None:
+		manifest = {
+			'format': 'pycorda-snapshot',
+			'version': FORMAT_VERSION,
+			'node': node._name,
+			'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+			'tables': {},
+		}
+	manifest['complete'] = False
+	for table_name in tables:
+		entry = manifest['tables'].get(table_name)
+		if entry is not None and _table_is_intact(path, entry):
+			continue
+		manifest['tables'][table_name] = _write_table(node, path, table_name, chunksize, compression)
+		_write_manifest(path, manifest)
+	manifest['complete'] = True
+	_write_manifest(path, manifest)
+	return manifest
+
+class SnapshotNode(OfflineNode):
+	"""Node-like object that serves tables from a snapshot directory
+
+	Offers the same get_tbname, iter_table, find_* and generate_snapshot methods as
+	pycorda.Node without a database connection. Filters are evaluated in memory.
+	"""
+
+	def __init__(self, path, verify=False):
+		"""
+        Parameters
+        ----------
+        path : str
+            snapshot directory written by write_snapshot or Node.export_snapshot
+        verify : bool
+            check the checksum of every part when loading
+        """
+		self.path = path
+		self.manifest = read_manifest(path)
+		self.set_name(self.manifest.get('node', ''))
+		if verify:
+			self.verify()
+
+	def tables(self):
+		"""Returns the names of the tables in the snapshot"""
+		return list(self.manifest['tables'])
+
+	def verify(self):
+		"""Raises ValueError if a table file is missing or does not match its checksum"""
+		for table_name, entry in self.manifest['tables'].items():
+			if not _table_is_intact(self.path, entry):
+				raise ValueError('snapshot table ' + table_name + ' is missing or corrupt')
+
+	def _entry(self, table_name):
+		try:
+			return self.manifest['tables'][table_name]
+		except KeyError:
+			raise ValueError(table_name + ' is not in snapshot ' + self.path)
+
+	def _parts(self, table_name):
+		return [_part_path(self.path, part) for part in self._entry(table_name)['parts']]
+
+	def _read_part(self, part, columns=None):
+		return pd.read_parquet(part, columns=columns)
+
+	def _columns(self, table_name):
+		return self._entry(table_name)['columns']
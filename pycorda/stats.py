@@ -1,29 +1,37 @@
-from pycorda import Node
-from datetime import datetime
 import matplotlib
 from matplotlib import pyplot
+import numpy as np
 import pandas as pd
-import chart_studio, chart_studio.plotly as py, plotly.graph_objs as go
-from sklearn import linear_model as lm
+from .instrument import first_argument, instrumented
 
-# Format for timestamp string is YYYY-MM-DD HH:MM:SS.FFF
-
-def plot_time_series(timestamp_column, title=None):
+def plot_time_series(timestamp_column, title=None, max_points=10000, bins=200):
 	"""Plots time series for a given sequence of timestamps
 
+	Timestamps are converted in one vectorized call. Series of up to max_points
+	timestamps are plotted as points, larger ones as a histogram of bins equal
+	intervals, so plot time stays flat as the series grows.
+
 	Parameters
     ----------
     timestamp_column : iterable object
-        iterable of timestamp strings in the %Y-%m-%d %H:%M:%S.%f format
+        iterable of datetimes or timestamp strings in the %Y-%m-%d %H:%M:%S.%f format
     title : str, optional
     	figure title
+    max_points : int
+        largest series plotted point by point
+    bins : int
+        number of histogram intervals for larger series
 	"""
-	dt_list = [datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S.%f') for timestamp in timestamp_column]
-	dates = matplotlib.dates.date2num(dt_list)
+	timestamps = pd.to_datetime(pd.Series(timestamp_column), format='ISO8601').dropna()
 	fig, ax = pyplot.subplots()
 	if title is not None:
 		ax.set_title(title)
-	ax.plot_date(dates, [0]*len(dates))
+	if len(timestamps) > max_points:
+		counts, edges = np.histogram(timestamps.values.astype('datetime64[ns]').view('int64'), bins=bins)
+		ax.stairs(counts, matplotlib.dates.date2num(edges.astype('int64').astype('datetime64[ns]')), fill=True)
+	else:
+		ax.plot(matplotlib.dates.date2num(timestamps.values), np.zeros(len(timestamps)), 'o')
+	ax.xaxis_date()
 	ax.fmt_xdata = matplotlib.dates.DateFormatter('%Y-%m-%d %H:%M:%S.%f')
 	fig.autofmt_xdate()
 
@@ -50,6 +58,9 @@ def plot_ids(ids, fontsize, title=None):
 		ax.annotate(txt, (points[i], 0.001), ha='center', fontsize=fontsize)
 	ax.set_xlim(-0.5, min(5, n))
 
+def _node_instruments(plotter):
+	return plotter.node.instruments
+
 class Plotter(object):
 	"""Plotter object for plotting data obtained from a database node
 
@@ -67,13 +78,11 @@ class Plotter(object):
         """
 		self.node = node
 
-	def publish_timeseries_fungible_qty_plotly(self, contract, user,api_key):
+	@instrumented('Plotter.publish_timeseries_fungible_qty_plotly', target=first_argument, registry=_node_instruments)
+	def publish_timeseries_fungible_qty_plotly(self, contract, user,api_key,unit=None):
+		import chart_studio, chart_studio.plotly as py, plotly.graph_objs as go
 		chart_studio.tools.set_credentials_file(username=user,api_key=api_key)
-		vault_states = self.node.get_vault_states()
-		vault_states = vault_states[vault_states.CONTRACT_STATE_CLASS_NAME==contract]
-		vault_fungible_states = self.node.get_vault_fungible_states()
-		df = vault_states.merge(vault_fungible_states)[['RECORDED_TIMESTAMP','QUANTITY']]
-		df['RECORDED_TIMESTAMP'] = pd.to_datetime(df['RECORDED_TIMESTAMP'])
+		df = self.node.fungible_quantity_series(contract, unit)
 		series = go.Scatter(
 			x=df['RECORDED_TIMESTAMP'].tolist(),
 			y=df['QUANTITY'].tolist()
@@ -82,31 +91,31 @@ class Plotter(object):
 		url = py.plot(data,filename='Coda - ' + contract)
 		print('Link to your Plotly chart is',url)
 
+	@instrumented('Plotter.plot_timeseries_node_attachments', registry=_node_instruments)
 	def plot_timeseries_node_attachments(self):
-		df = self.node.get_node_attachments()
+		df = self.node.get_node_attachments(columns=['INSERTION_DATE'])
 		plot_time_series(df['INSERTION_DATE'], 'Node attachments time series')
 
+	@instrumented('Plotter.plot_timeseries_node_message_ids', registry=_node_instruments)
 	def plot_timeseries_node_message_ids(self):
-		df = self.node.get_node_message_ids()
+		df = self.node.get_node_message_ids(columns=['INSERTION_TIME'])
 		plot_time_series(df['INSERTION_TIME'], 'Node message IDs time series')
 
+	@instrumented('Plotter.plot_timeseries_vault_states_consumed', registry=_node_instruments)
 	def plot_timeseries_vault_states_consumed(self):
-		df = self.node.get_vault_states()
-		plot_time_series(df['CONSUMED_TIMESTAMP'].dropna(), 'Vault states consumed times')
-
-	def plot_timeseries_fungible_qty(self,contract):
-
-		'''
-		SELECT RECORDED_TIMESTAMP,QUANTITY FROM VAULT_STATES, VAULT_FUNGIBLE_STATES
-		WHERE VAULT_STATES.TRANSACTION_ID = VAULT_FUNGIBLE_STATES.TRANSACTION_ID
-		AND VAULT_STATES.CONTRACT_STATE_CLASS_NAME = 'net.corda.finance.contracts.asset.Cash$State'
-
-		'''
-		vault_states = self.node.get_vault_states()
-		vault_states = vault_states[vault_states.CONTRACT_STATE_CLASS_NAME==contract]
-		vault_fungible_states = self.node.get_vault_fungible_states()
-		df = vault_states.merge(vault_fungible_states)[['RECORDED_TIMESTAMP','QUANTITY']]
-		df['RECORDED_TIMESTAMP'] = pd.to_datetime(df['RECORDED_TIMESTAMP'])
+		# Unconsumed states are filtered out by the database rather than transferred
+		df = self.node.get_vault_states(columns=['CONSUMED_TIMESTAMP'], where='CONSUMED_TIMESTAMP IS NOT NULL')
+		plot_time_series(df['CONSUMED_TIMESTAMP'], 'Vault states consumed times')
+
+	@instrumented('Plotter.plot_timeseries_fungible_qty', target=first_argument, registry=_node_instruments)
+	def plot_timeseries_fungible_qty(self,contract,unit=None):
+		"""Plots the quantities of a contract's fungible states over time
+
+		The join with VAULT_FUNGIBLE_STATES runs in the database, see
+		Node.fungible_quantity_series. With unit set to minute, hour or day
+		the quantities are summed per unit of time by the database as well.
+		"""
+		df = self.node.fungible_quantity_series(contract, unit)
 		df.plot(kind='line',x='RECORDED_TIMESTAMP',y='QUANTITY',color='red')
 		print(df)
 
@@ -117,13 +126,15 @@ class Plotter(object):
 	# 	df = self.node.get_vault_states()
 	# 	plot_time_series(df['RECORDED_TIMESTAMP'].dropna(), 'Vault states recorded times')		
 
+	@instrumented('Plotter.node_checkpoints_ids', registry=_node_instruments)
 	def node_checkpoints_ids(self):
-		df = self.node.get_node_checkpoints()
+		df = self.node.get_node_checkpoints(columns=['CHECKPOINT_ID'])
 		plot_ids(df['CHECKPOINT_ID'], 9, 'Checkpoint IDs')
 
+	@instrumented('Plotter.vault_states_status', registry=_node_instruments)
 	def vault_states_status(self):
 		"""Plots pie chart of the relative frequencies of vault state status"""
-		df = self.node.get_vault_states()
+		df = self.node.get_vault_states(columns=['STATE_STATUS'])
 		df['STATE_STATUS'].value_counts().plot.pie()
 
 	def show(self):
@@ -0,0 +1,216 @@
+import pandas as pd
+from .schema import apply_dtypes
+
+STATE_KEY = ['TRANSACTION_ID', 'OUTPUT_INDEX']
+
+def _as_sql_timestamp(value):
+	"""Formats a timestamp so it can be bound as a query parameter"""
+	if hasattr(value, 'strftime'):
+		return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+	return str(value)
+
+def _positions(df, key=STATE_KEY):
+	"""Maps the key of each row of df to its position"""
+	return dict((row, i) for i, row in enumerate(zip(*(df[column] for column in key))))
+
+def _differs(a, b):
+	"""Returns a boolean array, True where rows of a and b, aligned by position, have a different value"""
+	a, b = a.astype(object).values, b.astype(object).values
+	return ((a != b) & ~(pd.isnull(a) & pd.isnull(b))).any(axis=1)
+
+def _align_categories(current, rows):
+	"""Gives the categorical columns of current and rows the same categories, so that they can be concatenated and assigned"""
+	current, rows = current.copy(deep=False), rows.copy(deep=False)
+	for column in current.columns:
+		if isinstance(current[column].dtype, pd.CategoricalDtype):
+			values = rows[column].astype(object)
+			missing = pd.Index(values.dropna().unique()).difference(current[column].cat.categories)
+			if len(missing):
+				current[column] = current[column].cat.add_categories(missing)
+			rows[column] = pd.Categorical(values, categories=current[column].cat.categories)
+	return current, rows
+
+def _merge_states(current, positions, fetched, key=STATE_KEY):
+	"""Updates current with the fetched rows, matched on key through positions
+
+	Only fetched rows are compared: rows with a new key are appended and rows
+	whose values differ are overwritten in place. positions is updated.
+
+	Returns
+    -------
+    (pandas.DataFrame, int)
+        the merged rows and the number of fetched rows that were new or changed
+	"""
+	fetched = fetched.drop_duplicates(key, keep='last').reset_index(drop=True)
+	found = pd.Series([positions.get(row, -1) for row in zip(*(fetched[column] for column in key))], dtype='int64')
+	old = fetched[(found >= 0).values]
+	new = fetched[(found < 0).values]
+	if len(old):
+		old_positions = found[found >= 0].values
+		changed = _differs(current.iloc[old_positions], old)
+		old, old_positions = old[changed], old_positions[changed]
+	if not len(old) and not len(new):
+		return current, 0
+	current, fetched = _align_categories(current, pd.concat([old, new]))
+	old, new = fetched.iloc[:len(old)], fetched.iloc[len(old):]
+	if len(old):
+		# Frames handed out by earlier refreshes are not changed
+		current = current.copy()
+		for i, column in enumerate(current.columns):
+			current.iloc[old_positions, i] = old[column].values
+	if len(new):
+		for i, row in enumerate(zip(*(new[column] for column in key))):
+			positions[row] = len(current) + i
+		current = pd.concat([current, new], ignore_index=True)
+	return current, len(old) + len(new)
+
+class VaultSync(object):
+	"""Local copy of the vault tables that is refreshed incrementally
+
+	The first refresh downloads VAULT_STATES, VAULT_LINEAR_STATES and
+	VAULT_FUNGIBLE_STATES. Later refreshes only fetch the VAULT_STATES rows
+	whose RECORDED_TIMESTAMP or CONSUMED_TIMESTAMP is at or after the high-water
+	mark less a lookback, plus the linear and fungible rows of newly recorded
+	transactions, and merge them into the local frames on TRANSACTION_ID and
+	OUTPUT_INDEX. The merge looks up the fetched keys in a dict of row
+	positions, so its cost grows with the rows fetched rather than the vault.
+
+	Corda takes these timestamps before the database transaction commits, so a
+	concurrent flow can commit a row stamped earlier than rows already synced.
+	The lookback re-reads that window so such rows are not missed.
+	"""
+
+	def __init__(self, node, lookback=60):
+		"""
+        Parameters
+        ----------
+        node : pycorda.Node
+            node the vault tables are read from
+        lookback : float
+            seconds before the high-water mark that each refresh reads again,
+            which should exceed the longest time a flow takes to commit
+        """
+		self.node = node
+		self.lookback = lookback
+		self.high_water_mark = None
+		self.vault_states = None
+		self.vault_linear_states = None
+		self.vault_fungible_states = None
+		self._positions = {}
+
+	def refresh(self):
+		"""Fetches vault changes since the last refresh and returns the number of new or changed states"""
+		if self.high_water_mark is None:
+			vault_states = self.node.get_vault_states()
+			linear_states = self.node.get_vault_linear_states()
+			fungible_states = self.node.get_vault_fungible_states()
+		else:
+			# Rows within the lookback are fetched again, since more of them may
+			# have been committed after the previous refresh. Only those that are new or differ are merged.
+			mark = _as_sql_timestamp(self.high_water_mark - pd.Timedelta(seconds=self.lookback))
+			vault_states = self.node._get_table("VAULT_STATES",
+				where='RECORDED_TIMESTAMP >= ? OR CONSUMED_TIMESTAMP >= ?', params=[mark, mark])
+			# Linear and fungible rows never change once recorded, so only new transactions are joined
+			recorded = 'TRANSACTION_ID IN (SELECT TRANSACTION_ID FROM VAULT_STATES WHERE RECORDED_TIMESTAMP >= ?)'
+			linear_states = self.node._get_table("VAULT_LINEAR_STATES", where=recorded, params=[mark])
+			fungible_states = self.node._get_table("VAULT_FUNGIBLE_STATES", where=recorded, params=[mark])
+
+		if self.high_water_mark is None:
+			changed = len(vault_states)
+			self.vault_states = vault_states
+			self.vault_linear_states = linear_states
+			self.vault_fungible_states = fungible_states
+			self._positions = dict((table_name, _positions(df)) for table_name, df in [
+				('VAULT_STATES', vault_states), ('VAULT_LINEAR_STATES', linear_states), ('VAULT_FUNGIBLE_STATES', fungible_states)])
+		else:
+			self.vault_states, changed = _merge_states(self.vault_states, self._positions['VAULT_STATES'], vault_states)
+			self.vault_linear_states = _merge_states(self.vault_linear_states, self._positions['VAULT_LINEAR_STATES'], linear_states)[0]
+			self.vault_fungible_states = _merge_states(self.vault_fungible_states, self._positions['VAULT_FUNGIBLE_STATES'], fungible_states)[0]
+
+		marks = [vault_states['RECORDED_TIMESTAMP'].max(), vault_states['CONSUMED_TIMESTAMP'].max()]
+		if self.high_water_mark is not None:
+			marks.append(self.high_water_mark)
+		marks = [mark for mark in marks if not pd.isnull(mark)]
+		if marks:
+			self.high_water_mark = max(marks)
+		return changed
+
+	def reset(self):
+		"""Drops the local copy so the next refresh downloads the whole vault again"""
+		self.__init__(self.node, self.lookback)
+
+def _hash_index(df, column):
+	"""Maps each value of column to the positions of its rows"""
+	return df.groupby(column, sort=False).indices
+
+def _take(df, index, key):
+	positions = index.get(key)
+	if positions is None:
+		return df.iloc[0:0]
+	return df.iloc[positions].reset_index(drop=True)
+
+class VaultIndex(object):
+	"""In-memory vault with hash indexes for repeated lookups
+
+	Loads VAULT_STATES, VAULT_LINEAR_STATES and VAULT_FUNGIBLE_STATES once and
+	indexes them on TRANSACTION_ID, UUID, ISSUER_NAME and CONTRACT_STATE_CLASS_NAME.
+	The find_* methods have the same names and results as those of pycorda.Node,
+	but each lookup is a dict access instead of a query. Call refresh to reload.
+	"""
+
+	def __init__(self, node, incremental=False):
+		"""
+        Parameters
+        ----------
+        node : pycorda.Node
+            node the vault tables are read from
+        incremental : bool
+            refresh through a VaultSync, which only fetches states recorded or
+            consumed since the previous refresh. Needs a database backed node
+        """
+		self.node = node
+		self._sync = VaultSync(node) if incremental else None
+		self.refresh()
+
+	def refresh(self):
+		"""Reloads the vault tables and rebuilds the indexes"""
+		if self._sync is not None:
+			self._sync.refresh()
+			vault_states = self._sync.vault_states
+			linear_states = self._sync.vault_linear_states
+			fungible_states = self._sync.vault_fungible_states
+		else:
+			vault_states = self.node.get_vault_states()
+			linear_states = self.node.get_vault_linear_states()
+			fungible_states = self.node.get_vault_fungible_states()
+		unconsumed_states = vault_states[vault_states.CONSUMED_TIMESTAMP.isnull()].reset_index(drop=True)
+
+		self.vault_states = vault_states
+		self.vault_linear_states = linear_states
+		self.vault_fungible_states = fungible_states
+		self._unconsumed_states = unconsumed_states
+		self._states_by_transaction = _hash_index(vault_states, 'TRANSACTION_ID')
+		self._unconsumed_by_contract = _hash_index(unconsumed_states, 'CONTRACT_STATE_CLASS_NAME')
+		self._linear_by_uuid = _hash_index(linear_states, 'UUID')
+		self._linear_by_transaction = _hash_index(linear_states, 'TRANSACTION_ID')
+		self._fungible_by_transaction = _hash_index(fungible_states, 'TRANSACTION_ID')
+		self._fungible_by_issuer = _hash_index(fungible_states, 'ISSUER_NAME')
+
+	def find_transactions_by_linear_id(self,linear_id):
+		return _take(self.vault_linear_states, self._linear_by_uuid, linear_id)
+
+	def find_vault_states_by_transaction_id(self,tx_id):
+		return _take(self.vault_states, self._states_by_transaction, tx_id)
+
+	def find_vault_fungible_states_by_transaction_id(self,tx_id):
+		return _take(self.vault_fungible_states, self._fungible_by_transaction, tx_id)
+
+	def find_vault_fungible_states_by_issuer(self,issuer):
+		return _take(self.vault_fungible_states, self._fungible_by_issuer, issuer)
+
+	def find_unconsumed_states_by_contract_state(self,contract_state_class_name):
+		return _take(self._unconsumed_states, self._unconsumed_by_contract, contract_state_class_name)
+
+	def find_linear_id_by_transaction_id(self,tx_id):
+		linear = _take(self.vault_linear_states, self._linear_by_transaction, tx_id)
+		return linear.iloc[0]['LINEAR_ID']
@@ -8,13 +8,19 @@ setup(
 	install_requires=[
 		'jaydebeapi',
 		'pandas',
+		'numpy',
 		'matplotlib',
 		'datetime',
 		'requests',
 		'pyjks',
 		'chart_studio',
-		'scikit-learn',
-		'jolokia'
 	],
+	extras_require={
+		'arrow': ['pyarrow'],
+		'postgres': ['psycopg2'],
+		'async': ['aiohttp'],
+		'snappy': ['python-snappy'],
+		'otel': ['opentelemetry-api'],
+	},
 	include_package_data=True,
 )
\ No newline at end of file
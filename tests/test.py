@@ -36,6 +36,32 @@ class TestQueries(unittest.TestCase):
 		self.assertEqual(single_row.iloc[0]['TRANSACTION_ID'], '1')
 		self.assertTrue(no_row.empty)
 
+	def test_chunked_query(self):
+		whole = self.node.get_vault_states()
+		chunks = list(self.node.iter_table('VAULT_STATES', chunksize=1))
+		self.assertEqual(sum(len(chunk) for chunk in chunks), len(whole))
+		self.assertTrue(all(len(chunk) == 1 for chunk in chunks))
+
+	def test_columnar_types(self):
+		df = self.node.get_vault_fungible_states(include_blobs=True)
+		self.assertEqual(df.QUANTITY.dtype, 'int64')
+		self.assertEqual(df.ISSUER_REF.iloc[0], b'\x01')
+		self.assertEqual(self.node._get_df('VAULT_STATES').RECORDED_TIMESTAMP.dtype.kind, 'M')
+
+	def test_query_phases(self):
+		self.node.instruments.reset()
+		self.node._get_df('VAULT_STATES')
+		span = self.node.instruments.spans().iloc[0]
+		self.assertEqual(span.TARGET, 'VAULT_STATES')
+		for column in ['EXECUTE_S', 'FETCH_S', 'CONVERT_S', 'FRAME_S']:
+			self.assertGreater(span[column], 0)
+
+	def test_incremental_vault_sync(self):
+		sync = pycorda.VaultSync(self.node)
+		sync.refresh()
+		sync.refresh()
+		self.assertEqual(len(sync.vault_states), len(self.node.get_vault_states()))
+
 	@classmethod
 	def tearDownClass(cls):
 		cls.node.close()
@@ -0,0 +1,49 @@
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+import pycorda
+from pycorda.metrics import METRIC_NIDS
+from tests.test_jolokia_bulk import JolokiaAgentStub
+
+try:
+	import aiohttp
+except ImportError:
+	aiohttp = None
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestAsyncNodeMetrics(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.server = ThreadingHTTPServer(('127.0.0.1', 0), JolokiaAgentStub)
+		threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+		cls.agent_url = 'http://127.0.0.1:%d/' % cls.server.server_port
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.server.shutdown()
+
+	def test_sweep(self):
+		from pycorda.aio import AsyncNodeMetrics
+		agents = {'PartyA': self.agent_url, 'PartyB': self.agent_url, 'Down': 'http://127.0.0.1:1/'}
+		df = AsyncNodeMetrics(agents, metrics=['memory', 'flows_in_flight'], concurrency=2).run_sweep()
+		self.assertEqual(sorted(df.NODE.unique()), ['Down', 'PartyA', 'PartyB'])
+		party_a = df[(df.NODE == 'PartyA') & (df.MBEAN == METRIC_NIDS['flows_in_flight'])].iloc[0]
+		self.assertEqual(party_a['VALUE'], {'Value': 3})
+		down = df[df.NODE == 'Down']
+		self.assertEqual(len(down), 1)
+		self.assertTrue(down.MBEAN.isnull().all())
+		self.assertTrue(down.iloc[0]['ERROR'])
+
+class TestAgentNames(unittest.TestCase):
+	def test_nodes(self):
+		from pycorda.aio import AsyncNodeMetrics
+		nodes = [pycorda.Node('sqlite::memory:', '', '') for i in range(2)]
+		try:
+			nodes[0].set_node_root('http://127.0.0.1:1/')
+			nodes[1].set_node_root('http://127.0.0.1:2/')
+			self.assertEqual(AsyncNodeMetrics(nodes).agents, {'node0': 'http://127.0.0.1:1/', 'node1': 'http://127.0.0.1:2/'})
+			nodes[0].set_name('node1')
+			self.assertRaises(ValueError, AsyncNodeMetrics, nodes)
+		finally:
+			for node in nodes:
+				node.close()
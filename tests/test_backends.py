@@ -0,0 +1,173 @@
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import pandas as pd
+import pycorda
+from pycorda.base import BaseNode
+from pycorda.backends import H2Backend, PostgresBackend, SQLiteBackend, backend_for_url
+from tests.test import get_config
+
+def create_vault_db(path):
+	"""Creates a SQLite database with a small Corda vault"""
+	conn = sqlite3.connect(path)
+	conn.executescript('''
+		CREATE TABLE VAULT_STATES (TRANSACTION_ID VARCHAR(64), OUTPUT_INDEX INT,
+			CONTRACT_STATE_CLASS_NAME VARCHAR(255), STATE_STATUS INT, NOTARY_NAME VARCHAR(255),
+			RECORDED_TIMESTAMP TIMESTAMP, CONSUMED_TIMESTAMP TIMESTAMP);
+		CREATE TABLE VAULT_LINEAR_STATES (TRANSACTION_ID VARCHAR(64), OUTPUT_INDEX INT,
+			UUID VARCHAR(255), LINEAR_ID VARCHAR(255));
+		CREATE TABLE VAULT_FUNGIBLE_STATES (TRANSACTION_ID VARCHAR(64), OUTPUT_INDEX INT,
+			ISSUER_NAME VARCHAR(255), OWNER_NAME VARCHAR(255), QUANTITY BIGINT);
+		CREATE TABLE NODE_CHECKPOINTS (CHECKPOINT_ID VARCHAR(64), CHECKPOINT_VALUE BLOB);
+		INSERT INTO NODE_CHECKPOINTS VALUES ('c1', X'636f726461');
+	''')
+	conn.executemany('INSERT INTO VAULT_STATES VALUES (?, ?, ?, ?, ?, ?, ?)', [
+		('tx1', 0, 'IOUState', 1, 'Notary', '2020-01-01 10:00:00.000', '2020-01-01 11:00:00.000'),
+		('tx2', 0, 'IOUState', 0, 'Notary', '2020-01-01 11:00:00.000', None),
+		('tx3', 0, 'Cash$State', 0, 'Notary', '2020-01-01 12:00:00.000', None),
+		('tx3', 1, 'Cash$State', 0, 'Notary', '2020-01-01 12:00:00.000', None),
+	])
+	conn.executemany('INSERT INTO VAULT_LINEAR_STATES VALUES (?, ?, ?, ?)', [
+		('tx1', 0, 'u1', 'l1'),
+		('tx2', 0, 'u1', 'l1'),
+	])
+	conn.executemany('INSERT INTO VAULT_FUNGIBLE_STATES VALUES (?, ?, ?, ?, ?)', [
+		('tx3', 0, 'BankA', 'PartyA', 100),
+		('tx3', 1, 'BankA', 'PartyB', 50),
+	])
+	conn.commit()
+	conn.close()
+
+class VaultDatabase(object):
+	"""Node over a fresh create_vault_db database in a temporary directory
+
+	Mixed into a unittest.TestCase, before it. node_options are passed to pycorda.Node.
+	"""
+
+	node_options = {}
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.path = os.path.join(self.directory, 'node.db')
+		create_vault_db(self.path)
+		self.node = pycorda.Node('sqlite:///' + self.path, '', '', **self.node_options)
+
+	def tearDown(self):
+		self.node.close()
+		shutil.rmtree(self.directory)
+
+	def execute(self, *statements):
+		"""Runs SQL statements on the database, as the Corda node would"""
+		conn = sqlite3.connect(self.path)
+		try:
+			for statement in statements:
+				conn.execute(statement)
+			conn.commit()
+		finally:
+			conn.close()
+
+	def insert(self, table_name, rows):
+		"""Inserts rows, tuples of every column, into a table"""
+		rows = list(rows)
+		if not rows:
+			return
+		conn = sqlite3.connect(self.path)
+		try:
+			conn.executemany('INSERT INTO ' + table_name + ' VALUES (' + ', '.join('?' * len(rows[0])) + ')', rows)
+			conn.commit()
+		finally:
+			conn.close()
+
+class TestBackendForUrl(unittest.TestCase):
+	def test_selection(self):
+		self.assertIsInstance(backend_for_url('jdbc:h2:tcp://localhost:9092/node', 'sa', ''), H2Backend)
+		self.assertIsInstance(backend_for_url('jdbc:postgresql://localhost:5432/corda', 'u', 'p'), PostgresBackend)
+		self.assertIsInstance(backend_for_url('sqlite:///tmp/node.db', '', ''), SQLiteBackend)
+
+	def test_postgres_url(self):
+		backend = PostgresBackend('jdbc:postgresql://db:5432/corda?currentSchema=party_a', 'user', 'pass')
+		self.assertEqual(backend._connect_args(), {
+			'dsn': 'postgresql://db:5432/corda',
+			'user': 'user',
+			'password': 'pass',
+			'options': '-c search_path=party_a',
+		})
+		self.assertEqual(backend.prepare("SELECT * FROM T WHERE A = ? AND B LIKE 'x%'"), "SELECT * FROM T WHERE A = %s AND B LIKE 'x%%'")
+		self.assertEqual(backend.prepare("SELECT * FROM T WHERE NAME = 'a?b' AND A = ? AND \"Q?\" = 'it''s?'"),
+			"SELECT * FROM T WHERE NAME = 'a?b' AND A = %s AND \"Q?\" = 'it''s?'")
+
+class VaultQueries(object):
+	"""Queries run against each backend's copy of the vault in create_vault_db"""
+
+	def test_get_and_find(self):
+		self.assertEqual(len(self.node.get_vault_states()), 4)
+		self.assertEqual(list(self.node.find_vault_states_by_transaction_id('tx3').OUTPUT_INDEX), [0, 1])
+		self.assertEqual(len(self.node.find_unconsumed_states_by_contract_state('IOUState')), 1)
+		self.assertEqual(self.node.find_linear_id_by_transaction_id('tx2'), 'l1')
+		self.assertEqual(len(self.node.find_vault_fungible_states_by_issuer('BankA')), 2)
+
+	def test_dtypes(self):
+		vault_states = self.node.get_vault_states()
+		self.assertEqual(vault_states.CONTRACT_STATE_CLASS_NAME.dtype, 'category')
+		self.assertEqual(vault_states.RECORDED_TIMESTAMP.dtype.kind, 'M')
+		self.assertEqual(vault_states.CONSUMED_TIMESTAMP.isnull().sum(), 3)
+		self.assertEqual(list(self.node.get_node_checkpoints().columns), ['CHECKPOINT_ID'])
+		self.assertEqual(self.node.get_node_checkpoints(include_blobs=True).CHECKPOINT_VALUE[0], b'corda')
+
+	def test_projection(self):
+		df = self.node.get_vault_states(columns=['TRANSACTION_ID', 'CONSUMED_TIMESTAMP'], where={'STATE_STATUS': 0}, limit=2)
+		self.assertEqual(list(df.columns), ['TRANSACTION_ID', 'CONSUMED_TIMESTAMP'])
+		self.assertEqual(list(df.TRANSACTION_ID), ['tx2', 'tx3'])
+		self.assertEqual(df.CONSUMED_TIMESTAMP.dtype.kind, 'M')
+		df = self.node.get_node_checkpoints(columns=['CHECKPOINT_VALUE'])
+		self.assertEqual(df.CHECKPOINT_VALUE[0], b'corda')
+
+	def test_fungible_quantity_series(self):
+		df = self.node.fungible_quantity_series('Cash$State')
+		self.assertEqual(sorted(df.QUANTITY), [50, 100])
+		hourly = self.node.fungible_quantity_series('Cash$State', 'hour')
+		self.assertEqual(hourly.to_dict('list'), {'RECORDED_TIMESTAMP': [pd.Timestamp('2020-01-01 12:00:00')], 'QUANTITY': [150]})
+		# the in-memory join and grouping of offline nodes gives the same result
+		in_memory = BaseNode.fungible_quantity_series(self.node, 'Cash$State', 'hour')
+		self.assertEqual(in_memory.to_dict('list'), hourly.to_dict('list'))
+		self.assertRaises(ValueError, self.node.fungible_quantity_series, 'Cash$State', 'week')
+
+	def test_chunks(self):
+		self.assertEqual([len(chunk) for chunk in self.node.iter_table('VAULT_STATES', chunksize=3)], [3, 1])
+
+	def test_chunk_boundaries(self):
+		whole = self.node.get_vault_states()
+		for chunksize, sizes in [(1, [1, 1, 1, 1]), (2, [2, 2]), (4, [4]), (5, [4])]:
+			chunks = list(self.node.get_vault_states(chunksize=chunksize))
+			self.assertEqual([len(chunk) for chunk in chunks], sizes, chunksize)
+			self.assertEqual(list(pd.concat(chunks).TRANSACTION_ID), list(whole.TRANSACTION_ID))
+		self.assertEqual(list(self.node.iter_table('VAULT_STATES', chunksize=2, where={'TRANSACTION_ID': 'missing'})), [])
+		filtered = list(self.node.iter_table('VAULT_STATES', chunksize=1, where={'TRANSACTION_ID': 'tx3'}))
+		self.assertEqual([list(chunk.OUTPUT_INDEX) for chunk in filtered], [[0], [1]])
+
+	def test_export_table(self):
+		buf = io.BytesIO()
+		self.node.export_table('VAULT_FUNGIBLE_STATES', buf)
+		self.assertEqual(buf.getvalue().decode('utf-8').upper().splitlines()[0], 'TRANSACTION_ID,OUTPUT_INDEX,ISSUER_NAME,OWNER_NAME,QUANTITY')
+
+class TestSQLiteBackend(VaultDatabase, VaultQueries, unittest.TestCase):
+	node_options = {'name': 'PartyA'}
+
+@unittest.skipUnless(get_config().get('postgres_url'), 'postgres_url is not configured')
+class TestPostgresBackend(VaultQueries, unittest.TestCase):
+	"""Needs a PostgreSQL database at postgres_url holding the vault of create_vault_db"""
+
+	def setUp(self):
+		config = get_config()
+		self.node = pycorda.Node(config['postgres_url'], config.get('postgres_user', ''), config.get('postgres_password', ''))
+
+	def tearDown(self):
+		self.node.close()
+
+	def test_binary_export(self):
+		buf = io.BytesIO()
+		self.node.export_table('VAULT_STATES', buf, format='binary')
+		self.assertTrue(buf.getvalue().startswith(b'PGCOPY\n\xff\r\n\x00'))
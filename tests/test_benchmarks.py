@@ -0,0 +1,31 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pycorda
+from benchmarks.run import compare_results, load_results, run_benchmarks, save_results
+from benchmarks.synthetic import create_synthetic_db
+
+class TestBenchmarks(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		create_synthetic_db(os.path.join(self.directory, 'node.db'), states=200)
+		self.node = pycorda.Node('sqlite:///' + os.path.join(self.directory, 'node.db'), '', '')
+
+	def tearDown(self):
+		self.node.close()
+		shutil.rmtree(self.directory)
+
+	def test_synthetic_layout(self):
+		self.assertEqual(len(self.node.get_vault_states()), 200)
+		self.assertEqual(len(self.node.get_vault_fungible_states()) + len(self.node.get_vault_linear_states()), 200)
+		self.assertEqual(len(self.node.find_transactions_by_linear_id('u0-0')), 10)
+
+	def test_run_and_compare(self):
+		df = run_benchmarks(self.node, 200, repeat=1, plots=False, only='find_')
+		self.assertEqual(len(df), 6)
+		self.assertTrue((df.P50_MS > 0).all())
+		path = save_results(df, self.directory, 200, 1)
+		meta, loaded = load_results(path)
+		self.assertEqual(meta['states'], 200)
+		self.assertEqual(list(compare_results(loaded, df).RATIO), [1.0] * 6)
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import pandas as pd
+from pycorda.cache import TableCache
+from tests.test_backends import VaultDatabase
+
+try:
+	import pyarrow
+except ImportError:
+	pyarrow = None
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class TestTableCache(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.df = pd.DataFrame({'NODE_INFO_ID': [1, 2], 'NODE_INFO_HASH': ['a', 'b'], 'SERIAL': [b'\x00\x01', b'\x02']})
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def test_round_trip(self):
+		for format in ['arrow', 'parquet']:
+			cache = TableCache(self.directory, format=format)
+			cache.put('NODE_INFOS', self.df)
+			self.assertTrue(cache.get('NODE_INFOS').equals(self.df))
+
+	def test_tables_without_ttl_are_not_cached(self):
+		cache = TableCache(self.directory)
+		cache.put('VAULT_STATES', self.df)
+		self.assertIsNone(cache.get('VAULT_STATES'))
+
+	def test_expiry_and_invalidate(self):
+		cache = TableCache(self.directory, ttls={'NODE_INFOS': 60, 'NODE_PROPERTIES': 60})
+		cache.put('NODE_INFOS', self.df)
+		cache.put('NODE_PROPERTIES', self.df)
+		path = os.path.join(self.directory, 'NODE_INFOS.arrow')
+		os.utime(path, (time.time() - 120, time.time() - 120))
+		self.assertIsNone(cache.get('NODE_INFOS'))
+		cache.invalidate()
+		self.assertIsNone(cache.get('NODE_PROPERTIES'))
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class TestNodeCache(VaultDatabase, unittest.TestCase):
+	def setUp(self):
+		VaultDatabase.setUp(self)
+		self.node.set_cache(TableCache(os.path.join(self.directory, 'cache'), ttls={'VAULT_STATES': 60}))
+		# statements sent to the database
+		self.statements = []
+		read_df = self.node._backend.read_df
+		def recording_read_df(conn, sql, params):
+			self.statements.append(sql)
+			return read_df(conn, sql, params)
+		self.node._backend.read_df = recording_read_df
+
+	def test_cached_table(self):
+		self.assertEqual(len(self.node.get_vault_states()), 4)
+		self.assertEqual(len(self.node.get_vault_states()), 4)
+		self.assertEqual(self.statements, ['SELECT * FROM VAULT_STATES'])
+
+	def test_tables_without_ttl_skip_blobs(self):
+		df = self.node.get_node_checkpoints()
+		self.assertEqual(list(df.columns), ['CHECKPOINT_ID'])
+		self.assertEqual(self.statements[-1], 'SELECT CHECKPOINT_ID FROM NODE_CHECKPOINTS')
+
+	def test_columns(self):
+		df = self.node.get_node_checkpoints(columns=['CHECKPOINT_ID'])
+		self.assertEqual(list(df.CHECKPOINT_ID), ['c1'])
+		self.assertEqual(self.statements, ['SELECT CHECKPOINT_ID FROM NODE_CHECKPOINTS'])
+		# cached tables are fetched whole once and projected in memory
+		df = self.node.get_vault_states(columns=['TRANSACTION_ID'])
+		self.assertEqual(list(df.columns), ['TRANSACTION_ID'])
+		self.assertEqual(self.statements[-1], 'SELECT * FROM VAULT_STATES')
@@ -0,0 +1,68 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pycorda.client import HttpClient
+
+class FlakyServer(BaseHTTPRequestHandler):
+	"""Answers 503 to every other request"""
+
+	protocol_version = 'HTTP/1.1'
+	calls = 0
+
+	def reply(self):
+		type(self).calls += 1
+		status = 503 if self.calls % 2 else 200
+		self.send_response(status)
+		self.send_header('Content-Length', '2')
+		self.end_headers()
+		self.wfile.write(b'ok')
+
+	def do_GET(self):
+		self.reply()
+
+	def do_POST(self):
+		self.rfile.read(int(self.headers['Content-Length']))
+		self.reply()
+
+	def log_message(self, format, *args):
+		pass
+
+class TestHttpClient(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.server = HTTPServer(('127.0.0.1', 0), FlakyServer)
+		threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+		cls.url = 'http://127.0.0.1:%d/' % cls.server.server_port
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.server.shutdown()
+
+	def setUp(self):
+		FlakyServer.calls = 0
+		self.client = HttpClient(timeout=2, retries=2, backoff_factor=0)
+
+	def tearDown(self):
+		self.client.close()
+
+	def test_get_is_retried(self):
+		resp = self.client.get(self.url + 'api/status', endpoint='api/status')
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(FlakyServer.calls, 2)
+
+	def test_post_is_not_retried(self):
+		resp = self.client.post(self.url + 'jolokia/execute', endpoint='jolokia/execute', json={})
+		self.assertEqual(resp.status_code, 503)
+		self.assertEqual(FlakyServer.calls, 1)
+
+	def test_latency(self):
+		for i in range(3):
+			self.client.get(self.url, endpoint='api/status')
+		latency = self.client.latency()
+		self.assertEqual(list(latency.ENDPOINT), ['api/status'])
+		self.assertEqual(latency.iloc[0]['CALLS'], 3)
+		self.assertEqual(latency.iloc[0]['ERRORS'], 0)
+
+	def test_connection_refused(self):
+		self.assertRaises(OSError, self.client.get, 'http://127.0.0.1:1/')
+		self.assertEqual(self.client.latency().iloc[0]['ERRORS'], 1)
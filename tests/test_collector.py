@@ -0,0 +1,102 @@
+import threading
+import time
+import unittest
+from http.server import HTTPServer
+import numpy as np
+import pycorda
+from pycorda.collector import MetricsCollector, RingBuffer
+from pycorda.metrics import METRIC_NIDS
+from tests.test_jolokia_bulk import JolokiaAgentStub
+
+class TestRingBuffer(unittest.TestCase):
+	def test_wraps_around(self):
+		buffer = RingBuffer(3)
+		for i in range(5):
+			buffer.append(100.0 + i, i * 10.0)
+		times, values = buffer.samples()
+		self.assertEqual(list(times), [102.0, 103.0, 104.0])
+		self.assertEqual(list(values), [20.0, 30.0, 40.0])
+
+	def test_aggregate(self):
+		buffer = RingBuffer(10)
+		for i in range(10):
+			buffer.append(float(i), i * 2.0)
+		stats = buffer.aggregate(window=4, now=9.0)
+		self.assertEqual(stats['COUNT'], 5)
+		self.assertEqual(stats['MIN'], 10.0)
+		self.assertEqual(stats['MAX'], 18.0)
+		self.assertEqual(stats['P50'], 14.0)
+		self.assertEqual(stats['RATE'], 2.0)
+		self.assertTrue(np.isnan(RingBuffer(2).aggregate()['MEAN']))
+		self.assertRaises(ValueError, RingBuffer, 0)
+
+class TestMetricsCollector(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.server = HTTPServer(('127.0.0.1', 0), JolokiaAgentStub)
+		threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+		cls.node = pycorda.Node('sqlite::memory:', '', '', name='PartyA')
+		cls.node.set_node_root('http://127.0.0.1:%d/' % cls.server.server_port)
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.server.shutdown()
+		cls.node.close()
+
+	def test_sample_once(self):
+		collector = MetricsCollector([self.node], samples=['flows_in_flight', 'heap_used', 'hikari_pool_usage'], capacity=4)
+		for i in range(6):
+			collector.sample_once()
+		stats = collector.aggregate().set_index('METRIC')
+		self.assertEqual(stats.loc['flows_in_flight', 'COUNT'], 4)
+		self.assertEqual(stats.loc['heap_used', 'LAST'], 1024)
+		self.assertEqual(stats.loc['hikari_pool_usage', 'COUNT'], 0)
+		df = collector.to_dataframe()
+		self.assertEqual(len(df), 8)
+		self.assertEqual(set(df.NODE), {'PartyA'})
+
+	def test_nothing_sampled(self):
+		df = MetricsCollector([self.node], samples=['heap_used']).to_dataframe()
+		self.assertEqual(list(df.columns), ['NODE', 'METRIC', 'TIMESTAMP', 'VALUE'])
+		self.assertEqual(len(df), 0)
+		df = MetricsCollector([]).to_dataframe()
+		self.assertEqual(list(df.columns), ['NODE', 'METRIC', 'TIMESTAMP', 'VALUE'])
+		self.assertEqual(len(df), 0)
+
+class MalformedAgentStub(JolokiaAgentStub):
+	VALUES = {
+		METRIC_NIDS['memory']: {'HeapMemoryUsage': {'used': 'unknown'}},
+		METRIC_NIDS['flows_in_flight']: {'Value': None},
+		METRIC_NIDS['flows_started']: {'Count': 7},
+	}
+
+class TestMalformedMetrics(unittest.TestCase):
+	def setUp(self):
+		self.server = HTTPServer(('127.0.0.1', 0), MalformedAgentStub)
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+		self.nodes = [pycorda.Node('sqlite::memory:', '', '') for i in range(2)]
+		for node in self.nodes:
+			node.set_node_root('http://127.0.0.1:%d/' % self.server.server_port)
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+		for node in self.nodes:
+			node.close()
+
+	def test_values_that_are_not_numbers(self):
+		collector = MetricsCollector(self.nodes, samples=['flows_in_flight', 'heap_used', 'flows_started'], interval=0.01)
+		collector.start()
+		time.sleep(0.2)
+		self.assertTrue(collector._thread.is_alive())
+		collector.stop()
+		self.assertGreater(collector.errors['node0'], 0)
+		self.assertEqual(collector.errors['node0'], collector.errors['node1'])
+		stats = collector.aggregate().set_index(['NODE', 'METRIC'])
+		self.assertEqual(stats.loc[('node1', 'flows_started'), 'LAST'], 7)
+		self.assertEqual(stats.loc[('node1', 'heap_used'), 'COUNT'], 0)
+
+	def test_names(self):
+		self.nodes[0].set_name('PartyA')
+		self.nodes[1].set_name('PartyA')
+		self.assertRaises(ValueError, MetricsCollector, self.nodes)
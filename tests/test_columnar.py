@@ -0,0 +1,146 @@
+import unittest
+import numpy as np
+import pandas as pd
+from pycorda.backends import H2Backend
+from pycorda.columnar import column_kind, read_result_set
+
+class FakeResultSet(object):
+	"""Stands in for a java.sql.ResultSet and its metadata over a list of rows"""
+
+	def __init__(self, columns, rows):
+		self.columns = columns
+		self.rows = rows
+		self.row = -1
+		self.last = None
+		self.null_checks = 0
+
+	def getColumnCount(self):
+		return len(self.columns)
+
+	def getColumnLabel(self, i):
+		return self.columns[i - 1][0]
+
+	def getColumnType(self, i):
+		return self.columns[i - 1][1]
+
+	def getScale(self, i):
+		return 0
+
+	def getPrecision(self, i):
+		return self.columns[i - 1][2] if len(self.columns[i - 1]) > 2 else 10
+
+	def isNullable(self, i):
+		return 1
+
+	def setFetchSize(self, size):
+		pass
+
+	def next(self):
+		self.row += 1
+		return self.row < len(self.rows)
+
+	def _get(self, i, default=None):
+		self.last = self.rows[self.row][i - 1]
+		return default if self.last is None else self.last
+
+	def getLong(self, i):
+		return self._get(i, 0)
+
+	def getDouble(self, i):
+		return self._get(i, 0.0)
+
+	def getBoolean(self, i):
+		return self._get(i, False)
+
+	def getString(self, i):
+		value = self._get(i)
+		return value if value is None else str(value)
+
+	def getBytes(self, i):
+		return self._get(i)
+
+	def wasNull(self):
+		self.null_checks += 1
+		return self.last is None
+
+class FakeCursor(object):
+	"""DB-API cursor without the _rs and _meta of jaydebeapi's"""
+
+	def __init__(self, rs):
+		self.rs = rs
+		self.description = [(name,) for name in (column[0] for column in rs.columns)]
+
+	def execute(self, sql, params):
+		pass
+
+	def fetchmany(self, size):
+		rows = self.rs.rows[self.rs.row + 1:self.rs.row + 1 + size]
+		self.rs.row += len(rows)
+		return rows
+
+	def close(self):
+		pass
+
+class FakeConnection(object):
+	def __init__(self, rs):
+		self.rs = rs
+
+	def cursor(self):
+		return FakeCursor(self.rs)
+
+COLUMNS = [('ID', -5), ('QUANTITY', 4), ('RATE', 8), ('NAME', 12), ('RECORDED', 93), ('VALUE', 2004), ('FLAG', 16), ('AMOUNT', 2, 30)]
+ROWS = [
+	(1, 10, 0.5, 'a', '2020-01-01 10:00:00.123', bytearray(b'\x01'), True, 2 ** 70),
+	(2, None, None, None, None, None, None, None),
+	(3, 30, 1.5, 'c', '2020-01-01 11:00:00', bytearray(b'\x03'), False, -1),
+]
+
+class TestColumnar(unittest.TestCase):
+	def read(self, chunksize):
+		rs = FakeResultSet(COLUMNS, ROWS)
+		return list(read_result_set(rs, rs, chunksize))
+
+	def test_types(self):
+		df, = self.read(10)
+		self.assertEqual(list(df.columns), [column[0] for column in COLUMNS])
+		self.assertEqual(df.ID.dtype, np.int64)
+		self.assertTrue(np.isnan(df.QUANTITY[1]))
+		self.assertEqual(df.QUANTITY[2], 30)
+		self.assertTrue(np.isnan(df.RATE[1]))
+		self.assertTrue(pd.isnull(df.NAME[1]))
+		self.assertEqual(list(df.RECORDED), [pd.Timestamp('2020-01-01 10:00:00.123'), pd.NaT, pd.Timestamp('2020-01-01 11:00:00')])
+		self.assertEqual(df.VALUE[0], b'\x01')
+		self.assertEqual(list(df.FLAG), [True, None, False])
+		self.assertEqual(list(df.AMOUNT), [2 ** 70, None, -1])
+
+	def test_null_checks(self):
+		rs = FakeResultSet(COLUMNS, ROWS)
+		list(read_result_set(rs, rs))
+		# only the zeros and false values returned for the NULLs of row 2 and the false FLAG of row 3
+		self.assertEqual(rs.null_checks, 4)
+
+	def test_fetch_without_result_set(self):
+		rs = FakeResultSet(COLUMNS, ROWS)
+		backend = H2Backend('jdbc:h2:mem:test', 'sa', '')
+		df = backend.read_df(FakeConnection(rs), 'SELECT * FROM T', [])
+		self.assertEqual(list(df.columns), [column[0] for column in COLUMNS])
+		self.assertEqual(list(df.ID), [1, 2, 3])
+		rs = FakeResultSet(COLUMNS, ROWS)
+		self.assertEqual([len(df) for df in backend.iter_df(FakeConnection(rs), 'SELECT * FROM T', [], 2)], [2, 1])
+		self.assertEqual(len(backend.read_df(FakeConnection(FakeResultSet(COLUMNS, [])), 'SELECT * FROM T', []).columns), len(COLUMNS))
+
+	def test_chunks(self):
+		self.assertEqual([len(df) for df in self.read(2)], [2, 1])
+		self.assertEqual([len(df) for df in self.read(3)], [3])
+		rs = FakeResultSet(COLUMNS, [])
+		df, = read_result_set(rs, rs)
+		self.assertEqual(len(df.columns), len(COLUMNS))
+
+	def test_column_kind(self):
+		self.assertEqual(column_kind(3, scale=0, precision=18), 'int')
+		self.assertEqual(column_kind(3, scale=0, precision=19), 'decimal')
+		self.assertEqual(column_kind(3, scale=0), 'decimal')
+		self.assertEqual(column_kind(-5, precision=19), 'int')
+		self.assertEqual(column_kind(3, scale=2), 'float')
+		self.assertEqual(column_kind(-3), 'bytes')
+		self.assertEqual(column_kind(1111), 'str')
@@ -0,0 +1,73 @@
+import os
+import unittest
+import numpy as np
+import pandas as pd
+import pycorda
+from pycorda.diff import _hash, _normalize, diff_snapshots, diff_table
+from tests.test_backends import VaultDatabase
+
+TABLES = ['VAULT_STATES', 'VAULT_LINEAR_STATES', 'VAULT_FUNGIBLE_STATES', 'NODE_CHECKPOINTS']
+
+class TestDiff(VaultDatabase, unittest.TestCase):
+	def setUp(self):
+		VaultDatabase.setUp(self)
+		# the node as it was, exported to CSV files
+		self.export = os.path.join(self.directory, 'export')
+		os.makedirs(self.export)
+		for table_name in TABLES:
+			with open(os.path.join(self.export, table_name + '.csv'), 'wb') as f:
+				self.node.export_table(table_name, f)
+
+	def test_unchanged(self):
+		summary = diff_snapshots(self.export, self.node, chunksize=2)
+		self.assertEqual(list(summary.TABLE), ['NODE_CHECKPOINTS', 'VAULT_FUNGIBLE_STATES', 'VAULT_LINEAR_STATES', 'VAULT_STATES'])
+		self.assertEqual(summary[['INSERTED', 'DELETED', 'CHANGED']].values.sum(), 0)
+		self.assertEqual(list(summary.ROWS_BEFORE), list(summary.ROWS_AFTER))
+
+	def test_changes(self):
+		self.execute(
+			"INSERT INTO VAULT_STATES VALUES ('tx4', 0, 'IOUState', 0, 'Notary', '2020-01-01 13:00:00.000', NULL)",
+			"DELETE FROM VAULT_STATES WHERE TRANSACTION_ID = 'tx1'",
+			"UPDATE VAULT_STATES SET CONSUMED_TIMESTAMP = '2020-01-01 13:00:00.000', STATE_STATUS = 1 WHERE TRANSACTION_ID = 'tx3' AND OUTPUT_INDEX = 1",
+			"UPDATE VAULT_FUNGIBLE_STATES SET QUANTITY = 60 WHERE OUTPUT_INDEX = 1",
+		)
+		summary = diff_snapshots(pycorda.OfflineNode(self.export), self.node, tables=['VAULT_STATES', 'VAULT_FUNGIBLE_STATES'], workers=2)
+		self.assertEqual(summary.values.tolist(), [
+			['VAULT_STATES', 4, 4, 1, 1, 1],
+			['VAULT_FUNGIBLE_STATES', 2, 2, 0, 0, 1],
+		])
+		df = diff_table(self.export, self.node, 'VAULT_STATES', chunksize=3)
+		self.assertEqual(df.astype(object).values.tolist(), [
+			['tx4', 0, 'inserted'],
+			['tx1', 0, 'deleted'],
+			['tx3', 1, 'changed'],
+		])
+		self.assertEqual(len(diff_table(self.node, self.node, 'VAULT_STATES')), 0)
+
+	def test_large_integers(self):
+		self.execute("UPDATE VAULT_FUNGIBLE_STATES SET QUANTITY = %d" % (2 ** 60))
+		export = os.path.join(self.directory, 'large')
+		self.node.export_snapshot(export, tables=['VAULT_FUNGIBLE_STATES'])
+		self.execute("UPDATE VAULT_FUNGIBLE_STATES SET QUANTITY = %d WHERE OUTPUT_INDEX = 1" % (2 ** 60 + 1))
+		self.assertEqual(diff_snapshots(export, self.node).CHANGED[0], 1)
+
+	def test_numbers_hash_alike(self):
+		# integers with nulls are read as floats, and a chunk of floats may hold only whole ones
+		integers = pd.DataFrame({'A': pd.array([1, None, 2 ** 60], dtype='Int64'), 'B': [1, 2, 3]})
+		floats = pd.DataFrame({'A': [1.0, np.nan, 2.0 ** 60], 'B': [1.0, 2.0, 3.0]})
+		self.assertEqual(list(_hash(_normalize(integers))), list(_hash(_normalize(floats))))
+		mixed = pd.DataFrame({'A': [1.0, 0.5, 2.0 ** 70], 'B': [1, 2, 3]})
+		self.assertEqual(_hash(_normalize(mixed))[0], _hash(_normalize(integers))[0])
+		self.assertEqual(len(set(_hash(_normalize(mixed)))), 3)
+
+	def test_blobs(self):
+		self.execute("UPDATE NODE_CHECKPOINTS SET CHECKPOINT_VALUE = X'00'")
+		self.assertEqual(diff_snapshots(self.node, self.node, tables=['NODE_CHECKPOINTS']).CHANGED[0], 0)
+		export = os.path.join(self.directory, 'snapshot')
+		self.node.export_snapshot(export, tables=['NODE_CHECKPOINTS'])
+		self.execute("UPDATE NODE_CHECKPOINTS SET CHECKPOINT_VALUE = X'01'")
+		self.assertEqual(diff_snapshots(export, self.node).CHANGED[0], 0)
+		self.assertEqual(diff_snapshots(export, self.node, include_blobs=True).CHANGED[0], 1)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import unittest
+import pycorda
+from tests import test
+from tests.test_backends import VaultDatabase, create_vault_db
+
+def has_jvm():
+	try:
+		import jaydebeapi, jpype
+		return bool(jpype.getDefaultJVMPath())
+	except Exception:
+		return False
+
+# Connects in a fresh interpreter, where the first connections race to start the JVM
+CONNECT_H2 = '''
+import pycorda
+urls = dict(('n' + str(i), 'jdbc:h2:mem:n' + str(i)) for i in range(6))
+fleet = pycorda.Fleet.connect(urls, 'sa', '', %r)
+print(len(fleet.nodes), sorted(fleet.errors))
+fleet.close()
+'''
+
+class TestFleet(VaultDatabase, unittest.TestCase):
+	def setUp(self):
+		VaultDatabase.setUp(self)
+		path = os.path.join(self.directory, 'PartyB.db')
+		create_vault_db(path)
+		self.fleet = pycorda.Fleet.connect({'PartyA': 'sqlite:///' + self.path, 'PartyB': 'sqlite:///' + path}, '', '')
+		self.fleet.nodes.append(pycorda.OfflineNode(self.directory, name='Empty'))
+
+	def tearDown(self):
+		self.fleet.close()
+		VaultDatabase.tearDown(self)
+
+	def test_table_read(self):
+		df = self.fleet.get_vault_states()
+		self.assertEqual(list(df.columns[:2]), ['NODE', 'TRANSACTION_ID'])
+		self.assertEqual(df.groupby('NODE').size().to_dict(), {'PartyA': 4, 'PartyB': 4})
+		self.assertEqual(list(self.fleet.errors), ['Empty'])
+
+	def test_find(self):
+		df = self.fleet.find_vault_states_by_transaction_id('tx3')
+		self.assertEqual(len(df), 4)
+		df = self.fleet.find_linear_id_by_transaction_id('tx1')
+		self.assertEqual(list(df.VALUE), ['l1', 'l1'])
+
+	def test_connection_failure(self):
+		fleet = pycorda.Fleet.connect({'Missing': 'sqlite:///' + os.path.join(self.directory, 'no', 'such.db')}, '', '')
+		self.assertEqual(fleet.nodes, [])
+		self.assertIsInstance(fleet.errors['Missing'], OSError)
+
+	def test_names(self):
+		self.assertEqual([node._name for node in pycorda.Fleet([self.node]).nodes], ['node0'])
+		with self.assertRaises(ValueError):
+			pycorda.Fleet(self.fleet.nodes + [pycorda.OfflineNode(self.directory, name='PartyA')])
+
+	@unittest.skipUnless(has_jvm(), 'jaydebeapi or a JVM is not available')
+	def test_h2_jvm_start(self):
+		script = CONNECT_H2 % os.path.join(test.tests_dir(), 'h2-1.4.200.jar')
+		# the process must also exit, which JVM threads attached from the pool could prevent
+		result = subprocess.run([sys.executable, '-c', script], stdout=subprocess.PIPE, timeout=60)
+		self.assertEqual(result.returncode, 0)
+		self.assertEqual(result.stdout.decode().split('\n')[-2], '6 []')
@@ -0,0 +1,104 @@
+import unittest
+import pycorda
+from tests.test_backends import VaultDatabase
+from tests.test_serialization import signed_transaction, tx_id
+
+class TestTransactionGraph(VaultDatabase, unittest.TestCase):
+	def test_linear_chain(self):
+		graph = pycorda.TransactionGraph(self.node, read_transactions=False)
+		self.assertEqual(list(graph.transaction_ids), ['tx1', 'tx2', 'tx3'])
+		self.assertEqual(graph.parents('tx2'), ['tx1'])
+		self.assertEqual(graph.children('tx1'), ['tx2'])
+		self.assertEqual(graph.depths().to_dict(), {'tx1': 0, 'tx2': 1, 'tx3': 0})
+		self.assertEqual(list(graph.lineage('u1').TRANSACTION_ID), ['tx1', 'tx2'])
+		self.assertEqual(len(graph.lineage('missing')), 0)
+		frontier = graph.unconsumed_frontier()
+		self.assertEqual(frontier.values.tolist(), [['tx2', 1, 1], ['tx3', 2, 0]])
+		with self.assertRaises(KeyError):
+			graph.depth('missing')
+
+	def test_consumption_matching(self):
+		self.insert('VAULT_STATES', [
+			('tx4', 0, 'Cash$State', 0, 'Notary', '2020-01-01 13:00:00.000', None),
+		])
+		self.execute("UPDATE VAULT_STATES SET CONSUMED_TIMESTAMP = '2020-01-01 13:00:00.000' WHERE TRANSACTION_ID = 'tx3'")
+		self.assertEqual(pycorda.TransactionGraph(self.node, read_transactions=False).parents('tx4'), [])
+		graph = pycorda.TransactionGraph(self.node, match_consumption=True, read_transactions=False)
+		self.assertEqual(graph.parents('tx4'), ['tx3'])
+		self.assertEqual(graph.parents('tx2'), ['tx1'])
+		self.assertEqual(len(graph.edges()), 2)
+
+	def test_incremental(self):
+		graph = pycorda.TransactionGraph(self.node, incremental=True, match_consumption=True, read_transactions=False)
+		self.insert('VAULT_STATES', [
+			('tx5', 0, 'IOUState', 0, 'Notary', '2020-01-01 14:00:00.000', None),
+			('tx6', 0, 'IOUState', 0, 'Notary', '2020-01-01 15:00:00.000', None),
+		])
+		self.insert('VAULT_LINEAR_STATES', [('tx5', 0, 'u1', 'l1'), ('tx6', 0, 'u1', 'l1')])
+		self.assertEqual(graph.refresh(), 2)
+		self.assertEqual(graph.refresh(), 0)
+		self.assertEqual(len(graph), 5)
+		self.assertEqual(graph.back_chain('tx6'), ['tx1', 'tx2', 'tx5'])
+		self.assertEqual(graph.depth('tx6'), 3)
+		self.assertEqual(list(graph.lineage('u1').DEPTH), [0, 1, 2, 3])
+		self.assertEqual(graph.unconsumed_frontier().TRANSACTION_ID[0], 'tx6')
+
+class TestTransactionInputs(VaultDatabase, unittest.TestCase):
+	"""Graphs built from the inputs of NODE_TRANSACTIONS"""
+
+	def setUp(self):
+		VaultDatabase.setUp(self)
+		self.execute('CREATE TABLE NODE_TRANSACTIONS (TX_ID VARCHAR(64), TRANSACTION_VALUE BLOB)')
+		# 5 is only in the back chain and 9 not on the node at all
+		self.store({
+			5: signed_transaction(),
+			1: signed_transaction([(tx_id(5), 0)]),
+			2: signed_transaction([(tx_id(1), 0)]),
+			3: signed_transaction([(tx_id(2), 0), (tx_id(2), 1)], [(tx_id(9), 0)]),
+			4: b'garbage',
+		})
+
+	def store(self, transactions):
+		"""Records transactions, numbered for tx_id, in NODE_TRANSACTIONS and those in the vault in VAULT_STATES"""
+		self.insert('NODE_TRANSACTIONS', [(tx_id(n), blob) for n, blob in transactions.items()])
+		self.insert('VAULT_STATES',
+			[(tx_id(n), 0, 'Cash$State', 0, 'Notary', '2020-01-02 %02d:00:00.000' % n, None) for n in transactions if n != 5])
+
+	def test_fungible_back_chain(self):
+		graph = pycorda.TransactionGraph(self.node, workers=2)
+		self.assertEqual(graph.parents(tx_id(3)), [tx_id(2), tx_id(9)])
+		self.assertEqual(graph.back_chain(tx_id(3)), [tx_id(1), tx_id(2), tx_id(5), tx_id(9)])
+		depths = graph.depths()
+		self.assertEqual([depths[tx_id(n)] for n in [5, 1, 2, 3, 9, 4]], [0, 1, 2, 3, 0, 0])
+		self.assertEqual(graph.depth('tx2'), 1)
+		self.assertEqual(list(graph.errors.TX_ID), [tx_id(4)])
+		self.assertEqual(pycorda.TransactionGraph(self.node, read_transactions=False).depth(tx_id(3)), 0)
+
+	def test_incremental(self):
+		graph = pycorda.TransactionGraph(self.node, incremental=True, workers=1)
+		self.assertEqual(len(graph), 9)
+		self.store({6: signed_transaction([(tx_id(3), 0)])})
+		self.assertEqual(graph.refresh(), 1)
+		self.assertEqual(graph.refresh(), 0)
+		self.assertEqual(graph.depth(tx_id(6)), 4)
+		self.assertEqual(graph.unconsumed_frontier().TRANSACTION_ID[0], tx_id(6))
+		self.assertEqual(len(graph.errors), 1)
+
+	def test_refresh_reads_new_blobs_only(self):
+		graph = pycorda.TransactionGraph(self.node, incremental=True, workers=1)
+		read = []
+		get_node_transactions = self.node.get_node_transactions
+		def record(**kwargs):
+			df = get_node_transactions(**kwargs)
+			if 'TRANSACTION_VALUE' in df:
+				read.extend(df.TX_ID)
+			return df
+		self.node.get_node_transactions = record
+		self.assertEqual(graph.refresh(), 0)
+		self.assertEqual(read, [])
+		self.store({6: signed_transaction([(tx_id(3), 0)])})
+		self.assertEqual(graph.refresh(), 1)
+		self.assertEqual(read, [tx_id(6)])
+
+if __name__ == '__main__':
+	unittest.main()
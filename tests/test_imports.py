@@ -0,0 +1,16 @@
+import unittest
+from benchmarks.import_time import measure
+
+class TestImportCost(unittest.TestCase):
+	def test_import_is_lazy(self):
+		seconds, modules = measure('import pycorda', runs=1)
+		self.assertEqual(modules, [])
+
+	def test_node_skips_optional_dependencies(self):
+		seconds, modules = measure('from pycorda import Node, OfflineNode, SnapshotNode, Fleet, VaultIndex', runs=1)
+		self.assertEqual(modules, ['pandas'])
+
+	def test_plotter_on_demand(self):
+		seconds, modules = measure('import pycorda; pycorda.Plotter', runs=1)
+		self.assertIn('matplotlib', modules)
+		self.assertNotIn('plotly', modules)
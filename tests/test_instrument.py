@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot
+import pycorda
+from pycorda.instrument import OpenTelemetryExporter, Registry, Span, instrumented, phase
+from tests.test_backends import create_vault_db
+
+class RecordingTracer(object):
+	"""Tracer with the start_span signature of opentelemetry.trace.Tracer"""
+
+	def __init__(self):
+		self.spans = []
+
+	def start_span(self, name, start_time=None, attributes=None):
+		tracer = self
+		class RecordedSpan(object):
+			def end(self, end_time=None):
+				tracer.spans.append((name, start_time, end_time, attributes))
+		return RecordedSpan()
+
+class Worker(object):
+	def __init__(self):
+		self.instruments = Registry(maxlen=3)
+
+	@instrumented('work')
+	def work(self, fail=False):
+		with phase('execute'):
+			if fail:
+				raise ValueError('failed')
+
+class TestInstrument(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		path = os.path.join(self.directory, 'node.db')
+		create_vault_db(path)
+		self.node = pycorda.Node('sqlite:///' + path, '', '')
+
+	def tearDown(self):
+		self.node.close()
+		shutil.rmtree(self.directory)
+
+	def test_table_reads(self):
+		self.node.get_vault_states()
+		self.node.get_vault_states(where={'TRANSACTION_ID': 'tx3'})
+		stats = self.node.stats().set_index('TARGET')
+		row = stats.loc['VAULT_STATES']
+		self.assertEqual(row.NAME, '_get_df')
+		self.assertEqual(row.CALLS, 2)
+		self.assertEqual(row.ROWS, 6)
+		self.assertGreater(row.BYTES, 0)
+		self.assertEqual(row.ERRORS, 0)
+		for column in ['EXECUTE_MS', 'FETCH_MS', 'FRAME_MS']:
+			self.assertGreater(row[column], 0)
+		self.assertLessEqual(row.EXECUTE_MS + row.FETCH_MS + row.FRAME_MS, row.TOTAL_MS)
+
+	def test_chunks(self):
+		chunks = list(self.node.iter_table('VAULT_STATES', chunksize=3))
+		self.assertEqual([len(chunk) for chunk in chunks], [3, 1])
+		spans = self.node.instruments.spans()
+		self.assertEqual(len(spans), 1)
+		self.assertEqual(spans.ROWS[0], 4)
+		self.assertGreater(spans.FETCH_S[0], 0)
+
+	def test_errors_and_exporters(self):
+		exported = []
+		self.node.instruments.add_exporter(exported.append)
+		with self.assertRaises(Exception):
+			self.node.get_vault_states(columns=['NO_SUCH_COLUMN'])
+		self.assertEqual(len(exported), 1)
+		self.assertIsInstance(exported[0], Span)
+		self.assertIsNotNone(exported[0].error)
+		self.assertEqual(self.node.stats().ERRORS[0], 1)
+
+		def broken(span):
+			raise RuntimeError('exporter down')
+		self.node.instruments.add_exporter(broken)
+		with warnings.catch_warnings(record=True) as caught:
+			warnings.simplefilter('always')
+			self.assertEqual(len(self.node.get_vault_states()), 4)
+		self.assertIn('exporter down', str(caught[0].message))
+
+	def test_disabled(self):
+		self.node.instruments.enabled = False
+		self.node.get_vault_states()
+		self.assertEqual(len(self.node.instruments.spans()), 0)
+
+	def test_plotter(self):
+		pycorda.Plotter(self.node).vault_states_status()
+		pyplot.close('all')
+		names = set(self.node.stats().NAME)
+		self.assertEqual(names, {'Plotter.vault_states_status', '_get_df'})
+
+	def test_bounded_registry(self):
+		worker = Worker()
+		for i in range(5):
+			worker.work()
+		with self.assertRaises(ValueError):
+			worker.work(fail=True)
+		spans = worker.instruments.spans()
+		self.assertEqual(len(spans), 3)
+		self.assertEqual(list(spans.ERROR.fillna('')), ['', '', 'ValueError'])
+
+	def test_open_telemetry_exporter(self):
+		tracer = RecordingTracer()
+		self.node.instruments.add_exporter(OpenTelemetryExporter(tracer))
+		self.node.get_vault_states()
+		name, start, end, attributes = tracer.spans[0]
+		self.assertEqual(name, '_get_df')
+		self.assertGreater(end, start)
+		self.assertEqual(attributes['pycorda.target'], 'VAULT_STATES')
+		self.assertEqual(attributes['pycorda.rows'], 4)
+		self.assertIn('pycorda.execute_ms', attributes)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,115 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pycorda
+from pycorda.metrics import METRIC_NIDS
+
+class JolokiaAgentStub(BaseHTTPRequestHandler):
+	"""Answers Jolokia bulk reads, failing for MBeans that are not in VALUES"""
+
+	VALUES = {
+		METRIC_NIDS['memory']: {'HeapMemoryUsage': {'used': 1024}},
+		METRIC_NIDS['flows_in_flight']: {'Value': 3},
+	}
+	requests = []
+
+	def do_POST(self):
+		body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+		self.requests.append((self.path, body))
+		responses = []
+		for request in body:
+			if request['mbean'] in self.VALUES:
+				responses.append({'request': request, 'value': self.VALUES[request['mbean']], 'status': 200})
+			else:
+				responses.append({'request': request, 'error_type': 'javax.management.InstanceNotFoundException', 'status': 404})
+		data = json.dumps(responses).encode('utf-8')
+		self.send_response(200)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def log_message(self, format, *args):
+		pass
+
+class WebServerProxyStub(BaseHTTPRequestHandler):
+	"""Answers the web server's single Jolokia reads, {'url': agent, 'nid': mbean} posted to /jolokia/read"""
+
+	requests = []
+
+	def do_POST(self):
+		body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+		self.requests.append((self.path, body))
+		request = {'type': 'read', 'mbean': body['nid']}
+		if body['nid'] in JolokiaAgentStub.VALUES:
+			response = {'request': request, 'value': JolokiaAgentStub.VALUES[body['nid']], 'status': 200}
+		else:
+			response = {'request': request, 'error_type': 'javax.management.InstanceNotFoundException', 'status': 404}
+		data = json.dumps(response).encode('utf-8')
+		self.send_response(200)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def log_message(self, format, *args):
+		pass
+
+class TestJolokiaBulk(unittest.TestCase):
+	@classmethod
+	def setUpClass(cls):
+		cls.server = HTTPServer(('127.0.0.1', 0), JolokiaAgentStub)
+		threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+		cls.node = pycorda.Node('sqlite::memory:', '', '')
+		cls.node.set_node_root('http://127.0.0.1:%d/' % cls.server.server_port)
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.server.shutdown()
+		cls.node.close()
+
+	def setUp(self):
+		JolokiaAgentStub.requests = []
+
+	def test_read_many(self):
+		nids = [METRIC_NIDS['memory'], METRIC_NIDS['flows_in_flight']]
+		data = self.node.jolokia_read_many(nids)
+		self.assertEqual(len(JolokiaAgentStub.requests), 1)
+		self.assertEqual(JolokiaAgentStub.requests[0][0], '/jolokia/')
+		self.assertEqual(data[METRIC_NIDS['memory']]['value']['HeapMemoryUsage']['used'], 1024)
+		self.assertEqual(data[METRIC_NIDS['flows_in_flight']]['value']['Value'], 3)
+
+	def test_metrics_snapshot(self):
+		data = self.node.metrics_snapshot()
+		self.assertEqual(len(JolokiaAgentStub.requests), 1)
+		self.assertEqual(data[METRIC_NIDS['flows_in_flight']]['status'], 200)
+		self.assertEqual(data[METRIC_NIDS['hikari_pool_usage']]['status'], 404)
+
+	def test_agent_not_found(self):
+		node = pycorda.Node('sqlite::memory:', '', '')
+		node.set_node_root('http://127.0.0.1:1/')
+		self.assertRaises(OSError, node.metrics_snapshot)
+		node.close()
+
+	def test_web_server_fallback(self):
+		proxy = HTTPServer(('127.0.0.1', 0), WebServerProxyStub)
+		threading.Thread(target=proxy.serve_forever, daemon=True).start()
+		WebServerProxyStub.requests = []
+		node = pycorda.Node('sqlite::memory:', '', '')
+		try:
+			# the agent is only reachable from the web server
+			node.set_node_root('http://127.0.0.1:1/')
+			node.set_web_server_url('http://127.0.0.1:%d/' % proxy.server_port)
+			for i in range(2):
+				data = node.metrics_snapshot(['memory', 'flows_in_flight', 'hikari_pool_usage'])
+				self.assertEqual(data[METRIC_NIDS['flows_in_flight']]['value']['Value'], 3)
+				self.assertEqual(data[METRIC_NIDS['hikari_pool_usage']]['status'], 404)
+			self.assertEqual(len(WebServerProxyStub.requests), 6)
+			self.assertEqual(WebServerProxyStub.requests[0], ('/jolokia/read', {'url': 'http://127.0.0.1:1/jolokia/', 'nid': METRIC_NIDS['memory']}))
+			# the agent is tried once only
+			self.assertEqual(node.http_latency().set_index('ENDPOINT').CALLS['jolokia/'], 1)
+		finally:
+			node.close()
+			proxy.shutdown()
+			proxy.server_close()
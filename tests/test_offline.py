@@ -0,0 +1,40 @@
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import pandas as pd
+from pycorda import OfflineNode
+
+class TestOfflineNode(unittest.TestCase):
+	def setUp(self):
+		self.path = tempfile.mkdtemp()
+		pd.DataFrame({
+			'TRANSACTION_ID': ['a', 'b', 'b'],
+			'OUTPUT_INDEX': [0, 0, 1],
+			'UUID': ['u1', 'u2', 'u2'],
+			'LINEAR_ID': ['l1', 'l2', 'l2'],
+		}).to_csv(self.path + '/VAULT_LINEAR_STATES.csv', index=False)
+		self.node = OfflineNode(self.path, name='PartyA')
+
+	def tearDown(self):
+		shutil.rmtree(self.path)
+
+	def test_tables_and_finders(self):
+		self.assertEqual(self.node.tables(), ['VAULT_LINEAR_STATES'])
+		self.assertEqual(len(self.node.get_vault_linear_states()), 3)
+		self.assertEqual(len(self.node.find_transactions_by_linear_id('u2')), 2)
+		self.assertEqual(self.node.find_linear_id_by_transaction_id('b'), 'l2')
+		self.assertEqual([len(chunk) for chunk in self.node.get_vault_linear_states(chunksize=2)], [2, 1])
+		self.assertRaises(ValueError, self.node.get_vault_states)
+
+	def test_projection(self):
+		df = self.node.get_vault_linear_states(columns=['LINEAR_ID'], where={'UUID': 'u2'}, limit=1)
+		self.assertEqual(df.to_dict('list'), {'LINEAR_ID': ['l2']})
+		chunks = list(self.node.iter_table('VAULT_LINEAR_STATES', chunksize=2, columns=['UUID']))
+		self.assertEqual([list(chunk.columns) for chunk in chunks], [['UUID'], ['UUID']])
+
+	def test_no_java_bridge(self):
+		code = 'import sys, pycorda.offline; print(any(m in sys.modules for m in ("jpype", "jaydebeapi")))'
+		output = subprocess.check_output([sys.executable, '-c', code])
+		self.assertEqual(output.strip(), b'False')
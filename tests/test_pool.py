@@ -0,0 +1,83 @@
+import os
+import re
+import sqlite3
+import threading
+import unittest
+import pycorda
+from pycorda.pool import ConnectionPool
+from pycorda.schema import SNAPSHOT_TABLES
+from tests.test_backends import VaultDatabase
+
+class TestConnectionPool(unittest.TestCase):
+	def setUp(self):
+		self.opened = 0
+		self.pool = ConnectionPool(self.connect, max_size=2)
+
+	def connect(self):
+		self.opened += 1
+		return sqlite3.connect(':memory:', check_same_thread=False)
+
+	def tearDown(self):
+		self.pool.close()
+
+	def test_connections_are_reused(self):
+		for i in range(3):
+			with self.pool.cursor() as curs:
+				curs.execute('SELECT 1')
+		self.assertEqual(self.opened, 1)
+
+	def test_concurrent_use_is_bounded(self):
+		barrier = threading.Barrier(2)
+		def use():
+			with self.pool.cursor() as curs:
+				barrier.wait(timeout=5)
+				curs.execute('SELECT 1')
+		threads = [threading.Thread(target=use) for i in range(4)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		self.assertEqual(self.opened, 2)
+
+	def test_closed_pool(self):
+		self.pool.close()
+		self.assertRaises(OSError, self.pool.acquire)
+
+class TestGenerateSnapshot(VaultDatabase, unittest.TestCase):
+	node_options = {'name': 'PartyA', 'pool_size': 3}
+
+	def sections(self, filename):
+		with open(filename) as f:
+			return re.findall(r' -----------------  (\w+) ', f.read())
+
+	def test_order_and_rows(self):
+		tables = ['VAULT_STATES', 'NODE_CHECKPOINTS', 'VAULT_LINEAR_STATES', 'VAULT_FUNGIBLE_STATES']
+		outputs = []
+		for workers in [1, 3]:
+			filename = os.path.join(self.directory, 'snapshot-%d.log' % workers)
+			timings = self.node.generate_snapshot(filename, tables=tables, workers=workers)
+			self.assertEqual(list(timings.TABLE), tables)
+			self.assertEqual(list(timings.ROWS), [4, 1, 2, 2])
+			self.assertTrue((timings[['FETCH_SECONDS', 'WRITE_SECONDS']] >= 0).all().all())
+			self.assertEqual(self.sections(filename), tables)
+			with open(filename) as f:
+				outputs.append(f.read())
+		# tables are written in order whatever the number of concurrent reads
+		self.assertEqual(outputs[0], outputs[1])
+
+	def test_default_tables(self):
+		path = os.path.join(self.directory, 'all.db')
+		conn = sqlite3.connect(path)
+		for table_name in SNAPSHOT_TABLES:
+			conn.execute('CREATE TABLE ' + table_name + ' (ID INT)')
+		conn.execute('INSERT INTO NODE_ATTACHMENTS VALUES (1)')
+		conn.commit()
+		conn.close()
+		node = pycorda.Node('sqlite:///' + path, '', '', name='PartyA')
+		try:
+			filename = os.path.join(self.directory, 'snapshot.log')
+			timings = node.generate_snapshot(filename, workers=2)
+		finally:
+			node.close()
+		self.assertEqual(self.sections(filename), SNAPSHOT_TABLES)
+		self.assertEqual(timings.set_index('TABLE').ROWS.to_dict(), dict((t, int(t == 'NODE_ATTACHMENTS')) for t in SNAPSHOT_TABLES))
@@ -0,0 +1,26 @@
+import unittest
+from pycorda.query import build_select
+
+class TestBuildSelect(unittest.TestCase):
+	def test_full_table(self):
+		self.assertEqual(build_select('VAULT_STATES'), ('SELECT * FROM VAULT_STATES', []))
+
+	def test_where_and_limit(self):
+		sql, params = build_select('VAULT_STATES', where={'CONSUMED_TIMESTAMP': None, 'TRANSACTION_ID': 'abc'}, limit=1)
+		self.assertEqual(sql, 'SELECT * FROM VAULT_STATES WHERE CONSUMED_TIMESTAMP IS NULL AND TRANSACTION_ID = ? LIMIT 1')
+		self.assertEqual(params, ['abc'])
+
+	def test_rejects_injection(self):
+		self.assertRaises(ValueError, build_select, 'VAULT_STATES; DROP TABLE VAULT_STATES')
+		self.assertRaises(ValueError, build_select, 'VAULT_STATES', where={'1=1 OR TRANSACTION_ID': 'x'})
+
+	def test_predicate(self):
+		sql, params = build_select('VAULT_STATES', where='RECORDED_TIMESTAMP >= ?', params=('2020-01-01',))
+		self.assertEqual(sql, 'SELECT * FROM VAULT_STATES WHERE RECORDED_TIMESTAMP >= ?')
+		self.assertEqual(params, ['2020-01-01'])
+
+	def test_in(self):
+		sql, params = build_select('NODE_TRANSACTIONS', where={'TX_ID': ['a', 'b']}, columns=['TX_ID'])
+		self.assertEqual(sql, 'SELECT TX_ID FROM NODE_TRANSACTIONS WHERE TX_ID IN (?, ?)')
+		self.assertEqual(params, ['a', 'b'])
+		self.assertEqual(build_select('NODE_TRANSACTIONS', where={'TX_ID': []}), ('SELECT * FROM NODE_TRANSACTIONS WHERE 1 = 0', []))
@@ -0,0 +1,203 @@
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import unittest
+import zlib
+import pycorda
+from pycorda.serialization import decode_blob, decode_blobs, decode_table, read_transaction_inputs, transaction_inputs
+
+# Blob fixtures are built with a minimal AMQP 1.0 encoder
+
+def ulong(value):
+	return b'\x80' + struct.pack('>Q', value)
+
+def string(value):
+	value = value.encode('utf-8')
+	if len(value) > 255:
+		return b'\xb1' + struct.pack('>I', len(value)) + value
+	return b'\xa1' + bytes([len(value)]) + value
+
+def symbol(value):
+	return b'\xa3' + bytes([len(value)]) + value.encode('ascii')
+
+def described(descriptor, value):
+	return b'\x00' + descriptor + value
+
+def amqp_list(*items):
+	body = struct.pack('>I', len(items)) + b''.join(items)
+	return b'\xd0' + struct.pack('>I', len(body)) + body
+
+def type_notation(name):
+	return described(ulong(0xc56200000003), amqp_list(string(name), b'\x40', symbol('net.corda:abc=='), b'\x45'))
+
+def envelope(payload, *class_names):
+	obj = described(symbol('net.corda:abc=='), amqp_list(string(payload)))
+	schema = described(ulong(0xc56200000002), amqp_list(amqp_list(*[type_notation(name) for name in class_names])))
+	transforms = described(ulong(0xc56200000009), b'\x45')
+	return described(ulong(0xc56200000001), amqp_list(obj, schema, transforms))
+
+def amqp_blob(payload='hello', classes=('net.corda.core.transactions.SignedTransaction',), deflate=False):
+	data = b'\x00' + envelope(payload, *classes)
+	if deflate:
+		return b'corda\x01\x00' + b'\x01\x00' + zlib.compress(data)
+	return b'corda\x01\x00' + data
+
+def kryo_blob(*class_names):
+	data = b''.join(b'\x01' + name[:-1].encode('ascii') + bytes([ord(name[-1]) | 0x80]) + b'\x00\x02' for name in class_names)
+	return b'corda\x00\x00' + b'\x00' + data
+
+# Corda's AMQP descriptors are 0xc562 in the top 16 bits and an id
+def corda_descriptor(id):
+	return ulong(0xc562 << 48 | id)
+
+def binary(value):
+	return b'\xb0' + struct.pack('>I', len(value)) + value
+
+def integer(value):
+	return b'\x71' + struct.pack('>i', value)
+
+def composite(name, fields):
+	"""Schema entry of a class, described by the symbol net.corda:<name>"""
+	fields = [described(corda_descriptor(4), amqp_list(string(field), string('*'), b'\x45', b'\x40', b'\x40', b'\x41', b'\x42'))
+		for field in fields]
+	descriptor = described(corda_descriptor(3), amqp_list(symbol('net.corda:' + name), b'\x40'))
+	return described(corda_descriptor(5), amqp_list(string(name), b'\x40', b'\x45', descriptor, amqp_list(*fields)))
+
+def instance(name, *values):
+	return described(symbol('net.corda:' + name), amqp_list(*values))
+
+def serialized(obj, *types):
+	schema = described(corda_descriptor(2), amqp_list(amqp_list(*types)))
+	return b'corda\x01\x00\x00' + described(corda_descriptor(1), amqp_list(obj, schema, described(corda_descriptor(9), b'\x45')))
+
+STATE_REF_TYPES = [composite('StateRef', ['txhash', 'index']), composite('SecureHash', ['bytes'])]
+
+def state_ref(tx_id, index):
+	return instance('StateRef', instance('SecureHash', binary(bytes.fromhex(tx_id))), integer(index))
+
+def signed_transaction(inputs=(), references=(), notary_change=False):
+	"""Serializes a SignedTransaction spending inputs and referencing references, lists of (TX_ID, OUTPUT_INDEX)"""
+	opaque = lambda data: instance('OpaqueBytes', binary(data))
+	if notary_change:
+		components = serialized(amqp_list(*[state_ref(*ref) for ref in inputs]), *STATE_REF_TYPES)
+		transaction = instance('NotaryChangeWireTransaction', amqp_list(opaque(components)))
+		types = [composite('NotaryChangeWireTransaction', ['serializedComponents'])]
+	else:
+		groups = []
+		for index, refs in [(0, inputs), (1, [('00' * 32, 0)]), (7, references)]:
+			# the output group holds something other than StateRefs
+			components = [serialized(state_ref(*ref), *STATE_REF_TYPES) if index != 1 else b'output' for ref in refs]
+			groups.append(instance('ComponentGroup', amqp_list(*[opaque(c) for c in components]), integer(index)))
+		transaction = instance('WireTransaction', amqp_list(*groups), instance('PrivacySalt', binary(b'\x01' * 32)))
+		types = [composite('WireTransaction', ['componentGroups', 'privacySalt']),
+			composite('ComponentGroup', ['components', 'groupIndex']), composite('PrivacySalt', ['bytes'])]
+	types += [composite('OpaqueBytes', ['bytes'])]
+	tx_bits = serialized(transaction, *types)
+	signed = instance('SignedTransaction', b'\x45', instance('SerializedBytes', binary(tx_bits)))
+	return serialized(signed, composite('SignedTransaction', ['sigs', 'txBits']), composite('SerializedBytes', ['bytes']))
+
+def tx_id(n):
+	return '%064X' % n
+
+CLASSES = ['net.corda.core.transactions.SignedTransaction', 'net.corda.finance.contracts.asset.Cash$State']
+
+class TestSerialization(unittest.TestCase):
+	def test_amqp(self):
+		blob = amqp_blob('x' * 100, CLASSES)
+		result = decode_blob(blob)
+		self.assertIsNone(result['ERROR'])
+		self.assertEqual(result['FORMAT'], 'AMQP')
+		self.assertIsNone(result['ENCODING'])
+		self.assertEqual(result['SIZE'], len(blob))
+		self.assertEqual(result['HEADER_BYTES'], 8)
+		self.assertEqual(result['PAYLOAD_SIZE'], len(blob) - 8)
+		self.assertGreater(result['OBJECT_BYTES'], 100)
+		self.assertGreater(result['SCHEMA_BYTES'], 0)
+		self.assertEqual(result['TRANSFORMS_BYTES'], 11)
+		self.assertEqual(result['CLASSES'], CLASSES)
+		self.assertEqual(result['CLASS_COUNT'], 2)
+
+	def test_deflate(self):
+		plain = decode_blob(amqp_blob('x' * 1000, CLASSES))
+		result = decode_blob(amqp_blob('x' * 1000, CLASSES, deflate=True))
+		self.assertIsNone(result['ERROR'])
+		self.assertEqual(result['ENCODING'], 'DEFLATE')
+		self.assertLess(result['SIZE'], plain['SIZE'])
+		self.assertEqual(result['PAYLOAD_SIZE'], plain['PAYLOAD_SIZE'])
+		self.assertEqual(result['OBJECT_BYTES'], plain['OBJECT_BYTES'])
+		self.assertEqual(result['CLASSES'], CLASSES)
+
+	def test_kryo(self):
+		result = decode_blob(kryo_blob(*CLASSES))
+		self.assertIsNone(result['ERROR'])
+		self.assertEqual(result['FORMAT'], 'KRYO')
+		self.assertIsNone(result['OBJECT_BYTES'])
+		self.assertEqual(result['CLASSES'], CLASSES)
+
+	def test_invalid(self):
+		self.assertEqual(decode_blob(b'garbage')['ERROR'], 'no Corda serialization magic')
+		self.assertEqual(decode_blob(b'corda\x01\x00\x07')['ERROR'], 'unknown section id 7')
+		truncated = decode_blob(amqp_blob()[:30])
+		self.assertEqual(truncated['FORMAT'], 'AMQP')
+		self.assertIsNotNone(truncated['ERROR'])
+		self.assertIsNotNone(decode_blob(b'corda\x01\x00\x01\x00not zlib')['ERROR'])
+		self.assertIsNone(decode_blob(None)['SIZE'])
+		self.assertEqual(decode_blob(b'corda\x01\x00\x01\x05data')['ERROR'], 'unknown encoding')
+
+	def test_corrupt_compression(self):
+		blobs = [amqp_blob(), b'corda\x01\x00\x01\x01not snappy', b'corda\x01\x00\x01\x00not zlib']
+		results = decode_blobs(blobs, workers=2, chunksize=1)
+		self.assertEqual([result['ENCODING'] for result in results], [None, 'SNAPPY', 'DEFLATE'])
+		self.assertIsNone(results[0]['ERROR'])
+		self.assertIsNotNone(results[1]['ERROR'])
+		self.assertIsNotNone(results[2]['ERROR'])
+		try:
+			import snappy
+		except ImportError:
+			return
+		data = bytearray(snappy.StreamCompressor().add_chunk(b'\x00' + b'x' * 100))
+		data[-5] ^= 0xff
+		self.assertTrue(decode_blob(b'corda\x01\x00\x01\x01' + bytes(data))['ERROR'].startswith('corrupt SNAPPY data'))
+
+	def test_process_pool(self):
+		blobs = [amqp_blob('x' * i, CLASSES[:1 + i % 2]) for i in range(20)] + [b'garbage']
+		self.assertEqual(decode_blobs(blobs, workers=2, chunksize=4), [decode_blob(blob) for blob in blobs])
+
+	def test_transaction_inputs(self):
+		blob = signed_transaction([(tx_id(1), 0), (tx_id(2), 3)], [(tx_id(3), 1)])
+		self.assertEqual(transaction_inputs(blob), [
+			(tx_id(1), 0, 'input'), (tx_id(2), 3, 'input'), (tx_id(3), 1, 'reference')])
+		self.assertEqual(transaction_inputs(signed_transaction()), [])
+		notary_change = signed_transaction([(tx_id(4), 2)], notary_change=True)
+		self.assertEqual(transaction_inputs(notary_change), [(tx_id(4), 2, 'input')])
+		with self.assertRaises(ValueError):
+			transaction_inputs(kryo_blob(*CLASSES))
+
+	def test_checkpoint_sizes(self):
+		directory = tempfile.mkdtemp()
+		try:
+			path = os.path.join(directory, 'node.db')
+			conn = sqlite3.connect(path)
+			conn.execute('CREATE TABLE NODE_CHECKPOINTS (CHECKPOINT_ID VARCHAR(64), CHECKPOINT_VALUE BLOB)')
+			conn.executemany('INSERT INTO NODE_CHECKPOINTS VALUES (?, ?)',
+				[('c%d' % i, amqp_blob('x' * (10 * i), deflate=i % 2 == 1)) for i in range(10)] + [('c10', b'garbage')])
+			conn.commit()
+			conn.close()
+			node = pycorda.Node('sqlite:///' + path, '', '')
+			try:
+				df = decode_table(node, 'NODE_CHECKPOINTS', workers=2, chunksize=4)
+				self.assertEqual(list(df.CHECKPOINT_ID), ['c%d' % i for i in range(11)])
+				self.assertEqual(df.ERROR.notnull().sum(), 1)
+				sizes = node.checkpoint_sizes(workers=1)
+				self.assertEqual(len(sizes), 11)
+				self.assertTrue(sizes.SIZE.is_monotonic_decreasing)
+				self.assertEqual(sizes.CHECKPOINT_ID[0], 'c8')
+			finally:
+				node.close()
+		finally:
+			shutil.rmtree(directory)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from pycorda.base import BaseNode
+from pycorda.query import filter_df
+from pycorda.snapshot import SnapshotNode, read_manifest
+
+try:
+	import pyarrow
+except ImportError:
+	pyarrow = None
+
+class FrameNode(BaseNode):
+	"""Node serving tables from a dict of dataframes"""
+
+	def __init__(self, frames):
+		self.frames = frames
+		self.reads = []
+
+	def _get_df(self, table_name, where=None, params=None, limit=None, chunksize=None, exclude=None, columns=None):
+		self.reads.append(table_name)
+		df = filter_df(self.frames[table_name], where, limit).drop(columns=exclude or [], errors='ignore')
+		if columns is not None:
+			df = df[columns]
+		if chunksize is not None:
+			return (df.iloc[i:i + chunksize] for i in range(0, len(df), chunksize))
+		return df
+
+def vault_frames():
+	return {
+		'VAULT_STATES': pd.DataFrame({
+			'TRANSACTION_ID': ['t%d' % i for i in range(10)],
+			'OUTPUT_INDEX': [0] * 10,
+			'CONSUMED_TIMESTAMP': [None, '2020-01-01 00:00:00.000'] * 5,
+			'CONTRACT_STATE_CLASS_NAME': ['Cash', 'IOU'] * 5,
+		}),
+		'NODE_TRANSACTIONS': pd.DataFrame({'TX_ID': ['t0'], 'TRANSACTION_VALUE': [b'corda\x01\x00']}),
+		'NODE_INFOS': pd.DataFrame({'NODE_INFO_ID': pd.Series([], dtype='int64')}),
+	}
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class TestSnapshot(unittest.TestCase):
+	def setUp(self):
+		self.path = tempfile.mkdtemp()
+		self.node = FrameNode(vault_frames())
+		self.tables = list(self.node.frames)
+
+	def tearDown(self):
+		shutil.rmtree(self.path)
+
+	def test_round_trip(self):
+		manifest = self.node.export_snapshot(self.path, tables=self.tables, chunksize=4)
+		self.assertTrue(manifest['complete'])
+		self.assertEqual(manifest['tables']['VAULT_STATES']['rows'], 10)
+		self.assertEqual(len(manifest['tables']['VAULT_STATES']['parts']), 3)
+		snapshot = SnapshotNode(self.path, verify=True)
+		self.assertEqual(len(snapshot.get_vault_states()), 10)
+		self.assertEqual(snapshot.get_node_transactions(include_blobs=True).iloc[0]['TRANSACTION_VALUE'], b'corda\x01\x00')
+		self.assertEqual(list(snapshot.get_node_transactions().columns), ['TX_ID'])
+		self.assertEqual(list(snapshot.get_node_infos().columns), ['NODE_INFO_ID'])
+		self.assertEqual(len(snapshot.find_unconsumed_states_by_contract_state('Cash')), 5)
+		self.assertEqual(snapshot.find_vault_states_by_transaction_id('t3').iloc[0]['CONTRACT_STATE_CLASS_NAME'], 'IOU')
+
+	def test_resume(self):
+		self.node.export_snapshot(self.path, tables=self.tables)
+		part = os.path.join(self.path, 'NODE_TRANSACTIONS', 'part-00000.parquet')
+		with open(part, 'ab') as f:
+			f.write(b'corrupt')
+		self.assertRaises(ValueError, SnapshotNode, self.path, True)
+		self.node.reads = []
+		self.node.export_snapshot(self.path, tables=self.tables, resume=True)
+		self.assertEqual(self.node.reads, ['NODE_TRANSACTIONS'])
+		SnapshotNode(self.path, verify=True)
+		self.assertTrue(read_manifest(self.path)['complete'])
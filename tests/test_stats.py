@@ -0,0 +1,41 @@
+import unittest
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot
+import numpy as np
+import pandas as pd
+from pycorda.stats import Plotter, plot_time_series
+from tests.test_backends import VaultDatabase
+
+class TestPlotTimeSeries(unittest.TestCase):
+	def tearDown(self):
+		pyplot.close('all')
+
+	def test_points(self):
+		plot_time_series(['2020-01-01 10:00:00.123', '2020-01-01 11:00:00', None], 'Times')
+		ax = pyplot.gca()
+		self.assertEqual(len(ax.lines[0].get_xdata()), 2)
+		self.assertEqual(ax.get_title(), 'Times')
+
+	def test_large_series_is_binned(self):
+		timestamps = pd.Series(pd.date_range('2020-01-01', periods=50000, freq='s'))
+		plot_time_series(timestamps, bins=50)
+		ax = pyplot.gca()
+		self.assertEqual(len(ax.lines), 0)
+		self.assertEqual(int(np.sum(ax.patches[0].get_data().values)), 50000)
+
+class TestPlotter(VaultDatabase, unittest.TestCase):
+	def tearDown(self):
+		pyplot.close('all')
+		VaultDatabase.tearDown(self)
+
+	def test_consumed_states(self):
+		statements = []
+		read_df = self.node._backend.read_df
+		def recording_read_df(conn, sql, params):
+			statements.append(sql)
+			return read_df(conn, sql, params)
+		self.node._backend.read_df = recording_read_df
+		Plotter(self.node).plot_timeseries_vault_states_consumed()
+		self.assertEqual(statements, ['SELECT CONSUMED_TIMESTAMP FROM VAULT_STATES WHERE CONSUMED_TIMESTAMP IS NOT NULL'])
+		self.assertEqual(len(pyplot.gca().lines[0].get_xdata()), 1)
@@ -0,0 +1,68 @@
+import unittest
+import pandas as pd
+import pycorda
+from tests.test_backends import VaultDatabase
+
+def rows(df):
+	# a query's column types depend on the rows it returns, so only the values are compared
+	return list(df.columns), df.astype(object).fillna('').values.tolist()
+
+class TestVault(VaultDatabase, unittest.TestCase):
+	def test_sync_consumed_and_late_states(self):
+		sync = pycorda.VaultSync(self.node, lookback=3600)
+		self.assertEqual(sync.refresh(), 4)
+		self.assertEqual(sync.refresh(), 0)
+		self.execute("UPDATE VAULT_STATES SET STATE_STATUS = 1, CONSUMED_TIMESTAMP = '2020-01-01 13:00:00.000' WHERE TRANSACTION_ID = 'tx2'")
+		self.assertEqual(sync.refresh(), 1)
+		tx2 = sync.vault_states[sync.vault_states.TRANSACTION_ID == 'tx2']
+		self.assertEqual(list(tx2.CONSUMED_TIMESTAMP.astype(str)), ['2020-01-01 13:00:00'])
+		self.assertEqual(len(sync.vault_states), 4)
+		# committed after the previous refresh but stamped before its high-water mark
+		self.insert('VAULT_STATES', [('tx4', 0, 'IOUState', 0, 'Notary', '2020-01-01 12:30:00.000', None)])
+		self.assertEqual(sync.refresh(), 1)
+		self.assertEqual(sorted(sync.vault_states.TRANSACTION_ID), ['tx1', 'tx2', 'tx3', 'tx3', 'tx4'])
+
+	def test_sync_merges_fetched_rows_only(self):
+		sync = pycorda.VaultSync(self.node, lookback=3600)
+		sync.refresh()
+		before = sync.vault_states
+		self.insert('VAULT_STATES', [('tx4', 0, 'CashState', 0, 'Notary', '2020-01-01 12:30:00.000', None)])
+		self.execute("UPDATE VAULT_STATES SET STATE_STATUS = 1, CONSUMED_TIMESTAMP = '2020-01-01 13:00:00.000' WHERE TRANSACTION_ID = 'tx3' AND OUTPUT_INDEX = 1")
+		self.assertEqual(sync.refresh(), 2)
+		self.assertEqual(list(sync.vault_states.TRANSACTION_ID), ['tx1', 'tx2', 'tx3', 'tx3', 'tx4'])
+		self.assertEqual(str(sync.vault_states.CONTRACT_STATE_CLASS_NAME.dtype), 'category')
+		self.assertEqual(sync.vault_states.CONTRACT_STATE_CLASS_NAME.iloc[4], 'CashState')
+		self.assertFalse(pd.isnull(sync.vault_states.CONSUMED_TIMESTAMP.iloc[3]))
+		# the frame of the previous refresh is left as it was
+		self.assertEqual(len(before), 4)
+		self.assertTrue(pd.isnull(before.CONSUMED_TIMESTAMP.iloc[3]))
+
+	def test_sync_without_lookback(self):
+		sync = pycorda.VaultSync(self.node, lookback=0)
+		sync.refresh()
+		self.insert('VAULT_STATES', [('tx4', 0, 'IOUState', 0, 'Notary', '2020-01-01 11:30:00.000', None)])
+		self.assertEqual(sync.refresh(), 0)
+		sync.reset()
+		self.assertEqual(sync.lookback, 0)
+		self.assertEqual(sync.refresh(), 5)
+
+	def test_index_matches_node(self):
+		index = pycorda.VaultIndex(self.node)
+		for finder, arg in [
+				('find_vault_states_by_transaction_id', 'tx3'),
+				('find_transactions_by_linear_id', 'u1'),
+				('find_vault_fungible_states_by_transaction_id', 'tx3'),
+				('find_vault_fungible_states_by_issuer', 'BankA'),
+				('find_unconsumed_states_by_contract_state', 'IOUState'),
+				('find_vault_states_by_transaction_id', 'missing')]:
+			expected = getattr(self.node, finder)(arg)
+			self.assertEqual(rows(getattr(index, finder)(arg)), rows(expected), finder)
+		self.assertEqual(index.find_linear_id_by_transaction_id('tx2'), 'l1')
+		self.assertRaises(IndexError, index.find_linear_id_by_transaction_id, 'missing')
+
+	def test_index_refresh(self):
+		index = pycorda.VaultIndex(self.node, incremental=True)
+		self.insert('VAULT_STATES', [('tx4', 0, 'IOUState', 0, 'Notary', '2020-01-01 13:00:00.000', None)])
+		self.assertTrue(index.find_vault_states_by_transaction_id('tx4').empty)
+		index.refresh()
+		self.assertEqual(len(index.find_unconsumed_states_by_contract_state('IOUState')), 2)